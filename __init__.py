@@ -1,4 +1,3 @@
-
 from .__version__ import (
     __title__,
     __author__,
@@ -6,5 +5,72 @@ from .__version__ import (
     __build__,
     __version__
 )
-from . import video
-from .get_user_information import get_user_info
+from importlib import import_module
+from typing import TYPE_CHECKING
+
+# The submodules (and `requests`, `aiohttp`...) are only imported when one of their names is
+# first used, so that `import` of the package stays cheap for short-lived processes.
+_LAZY_ATTRIBUTES = {
+    "video": (".video", None),
+    "TikTokClient": (".client", "TikTokClient"),
+    "set_default_client": (".client", "set_default_client"),
+    "ResponseCache": (".cache", "ResponseCache"),
+    "CommentSyncState": (".sync", "CommentSyncState"),
+    "sync_comments": (".sync", "sync_comments"),
+    "RequestScheduler": (".scheduler", "RequestScheduler"),
+    "commentBatch": (".columns", "commentBatch"),
+    "SQLiteSink": (".sinks", "SQLiteSink"),
+    "JSONLSink": (".sinks", "JSONLSink"),
+    "ParquetSink": (".sinks", "ParquetSink"),
+    "TopK": (".aggregates", "TopK"),
+    "GroupCounter": (".aggregates", "GroupCounter"),
+    "TimeHistogram": (".aggregates", "TimeHistogram"),
+    "aggregate": (".aggregates", "aggregate"),
+    "get_user_info": (".get_user_information", "get_user_info"),
+    "iter_user_videos": (".get_user_information", "iter_user_videos"),
+    "get_user_videos": (".get_user_information", "get_user_videos"),
+    "DownloadManager": (".download_manager", "DownloadManager"),
+    "CidSet": (".dedup", "CidSet"),
+    "CidBloomFilter": (".dedup", "CidBloomFilter"),
+    "load_cid_index": (".dedup", "load_cid_index"),
+    "AsyncTikTokClient": (".async_client", "AsyncTikTokClient"),
+    "MetricsRegistry": (".metrics", "MetricsRegistry"),
+    "enable_metrics": (".metrics", "enable_metrics"),
+    "disable_metrics": (".metrics", "disable_metrics"),
+    "serve_prometheus": (".metrics", "serve_prometheus"),
+}
+
+__all__ = list(_LAZY_ATTRIBUTES)
+
+
+def __getattr__(name: str):
+    try:
+        module, attribute = _LAZY_ATTRIBUTES[name]
+    except KeyError:
+        raise AttributeError(f"module {__name__!r} has no attribute {name!r}") from None
+    value = import_module(module, __name__)
+    if attribute is not None:
+        value = getattr(value, attribute)
+    # Later lookups do not go through `__getattr__`
+    globals()[name] = value
+    return value
+
+
+def __dir__():
+    return sorted(set(globals()) | set(_LAZY_ATTRIBUTES))
+
+
+if TYPE_CHECKING:
+    from . import video
+    from .client import TikTokClient, set_default_client
+    from .cache import ResponseCache
+    from .sync import CommentSyncState, sync_comments
+    from .scheduler import RequestScheduler
+    from .columns import commentBatch
+    from .sinks import SQLiteSink, JSONLSink, ParquetSink
+    from .aggregates import TopK, GroupCounter, TimeHistogram, aggregate
+    from .get_user_information import get_user_info, iter_user_videos, get_user_videos
+    from .download_manager import DownloadManager
+    from .dedup import CidSet, CidBloomFilter, load_cid_index
+    from .async_client import AsyncTikTokClient
+    from .metrics import MetricsRegistry, enable_metrics, disable_metrics, serve_prometheus
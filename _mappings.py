@@ -0,0 +1,66 @@
+# Generated from the `yaml` directory by `python -m <package>.extractors`, do not edit.
+# name: (crc32 of the YAML file, mapping)
+MAPPINGS = {
+    'comments_path': (4064632244, {
+        'author_pin': 'author_pin',
+        'aweme_id': 'aweme_id',
+        'cid': 'cid',
+        'collect_stat': 'collect_stat',
+        'comment_language': 'comment_language',
+        'create_time': 'create_time',
+        'digg_count': 'digg_count',
+        'reply_comment_total': 'reply_comment_total',
+        'text': 'text',
+        'author_id': 'user/uid',
+    }),
+    'replies': (4064632244, {
+        'author_pin': 'author_pin',
+        'aweme_id': 'aweme_id',
+        'cid': 'cid',
+        'collect_stat': 'collect_stat',
+        'comment_language': 'comment_language',
+        'create_time': 'create_time',
+        'digg_count': 'digg_count',
+        'reply_comment_total': 'reply_comment_total',
+        'text': 'text',
+        'author_id': 'user/uid',
+    }),
+    'user_info_path': (3321443096, {
+        'createTime': 'userInfo/user/createTime',
+        'description': 'userInfo/user/signature',
+        'diggCount': 'userInfo/stats/diggCount',
+        'followerCount': 'userInfo/stats/followerCount',
+        'followingCount': 'userInfo/stats/followingCount',
+        'friendCount': 'userInfo/stats/friendCount',
+        'heartCount': 'userInfo/stats/heartCount',
+        'id': 'userInfo/user/id',
+        'language': 'userInfo/user/language',
+        'nickNameModifyTime': 'userInfo/user/nickNameModifyTime',
+        'nickname': 'userInfo/user/nickname',
+        'privateAccount': 'userInfo/user/privateAccount',
+        'region': 'userInfo/user/region',
+        'secret': 'userInfo/user/secret',
+        'secUid': 'userInfo/user/secUid',
+        'uniqueId': 'userInfo/user/uniqueId',
+        'verified': 'userInfo/user/verified',
+        'videoCount': 'userInfo/stats/videoCount',
+    }),
+    'video_details_path': (319251229, {
+        'author_id': 'itemInfo/itemStruct/author/id',
+        'author_nickname': 'itemInfo/itemStruct/author/nickname',
+        'author_uniqueId': 'itemInfo/itemStruct/author/uniqueId',
+        'collectCount': 'itemInfo/itemStruct/stats/collectCount',
+        'commentCount': 'itemInfo/itemStruct/stats/commentCount',
+        'createTime': 'itemInfo/itemStruct/createTime',
+        'description': 'itemInfo/itemStruct/desc',
+        'diggCount': 'itemInfo/itemStruct/stats/diggCount',
+        'duration': 'itemInfo/itemStruct/video/duration',
+        'hastag': 'itemInfo/itemStruct/textExtra',
+        'height': 'itemInfo/itemStruct/video/height',
+        'playCount': 'itemInfo/itemStruct/stats/playCount',
+        'region': 'itemInfo/itemStruct/locationCreated',
+        'shareCount': 'itemInfo/itemStruct/stats/shareCount',
+        'video_id': 'itemInfo/itemStruct/id',
+        'width': 'itemInfo/itemStruct/video/width',
+    }),
+}
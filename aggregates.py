@@ -0,0 +1,213 @@
+import heapq
+from collections import Counter
+from itertools import count
+from threading import Lock
+from typing import Iterable, Iterator
+from .comment import commentData
+
+SCOPES = ("all", "comments", "replies")
+
+
+class CommentAggregate:
+    """
+    Base of the streaming aggregates of comments.
+
+    An aggregate sees every comment and reply once, as it arrives, and keeps only its
+    result: memory does not grow with the number of comments. `result` can be read at any
+    time, also from another thread while the crawl is still running.
+
+    Aggregates have the interface of the sinks: one can be given as the `sink` of
+    `get_comments`, or several can watch a stream with `aggregate`.
+
+    Usage:
+
+        top = TopK(10, "digg_count")
+        languages = GroupCounter("comment_language", scope="comments")
+        for comment in aggregate(iter_comments(url, msToken), top, languages):
+            ...
+        print(top.result(), languages.result())
+    """
+    def __init__(self, scope: str = "all"):
+        """
+        :param scope: The rows aggregated: `all`, top-level `comments` only or `replies` only.
+        """
+        if scope not in SCOPES:
+            raise ValueError(f"scope must be one of {SCOPES}, not {scope!r}")
+        self.scope = scope
+        self.rows_written = 0
+        self._lock = Lock()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+    def __repr__(self)-> str:
+        return f"<{type(self).__name__} (scope={self.scope},rows={self.rows_written})>"
+
+    def write(self, comment: commentData, parent_cid: str = "")-> None:
+        """
+        Aggregate a comment and its replies.
+
+        :param comment: The comment to aggregate.
+        :param parent_cid: The `cid` of the comment it answers, empty for a top-level comment.
+        """
+        with self._lock:
+            self._visit(comment, parent_cid)
+
+    def write_many(self, comments: Iterable[commentData], parent_cid: str = "")-> None:
+        """
+        Aggregate comments and their replies.
+        """
+        for comment in comments:
+            self.write(comment, parent_cid)
+
+    def _visit(self, comment: commentData, parent_cid: str)-> None:
+        self.rows_written += 1
+        if self.scope == "all" or (self.scope == "replies") == bool(parent_cid):
+            self._add(comment)
+        if len(comment):
+            for reply in comment.replies:
+                self._visit(reply, comment.cid)
+
+    def flush(self)-> None:
+        """
+        Nothing is buffered, kept for the interface of the sinks.
+        """
+
+    def close(self)-> None:
+        pass
+
+    def _add(self, comment: commentData)-> None:
+        raise NotImplementedError
+
+    def result(self):
+        raise NotImplementedError
+
+
+class TopK(CommentAggregate):
+    """
+    The `k` comments with the largest (or smallest) value of a numeric field, in a heap of
+    `k` entries. Comments without the field are ignored, ties keep the first seen.
+
+    The kept comments hold their replies.
+    """
+    def __init__(self, k: int = 10, field: str = "digg_count", largest: bool = True, scope: str = "all"):
+        """
+        :param k: The number of comments kept.
+        :param field: The numeric attribute of `commentData` ranking the comments, e.g. `digg_count`.
+        :param largest: Keep the largest values, or the smallest ones.
+        :param scope: The rows aggregated: `all`, top-level `comments` only or `replies` only.
+        """
+        super().__init__(scope)
+        self.k = k
+        self.field = field
+        self.largest = largest
+        self._heap: list[tuple[float, int, commentData]] = []
+        self._order = count()
+
+    def _add(self, comment: commentData)-> None:
+        value = comment[self.field]
+        if value is None:
+            return
+        try:
+            value = value if isinstance(value, (int, float)) else float(value)
+        except (TypeError, ValueError):
+            return
+        # The heap root is the worst kept entry; on ties, the later comment is the worse one
+        entry = (value if self.largest else -value, -next(self._order), comment)
+        if len(self._heap) < self.k:
+            heapq.heappush(self._heap, entry)
+        elif entry[:2] > self._heap[0][:2]:
+            heapq.heapreplace(self._heap, entry)
+
+    def result(self)-> list[commentData]:
+        """
+        :return: The kept comments, best first.
+        """
+        with self._lock:
+            entries = sorted(self._heap, key=lambda entry: entry[:2], reverse=True)
+        return [comment for _, _, comment in entries]
+
+
+class GroupCounter(CommentAggregate):
+    """
+    The number of comments per value of a field, e.g. per `comment_language`. Comments
+    without the field are counted under None.
+    """
+    def __init__(self, field: str = "comment_language", scope: str = "all"):
+        """
+        :param field: The attribute of `commentData` grouping the comments.
+        :param scope: The rows aggregated: `all`, top-level `comments` only or `replies` only.
+        """
+        super().__init__(scope)
+        self.field = field
+        self._counts: Counter = Counter()
+
+    def _add(self, comment: commentData)-> None:
+        self._counts[comment[self.field]] += 1
+
+    def result(self)-> dict:
+        """
+        :return: The number of comments per value, most common first.
+        """
+        with self._lock:
+            return dict(self._counts.most_common())
+
+    def most_common(self, n: int | None = None)-> list[tuple[any, int]]:
+        """
+        :return: The `n` most common values and their counts.
+        """
+        with self._lock:
+            return self._counts.most_common(n)
+
+
+class TimeHistogram(CommentAggregate):
+    """
+    The number of comments per time bucket of a timestamp field, e.g. the reply volume per
+    hour of `create_time`. Comments without the field are ignored.
+    """
+    def __init__(self, bucket: int = 3600, field: str = "create_time", scope: str = "all"):
+        """
+        :param bucket: The width of the buckets, in seconds.
+        :param field: The attribute of `commentData` holding a Unix timestamp.
+        :param scope: The rows aggregated: `all`, top-level `comments` only or `replies` only.
+        """
+        if bucket <= 0:
+            raise ValueError(f"bucket must be positive, not {bucket}")
+        super().__init__(scope)
+        self.bucket = bucket
+        self.field = field
+        self._counts: dict[int, int] = {}
+
+    def _add(self, comment: commentData)-> None:
+        value = comment[self.field]
+        if value is None:
+            return
+        try:
+            start = int(value) // self.bucket * self.bucket
+        except (TypeError, ValueError):
+            return
+        self._counts[start] = self._counts.get(start, 0) + 1
+
+    def result(self)-> list[tuple[int, int]]:
+        """
+        :return: `(bucket start, count)` pairs, in time order. Buckets without comments are left out.
+        """
+        with self._lock:
+            return sorted(self._counts.items())
+
+
+def aggregate(comments: Iterable[commentData], *aggregates: CommentAggregate) -> Iterator[commentData]:
+    """
+    Feed a stream of comments to aggregates, passing the comments through.
+
+    :param comments: The comments, e.g. `iter_comments(...)`. Their replies are aggregated too.
+    :param aggregates: The aggregates updated with each comment before it is yielded.
+    :return: An iterator of the same comments.
+    """
+    for comment in comments:
+        for aggregate_ in aggregates:
+            aggregate_.write(comment)
+        yield comment
@@ -0,0 +1,267 @@
+import os
+import asyncio
+import logging
+import requests.cookies
+from time import perf_counter
+from . import metrics
+from .comment import commentData, _comment_values, _reply_values, _decode_page, _next_cursor
+from .templates import RequestTemplate, COMMENT_TEMPLATE, REPLY_TEMPLATE, HEADERS
+from .video import video_details, get_all_data_from_url, get_original_video_header, _build_video_details, _get_download_url, _get_video_file_path
+from .get_user_information import user_information, _extract_user_data, _build_user_info
+from .functions import get_video_id
+
+try:
+    import aiohttp
+except ImportError:  # pragma: no cover - optional dependency
+    aiohttp = None
+
+logger = logging.getLogger(__name__)
+
+
+class AsyncTikTokClient:
+    """
+    Asynchronous counterpart of the `comment`, `video` and `get_user_information` functions.
+
+    All the requests go through a single `aiohttp.ClientSession` and a semaphore which bounds
+    the number of requests in flight, so one event loop can crawl many videos at the same time.
+    Video downloads only hold that semaphore until their headers arrive, the transfers are
+    bounded by `max_downloads` instead.
+    The same YAML path mappings and data classes as the sync API are used, the results are identical.
+
+    Usage:
+
+        async with AsyncTikTokClient(max_concurrency=200) as client:
+            comments = await client.get_comments(url, msToken)
+    """
+    def __init__(self, max_concurrency: int = 100, timeout: float = 30, chunk_size: int = 8192, base_url: str = "https://www.tiktok.com", max_downloads: int = 8):
+        """
+        :param max_concurrency: Maximum number of requests in flight at the same time.
+        :param timeout: Total timeout of one request, in seconds.
+        :param chunk_size: Size of the chunks written to disk when downloading a video.
+        :param base_url: The scheme and host of the comment APIs.
+        :param max_downloads: Maximum number of video transfers at the same time.
+        """
+        if aiohttp is None:
+            raise ImportError("AsyncTikTokClient requires the 'aiohttp' package, install it with `pip install aiohttp`")
+
+        self.max_concurrency = max_concurrency
+        self.timeout = aiohttp.ClientTimeout(total=timeout)
+        self.chunk_size = chunk_size
+        self.base_url = base_url
+        self.max_downloads = max_downloads
+        self._semaphore = asyncio.Semaphore(max_concurrency)
+        self._download_semaphore = asyncio.Semaphore(max_downloads)
+        self._session: aiohttp.ClientSession | None = None
+
+    async def __aenter__(self):
+        await self.open()
+        return self
+
+    async def __aexit__(self, *exc_info):
+        await self.close()
+
+    async def open(self)-> None:
+        """
+        Create the underlying HTTP session. Called automatically by `async with`.
+        """
+        if self._session is None or self._session.closed:
+            # The semaphores already bound the requests and the transfers, let the connector follow them
+            connector = aiohttp.TCPConnector(limit=self.max_concurrency + self.max_downloads)
+            self._session = aiohttp.ClientSession(connector=connector, timeout=self.timeout)
+
+    async def close(self)-> None:
+        """
+        Close the underlying HTTP session.
+        """
+        if self._session is not None:
+            await self._session.close()
+            self._session = None
+
+    @staticmethod
+    def _record(endpoint: str, started: float, status: int, size: int)-> None:
+        registry = metrics.active
+        if registry is not None:
+            registry.observe("tiktok_request_seconds", perf_counter() - started, endpoint=endpoint)
+            registry.inc("tiktok_responses_total", endpoint=endpoint, status=str(status))
+            registry.inc("tiktok_response_bytes_total", size, endpoint=endpoint)
+
+    async def _get_content(self, template: RequestTemplate, values: dict, endpoint: str)-> bytes:
+        await self.open()
+        async with self._semaphore:
+            started = perf_counter()
+            async with self._session.get(f"{self.base_url}{template.path}", params=template.params(**values), headers=HEADERS) as response:
+                body = await response.read()
+                self._record(endpoint, started, response.status, len(body))
+                response.raise_for_status()
+                return body
+
+    async def _get_page(self, url: str, endpoint: str)-> tuple[str, requests.cookies.RequestsCookieJar]:
+        await self.open()
+        async with self._semaphore:
+            started = perf_counter()
+            async with self._session.get(url, headers=HEADERS) as response:
+                body = await response.read()
+                self._record(endpoint, started, response.status, len(body))
+                response.raise_for_status()
+                text = await response.text()
+                # Keep the same cookie type as the sync API for `get_original_video_header`
+                cookies = requests.cookies.cookiejar_from_dict({key: morsel.value for key, morsel in response.cookies.items()})
+                return text, cookies
+
+    async def get_replies(self, video_id: str, comment_id: str, msToken: str, maxcount: int = 20, cursor: int = 0)-> list[commentData]:
+        """
+        Fetch replies to a specific comment on a TikTok video.
+
+        :param video_id: The ID of the video.
+        :param comment_id: The ID of the comment to fetch replies for.
+        :param msToken: Authentication token required for the request.
+        :param maxcount: Maximum number of replies to fetch per request (default: 20).
+        :param cursor: Pagination cursor to start from (default: 0).
+        :return: A list of `commentData` objects containing the replies.
+        """
+        data_return: list[commentData] = []
+        try:
+            while cursor is not None:
+                content = await self._get_content(REPLY_TEMPLATE, _reply_values(video_id, comment_id, msToken, maxcount, cursor), "reply")
+                page, data = _decode_page(content, "reply")
+                if not page:
+                    break
+                data_return.extend(page)
+                cursor = _next_cursor(data, cursor, maxcount)
+
+        except aiohttp.ClientError as e:
+            logger.error("Request failed: %s", e, extra={"endpoint": "reply", "video_id": video_id, "comment_id": comment_id, "cursor": cursor})
+
+        except Exception as e:
+            logger.exception("An unexpected error occurred: %s", e, extra={"endpoint": "reply", "video_id": video_id, "comment_id": comment_id, "cursor": cursor})
+
+        return data_return
+
+    async def get_comments(self, url: str, msToken: str, maxcount: int = 20, cursor: int = 0)-> list[commentData]:
+        """
+        Fetches comments from a TikTok video, with their replies.
+
+        The replies of all the comments of a page are fetched concurrently.
+
+        :param url: The URL of the TikTok video.
+        :param msToken: A token required for authenticating the request.
+        :param maxcount: Maximum number of comments to fetch in one request (default: 20).
+        :param cursor: The starting point for fetching comments (default: 0).
+        :return: A list of `commentData` objects containing the comments data.
+        """
+        video_id = get_video_id(url)
+        data_return: list[commentData] = []
+        try:
+            while cursor is not None:
+                content = await self._get_content(COMMENT_TEMPLATE, _comment_values(video_id, msToken, maxcount, cursor), "comment")
+                page, data = _decode_page(content, "comment")
+                if not page:
+                    break
+
+                parents = [comment for comment in page if comment.reply_comment_total and comment.reply_comment_total >= 1]
+                replies = await asyncio.gather(*(self.get_replies(video_id, comment.cid, msToken) for comment in parents))
+                for comment, comment_replies in zip(parents, replies):
+                    comment.replies.extend(comment_replies)
+
+                data_return.extend(page)
+                cursor = _next_cursor(data, cursor, maxcount)
+
+        except aiohttp.ClientError as e:
+            logger.error("Request failed: %s", e, extra={"endpoint": "comment", "video_id": video_id, "cursor": cursor})
+
+        except Exception as e:
+            logger.exception("An unexpected error occurred: %s", e, extra={"endpoint": "comment", "video_id": video_id, "cursor": cursor})
+
+        return data_return
+
+    async def get_video_details(self, url: str)-> video_details:
+        """
+        Retrieves details about a TikTok video and its author.
+
+        :param url: The URL of the TikTok video.
+        :return: An instance of the `video_details` class containing the details of the video.
+        """
+        try:
+            text, _ = await self._get_page(url, "video")
+            video_details_ = _build_video_details(get_all_data_from_url(text))
+
+        except KeyError as key_err:
+            logger.error("Error extracting video details: %s", key_err, extra={"endpoint": "video", "url": url})
+            raise Exception("Failed to find necessary keys in data structure") from key_err
+
+        except Exception as e:
+            logger.error("An unexpected error occurred while retrieving video details: %s", e, extra={"endpoint": "video", "url": url})
+            raise Exception("Failed to retrieve video details") from e
+
+        return video_details_
+
+    async def get_user_info(self, url: str)-> user_information:
+        """
+        Retrieves detailed information about a TikTok user.
+
+        :param url: The URL of the TikTok user profile.
+        :return: An instance of the `user_information` class containing the user's details.
+        """
+        try:
+            text, _ = await self._get_page(url, "user")
+            user_info = _build_user_info(_extract_user_data(text))
+
+        except KeyError as key_err:
+            logger.error("Error extracting user details: %s", key_err, extra={"endpoint": "user", "url": url})
+            raise Exception("Failed to find necessary keys in data structure") from key_err
+
+        except Exception as e:
+            logger.error("An unexpected error occurred while retrieving user details: %s", e, extra={"endpoint": "user", "url": url})
+            raise Exception("Failed to retrieve user details") from e
+
+        return user_info
+
+    async def download_original_video(self, url: str, local_path=None)-> bool:
+        """
+        Downloads the original video from TikTok.
+
+        :param url: The URL of the TikTok video.
+        :param local_path: The local path where the video will be saved. If None, saves to the script's directory.
+        :return: True if the download is successful, False otherwise.
+        """
+        try:
+            text, cookies = await self._get_page(url, "video")
+            data = get_all_data_from_url(text)
+
+            file_path = _get_video_file_path(data["itemInfo"]["itemStruct"]["id"], local_path)
+            download_url = _get_download_url(data)
+            header = get_original_video_header(download_url, cookies, HEADERS["cookie"])
+
+            async with self._download_semaphore:
+                # The request slot is given back once the headers arrive, the body is read outside of it
+                async with self._semaphore:
+                    response = await self._session.get(download_url, headers=header)
+                try:
+                    if not response.ok:
+                        logger.error("Failed to download file: HTTP status code %d", response.status, extra={"endpoint": "download", "url": download_url})
+                        return False
+                    downloaded = 0
+                    part_path = f"{file_path}.part"
+                    try:
+                        # Write to a temporary file, `file_path` only ever holds complete downloads
+                        with open(part_path, "wb") as file:
+                            async for chunk in response.content.iter_chunked(self.chunk_size):
+                                file.write(chunk)
+                                downloaded += len(chunk)
+                        os.replace(part_path, file_path)
+                    except BaseException:
+                        if os.path.exists(part_path):
+                            os.remove(part_path)
+                        raise
+                    finally:
+                        registry = metrics.active
+                        if registry is not None:
+                            registry.inc("tiktok_response_bytes_total", downloaded, endpoint="download")
+                finally:
+                    response.release()
+
+        except Exception as e:
+            logger.error("An error occurred while downloading the video: %s", e, extra={"url": url})
+            return False
+
+        return True
@@ -0,0 +1 @@
+"""Benchmarks of the package, run them with `python -m <package>.benchmarks.<name>`."""
@@ -0,0 +1,51 @@
+"""
+Micro-benchmark of the decoding of comment pages.
+
+Compares `json.loads` + the extraction of every comment (what `response.json()` used to
+cost) with `_decode_page` on every installed JSON backend, with all the mapped fields and with a
+`fields` projection. Reports the time and the peak allocation per page.
+
+    python -m <package>.benchmarks.bench_decode [comments_per_page]
+"""
+import json
+import sys
+import tracemalloc
+from timeit import repeat
+from .. import decoding
+from ..comment import commentData, _decode_page
+from ..extractors import record_extractor
+from . import fixtures
+
+FIELDS = ("cid", "digg_count", "text")
+
+
+def measure(function, content: bytes, number: int = 200) -> tuple[float, int]:
+    seconds = min(repeat(lambda: function(content), number=number, repeat=3)) / number
+    tracemalloc.start()
+    function(content)
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return seconds, peak
+
+
+def main(count: int) -> None:
+    content = json.dumps(fixtures.comment_page(0, count, count, reply_total=lambda i: i % 3)).encode()
+    print(f"page of {count} comments ({len(content) / 1024:.0f} KB)")
+
+    extract = record_extractor("comments_path", commentData, None)
+    baseline, baseline_peak = measure(lambda body: [extract(item) for item in json.loads(body)["comments"]], content)
+    print(f"  json.loads + extraction: {baseline * 1e3:.3f} ms, {baseline_peak / 1024:.0f} KiB peak")
+
+    initial = decoding.get_backend()
+    try:
+        for backend in decoding.BACKENDS:
+            decoding.set_backend(backend)
+            for name, fields in (("all fields", None), (f"fields={list(FIELDS)}", FIELDS)):
+                seconds, peak = measure(lambda body: _decode_page(body, fields=fields), content)
+                print(f"  {backend:<8} {name:<36} {seconds * 1e3:.3f} ms, {peak / 1024:.0f} KiB peak, x{baseline / seconds:.1f}")
+    finally:
+        decoding.set_backend(initial)
+
+
+if __name__ == "__main__":
+    main(int(sys.argv[1]) if len(sys.argv) > 1 else 50)
@@ -0,0 +1,55 @@
+"""
+Memory and speed of the `cid` deduplication indexes.
+
+Adds `count` comment IDs to a `set` of strings, a `CidSet` and a `CidBloomFilter`, then
+looks up as many new IDs. Reports the memory held per ID, the time per operation and the
+false-positive rate of the Bloom filter.
+
+    python -m <package>.benchmarks.bench_dedup [count]
+"""
+import sys
+import tracemalloc
+from time import perf_counter
+from ..dedup import CidSet, CidBloomFilter
+
+ERROR_RATE = 0.001
+# Comment IDs are 19-digit numbers, close to each other
+FIRST = 7400000000000000000
+STEP = 13
+
+
+def fill(factory, count: int):
+    index = factory()
+    # The IDs are made here, the set keeps its strings, the indexes only their numbers
+    for i in range(count):
+        index.add(str(FIRST + i * STEP))
+    return index
+
+
+def measure(name: str, factory, count: int) -> None:
+    started = perf_counter()
+    index = fill(factory, count)
+    added = perf_counter() - started
+    started = perf_counter()
+    false_positives = sum(str(FIRST + i * STEP + 1) in index for i in range(count))
+    looked_up = perf_counter() - started
+    del index
+
+    # Measured apart, tracing the allocations slows everything down
+    tracemalloc.start()
+    index = fill(factory, count)
+    held, _ = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    print(f"  {name:<28} {held / count:6.1f} B/id, add {added / count * 1e6:.2f} us, "
+          f"lookup {looked_up / count * 1e6:.2f} us, false positives {false_positives / count:.4%}")
+
+
+def main(count: int) -> None:
+    print(f"{count} ids")
+    measure("set of str", set, count)
+    measure("CidSet", lambda: CidSet(capacity=count), count)
+    measure(f"CidBloomFilter ({ERROR_RATE:.1%})", lambda: CidBloomFilter(capacity=count, error_rate=ERROR_RATE), count)
+
+
+if __name__ == "__main__":
+    main(int(sys.argv[1]) if len(sys.argv) > 1 else 1_000_000)
@@ -0,0 +1,61 @@
+"""
+Micro-benchmark of the embedded JSON extraction of video and user pages.
+
+Compares the single-pass `functions.extract_embedded_json` with the previous
+trim-and-retry loop of `get_all_data_from_url`/`get_user_info`.
+
+    python -m <package>.benchmarks.bench_extract_json [saved_page.html ...]
+
+Without arguments the synthetic pages of `benchmarks.fixtures` are used.
+"""
+import json
+import sys
+from timeit import repeat
+from ..functions import extract_embedded_json
+from . import fixtures
+
+
+def legacy_extract(page_content: str, key: str) -> dict:
+    """
+    The extraction used before `extract_embedded_json`, kept here as the baseline.
+    """
+    marker = f'"{key}":'
+    data = page_content[page_content.find(marker):]
+    data = data[data.find(marker):data.find("</script>")].replace(marker, '')
+    while len(data) > 0:
+        try:
+            data = json.loads(data)
+            break
+        except:
+            data = data[:-1]
+    return data
+
+
+def best_time(function, *args, number: int) -> float:
+    return min(repeat(lambda: function(*args), number=number, repeat=3)) / number
+
+
+def main(paths: list[str]) -> None:
+    if paths:
+        pages = []
+        for path in paths:
+            with open(path, encoding="utf-8") as file:
+                content = file.read()
+            key = "webapp.user-detail" if '"webapp.user-detail":' in content else "webapp.video-detail"
+            pages.append((path, key, content))
+    else:
+        pages = [
+            ("synthetic video page", "webapp.video-detail", fixtures.video_page()),
+            ("synthetic user page", "webapp.user-detail", fixtures.user_page()),
+        ]
+
+    for name, key, content in pages:
+        assert legacy_extract(content, key) == extract_embedded_json(content, key)
+        legacy = best_time(legacy_extract, content, key, number=1)
+        single_pass = best_time(extract_embedded_json, content, key, number=100)
+        print(f"{name} ({len(content) / 1024:.0f} KB): legacy {legacy * 1e3:.2f} ms, "
+              f"raw_decode {single_pass * 1e3:.3f} ms, x{legacy / single_pass:.0f}")
+
+
+if __name__ == "__main__":
+    main(sys.argv[1:])
@@ -0,0 +1,62 @@
+"""
+Cold import time of the package, measured with `python -X importtime` in fresh interpreters.
+
+Compares the lazy `import` of the package with the import of everything it exports (what
+`import` used to cost), and with what a comment crawl actually needs. Also checks that
+loading the path mappings does not import `yaml`.
+
+    python -m <package>.benchmarks.bench_import [runs]
+"""
+import os
+import re
+import subprocess
+import sys
+from statistics import median
+
+PACKAGE = __package__.rsplit(".", 1)[0]
+ROOT = os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+STATEMENTS = {
+    "import package (lazy)": f"import {PACKAGE}",
+    "import package + every export (eager)": f"import {PACKAGE}; [getattr({PACKAGE}, name) for name in {PACKAGE}.__all__]",
+    "from package.comment import get_comments": f"from {PACKAGE}.comment import get_comments",
+}
+
+_LINE = re.compile(r"import time:\s+(\d+) \|\s+(\d+) \|(\s*)(\S+)")
+
+
+def import_time(statement: str) -> float:
+    """
+    :return: The cumulative import time of the top-level modules imported by `statement`, in seconds.
+    """
+    result = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", statement],
+        cwd=ROOT, env={**os.environ, "PYTHONPATH": ROOT}, capture_output=True, text=True, check=True,
+    )
+    total = 0
+    for line in result.stderr.splitlines():
+        match = _LINE.match(line)
+        # Only the top-level imports, their cumulative time includes the nested ones
+        if match and len(match.group(3)) == 1:
+            total += int(match.group(2))
+    return total / 1e6
+
+
+def main(runs: int) -> None:
+    # The modules imported by the interpreter itself at startup are not ours
+    startup = median(import_time("pass") for _ in range(runs))
+    for name, statement in STATEMENTS.items():
+        seconds = median(import_time(statement) for _ in range(runs)) - startup
+        print(f"{name:<42} {seconds * 1e3:8.1f} ms")
+
+    check = (
+        f"import sys; from {PACKAGE}.extractors import load_mapping; "
+        "[load_mapping(name) for name in ('comments_path', 'video_details_path', 'user_info_path')]; "
+        "print('yaml' in sys.modules)"
+    )
+    output = subprocess.run([sys.executable, "-c", check], cwd=ROOT, env={**os.environ, "PYTHONPATH": ROOT}, capture_output=True, text=True, check=True).stdout
+    print(f"yaml imported when loading the mappings: {output.strip()}")
+
+
+if __name__ == "__main__":
+    main(int(sys.argv[1]) if len(sys.argv) > 1 else 5)
@@ -0,0 +1,63 @@
+"""
+Memory footprint of the comment records.
+
+Reports the bytes retained per comment by the slotted, interned `commentData` and by the
+previous `__dict__` based record, kept here as the baseline.
+
+    python -m <package>.benchmarks.bench_memory [number_of_comments]
+"""
+import gc
+import json
+import sys
+import tracemalloc
+from ..comment import _decode_page
+from . import fixtures
+
+
+class legacy_commentData:
+    """
+    `commentData` before slots: one `__dict__` and one reply list per record.
+    """
+    def __init__(self):
+        self.replies = []
+
+
+def legacy_parse(content: bytes) -> list[legacy_commentData]:
+    data = json.loads(content)
+    page = []
+    for item in data["comments"]:
+        obj = legacy_commentData()
+        for key in ("author_pin", "aweme_id", "cid", "collect_stat", "comment_language", "create_time", "digg_count", "reply_comment_total", "text"):
+            setattr(obj, key, item[key])
+        obj.author_id = item["user"]["uid"]
+        page.append(obj)
+    return page
+
+
+def bytes_per_comment(parse, total: int, page_size: int = 50) -> float:
+    """
+    Parse `total` comments page by page and measure the memory retained by the records only.
+    """
+    records = []
+    gc.collect()
+    tracemalloc.start()
+    start, _ = tracemalloc.get_traced_memory()
+    for cursor in range(0, total, page_size):
+        # The page is built inside the traced window but dropped right away, as after a request
+        records.extend(parse(json.dumps(fixtures.comment_page(cursor, page_size, total)).encode()))
+    gc.collect()
+    end, _ = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    assert len(records) == total
+    return (end - start) / total
+
+
+def main(total: int) -> None:
+    legacy = bytes_per_comment(legacy_parse, total)
+    slotted = bytes_per_comment(lambda content: _decode_page(content)[0], total)
+    print(f"{total} comments: legacy {legacy:.0f} B/comment, slotted {slotted:.0f} B/comment "
+          f"({(1 - slotted / legacy) * 100:.0f}% less)")
+
+
+if __name__ == "__main__":
+    main(int(sys.argv[1]) if len(sys.argv) > 1 else 100_000)
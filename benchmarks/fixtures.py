@@ -0,0 +1,185 @@
+"""
+Synthetic TikTok pages used by the benchmarks.
+
+The pages mimic the layout of the real ones: a single `__UNIVERSAL_DATA_FOR_REHYDRATION__`
+script holding every `webapp.*` scope, the scope we are looking for being followed by
+other (large) scopes before the closing `</script>`.
+"""
+import json
+from random import Random
+
+
+def _padding_scope(rng: Random, size: int) -> dict:
+    """
+    A scope of roughly `size` bytes of unrelated data, like `webapp.app-context` or `seo.abtest`.
+    """
+    items = []
+    while size > 0:
+        item = {
+            "id": str(rng.randint(10**18, 10**19)),
+            "url": f"https://p16-sign.tiktokcdn.com/obj/{rng.getrandbits(128):032x}.jpeg",
+            "label": "".join(rng.choice("abcdefghijklmnopqrstuvwxyz ") for _ in range(40)),
+            "flags": [rng.random() > 0.5 for _ in range(8)],
+        }
+        size -= len(json.dumps(item))
+        items.append(item)
+    return {"items": items}
+
+
+def video_detail(video_id: str = "7393238409348713736", rng: Random | None = None) -> dict:
+    """
+    The `webapp.video-detail` scope of a video page.
+    """
+    rng = rng or Random(0)
+    return {
+        "itemInfo": {
+            "itemStruct": {
+                "id": video_id,
+                "desc": "a video #fyp #tiktok",
+                "createTime": 1723306588,
+                "locationCreated": "VN",
+                "textExtra": [{"hashtagName": "fyp", "start": 8, "end": 12}, {"hashtagName": "tiktok", "start": 13, "end": 20}],
+                "video": {
+                    "id": video_id,
+                    "duration": 42,
+                    "width": 576,
+                    "height": 1024,
+                    "playAddr": f"https://v16-webapp-prime.tiktok.com/video/tos/{video_id}.mp4",
+                    "bitrateInfo": [_padding_scope(rng, 2000) for _ in range(4)],
+                },
+                "author": {"id": "6800000000000000000", "uniqueId": "someone", "nickname": "Someone", "secUid": "MS4wLjABAAAA" + "x" * 52},
+                "stats": {"diggCount": 1200, "shareCount": 30, "commentCount": 4500, "playCount": 90000, "collectCount": 77},
+            }
+        },
+        "statusCode": 0,
+    }
+
+
+def user_detail(user_id: str = "6800000000000000000") -> dict:
+    """
+    The `webapp.user-detail` scope of a user page.
+    """
+    return {
+        "userInfo": {
+            "user": {
+                "id": user_id,
+                "uniqueId": "someone",
+                "nickname": "Someone",
+                "signature": "hello",
+                "secUid": "MS4wLjABAAAA" + "x" * 52,
+                "createTime": 1600000000,
+                "nickNameModifyTime": 1700000000,
+                "verified": False,
+                "secret": False,
+                "privateAccount": False,
+                "language": "vi",
+                "region": "VN",
+            },
+            "stats": {"followerCount": 10, "followingCount": 20, "heartCount": 30, "videoCount": 40, "diggCount": 50, "friendCount": 60},
+        },
+        "statusCode": 0,
+    }
+
+
+def page(scope: str, value: dict, size: int = 400_000, trailing: int = 5_000, seed: int = 0) -> str:
+    """
+    Build a page whose hydration script holds `value` under `scope`, padded to about `size` bytes.
+
+    `trailing` bytes of the padding are placed after the scope, in the same script:
+    that is what the old trim-and-retry parser had to chop one character at a time.
+    """
+    rng = Random(seed)
+    universal = {
+        "__DEFAULT_SCOPE__": {
+            "webapp.app-context": _padding_scope(rng, size - trailing),
+            scope: value,
+            "seo.abtest": _padding_scope(rng, trailing),
+        }
+    }
+    return (
+        "<!DOCTYPE html><html><head><title>TikTok</title></head><body>"
+        '<script id="__UNIVERSAL_DATA_FOR_REHYDRATION__" type="application/json">'
+        f"{json.dumps(universal, separators=(',', ':'))}"
+        "</script></body></html>"
+    )
+
+
+def video_page(video_id: str = "7393238409348713736", size: int = 400_000) -> str:
+    return page("webapp.video-detail", video_detail(video_id), size=size)
+
+
+def user_page(user_id: str = "6800000000000000000", size: int = 400_000) -> str:
+    return page("webapp.user-detail", user_detail(user_id), size=size)
+
+
+def comment(index: int, aweme_id: str = "7393238409348713736", reply_total: int = 0, parent: str | None = None, rng: Random | None = None) -> dict:
+    """
+    One item of the `comments` list of `/api/comment/list/` and `/api/comment/list/reply/`.
+    """
+    rng = rng or Random(index)
+    cid = str(7400000000000000000 + index) if parent is None else f"{parent}{index:04d}"
+    return {
+        "cid": cid,
+        "aweme_id": aweme_id,
+        "author_pin": False,
+        "collect_stat": 0,
+        "comment_language": rng.choice(("en", "vi", "ja", "es", "un")),
+        "create_time": 1723306588 + index * 7,
+        "digg_count": rng.randint(0, 5000),
+        "reply_comment_total": reply_total,
+        "reply_id": "0" if parent is None else parent,
+        "text": " ".join(rng.choice(("so", "good", "lol", "this", "is", "amazing", "wow", "the", "best")) for _ in range(rng.randint(3, 25))),
+        "share_info": {"acl": {"code": 0, "extra": "{}"}, "desc": "", "title": "", "url": f"https://www.tiktok.com/@someone/video/{aweme_id}?share_comment_id={cid}"},
+        "user": {
+            "uid": str(6800000000000000000 + rng.randint(0, 10**12)),
+            "nickname": f"user{rng.randint(0, 10**6)}",
+            "avatar_thumb": {"uri": f"{rng.getrandbits(64):016x}", "url_list": [f"https://p16-sign.tiktokcdn.com/{rng.getrandbits(64):016x}~tplv-100x100.webp" for _ in range(3)]},
+            "sec_uid": "MS4wLjABAAAA" + f"{rng.getrandbits(200):050x}",
+        },
+    }
+
+
+def comment_page(cursor: int, count: int, total: int, aweme_id: str = "7393238409348713736", reply_total=lambda index: 0, parent: str | None = None) -> dict:
+    """
+    One page of `/api/comment/list/` (or of `/api/comment/list/reply/` when `parent` is given).
+
+    :param reply_total: Function giving the `reply_comment_total` of the comment at an index.
+    """
+    indexes = range(cursor, min(cursor + count, total))
+    return {
+        "comments": [comment(i, aweme_id, reply_total(i), parent) for i in indexes] or None,
+        "cursor": cursor + len(indexes),
+        "has_more": int(cursor + count < total),
+        "total": total,
+        "status_code": 0,
+    }
+
+
+def user_post_page(cursor: int, count: int, total: int, newest: int = 1723306588, spacing: int = 86400, pinned: int = 0) -> dict:
+    """
+    One page of `/api/post/item_list/`: the `total` videos of a user, newest first, one every
+    `spacing` seconds. `cursor` is a `createTime` in milliseconds, the page holds the videos
+    created before it (all of them from 0).
+
+    :param pinned: Number of the oldest videos also listed, pinned, at the top of the first page.
+    """
+    created = lambda index: newest - index * spacing
+    behind = newest * 1000 - cursor
+    start = 0 if cursor == 0 or behind < 0 else behind // (spacing * 1000) + 1
+    indexes = range(start, min(start + count, total))
+
+    def item(index: int, is_pinned: bool = False) -> dict:
+        value = video_detail(str(7300000000000000000 + total - index))["itemInfo"]["itemStruct"]
+        value["createTime"] = created(index)
+        if is_pinned:
+            value["isPinnedItem"] = True
+        return value
+
+    items = [item(index, True) for index in range(max(total - pinned, 0), total)] if cursor == 0 else []
+    items.extend(item(index) for index in indexes)
+    return {
+        "itemList": items,
+        "cursor": str(created(indexes[-1]) * 1000) if indexes else str(cursor),
+        "hasMore": start + count < total,
+        "statusCode": 0,
+    }
@@ -0,0 +1,202 @@
+"""
+Local stand-in for the TikTok endpoints used by the package, for offline benchmarks.
+
+Serves:
+
+- `/@<user>/video/<id>`: a video page built by `fixtures.video_page`, whose `playAddr`
+  points to `/media/<id>.mp4` on the same server,
+- `/@<user>`: a user page built by `fixtures.user_page`,
+- `/api/comment/list/` and `/api/comment/list/reply/`: paginated comment JSON,
+- `/api/post/item_list/`: the paginated videos of the user,
+- `/media/<id>.mp4`: a video file of `file_size` bytes, with `Range` support.
+
+Latency and errors (503, or an empty 200 body on the comment APIs, like TikTok's
+throttling) can be injected.
+
+    with MockTikTokServer(comments=5000, latency=0.005) as server:
+        client = TikTokClient(base_url=server.url)
+        get_comments(server.video_url("7000000000000000000"), "token", client=client)
+"""
+import json
+import re
+import threading
+from random import Random
+from time import sleep
+from http.server import ThreadingHTTPServer, BaseHTTPRequestHandler
+from urllib.parse import urlsplit, parse_qs
+from . import fixtures
+
+
+class MockTikTokServer:
+    def __init__(self, comments: int = 1000, replies: int = 3, reply_every: int = 10, videos: int = 100, pinned: int = 0, file_size: int = 8 << 20, page_size: int = 400_000, latency: float = 0.0, error_rate: float = 0.0, throttle_rate: float = 0.0, seed: int = 0):
+        """
+        :param comments: Number of top-level comments of every video.
+        :param replies: Number of replies of the comments that have replies.
+        :param reply_every: One comment out of `reply_every` has replies.
+        :param videos: Number of videos of the user, one per day.
+        :param pinned: Number of the oldest videos also pinned at the top of the list.
+        :param file_size: Size of the served video files, in bytes.
+        :param page_size: Approximate size of the video and user pages, in bytes.
+        :param latency: Delay added before every response, in seconds.
+        :param error_rate: Probability of answering 503.
+        :param throttle_rate: Probability of answering an empty 200 body on the comment APIs.
+        :param seed: Seed of the error injection.
+        """
+        self.comments = comments
+        self.replies = replies
+        self.reply_every = reply_every
+        self.videos = videos
+        self.pinned = pinned
+        self.file_size = file_size
+        self.page_size = page_size
+        self.latency = latency
+        self.error_rate = error_rate
+        self.throttle_rate = throttle_rate
+        self.requests: dict[str, int] = {}
+        self.max_in_flight: dict[str, int] = {}        # Highest number of concurrent requests seen per route
+
+        self._in_flight: dict[str, int] = {}
+
+        self._random = Random(seed)
+        self._lock = threading.Lock()
+        self._pages: dict[tuple[str, str], bytes] = {}
+        self._file = bytes(Random(seed).getrandbits(8) for _ in range(min(file_size, 1 << 16)))
+        self._server: ThreadingHTTPServer | None = None
+
+    def __enter__(self):
+        self.start()
+        return self
+
+    def __exit__(self, *exc_info):
+        self.stop()
+
+    @property
+    def url(self)-> str:
+        return f"http://127.0.0.1:{self._server.server_port}"
+
+    def video_url(self, video_id: str)-> str:
+        return f"{self.url}/@someone/video/{video_id}"
+
+    def user_url(self, user: str = "someone")-> str:
+        return f"{self.url}/@{user}"
+
+    def start(self)-> None:
+        server = self
+
+        class handler(BaseHTTPRequestHandler):
+            protocol_version = "HTTP/1.1"
+            # Keep-alive connections: send headers and body in one go, without Nagle delays
+            disable_nagle_algorithm = True
+            wbufsize = -1
+
+            def log_message(self, *args):
+                pass
+
+            def do_GET(self):
+                server._handle(self)
+
+        self._server = ThreadingHTTPServer(("127.0.0.1", 0), handler)
+        self._server.daemon_threads = True
+        threading.Thread(target=self._server.serve_forever, daemon=True).start()
+
+    def stop(self)-> None:
+        if self._server is not None:
+            self._server.shutdown()
+            self._server.server_close()
+            self._server = None
+
+    def file_bytes(self, start: int, end: int)-> bytes:
+        """
+        The bytes `start..end` (inclusive) of the served video files.
+        """
+        block = self._file
+        first, last = start // len(block), end // len(block)
+        data = b"".join(block for _ in range(last - first + 1))
+        offset = start - first * len(block)
+        return data[offset:offset + end - start + 1]
+
+    def _enter(self, route: str)-> None:
+        with self._lock:
+            self.requests[route] = self.requests.get(route, 0) + 1
+            in_flight = self._in_flight.get(route, 0) + 1
+            self._in_flight[route] = in_flight
+            self.max_in_flight[route] = max(self.max_in_flight.get(route, 0), in_flight)
+
+    def _leave(self, route: str)-> None:
+        with self._lock:
+            self._in_flight[route] -= 1
+
+    def _draw(self)-> float:
+        with self._lock:
+            return self._random.random()
+
+    def _page(self, kind: str, key: str)-> bytes:
+        page = self._pages.get((kind, key))
+        if page is None:
+            if kind == "video":
+                detail = fixtures.video_detail(key)
+                detail["itemInfo"]["itemStruct"]["video"]["playAddr"] = f"{self.url}/media/{key}.mp4"
+                detail["itemInfo"]["itemStruct"]["stats"]["commentCount"] = self.comments
+                page = fixtures.page("webapp.video-detail", detail, size=self.page_size).encode()
+            else:
+                page = fixtures.user_page(size=self.page_size).encode()
+            self._pages[(kind, key)] = page
+        return page
+
+    def _send(self, request: BaseHTTPRequestHandler, status: int, body: bytes, content_type: str, headers: dict | None = None)-> None:
+        request.send_response(status)
+        request.send_header("Content-Type", content_type)
+        request.send_header("Content-Length", str(len(body)))
+        for key, value in (headers or {}).items():
+            request.send_header(key, value)
+        request.end_headers()
+        request.wfile.write(body)
+
+    def _handle(self, request: BaseHTTPRequestHandler)-> None:
+        parts = urlsplit(request.path)
+        path = parts.path
+        query = {key: values[-1] for key, values in parse_qs(parts.query).items()}
+        is_api = path.startswith("/api/comment/list/")
+        route = "reply" if path.endswith("/reply/") else "comment" if is_api else "post" if path.startswith("/api/post/item_list/") else "media" if path.startswith("/media/") else "video" if "/video/" in path else "user"
+        self._enter(route)
+        try:
+            self._respond(request, route, path, query, is_api)
+        finally:
+            self._leave(route)
+
+    def _respond(self, request: BaseHTTPRequestHandler, route: str, path: str, query: dict, is_api: bool)-> None:
+        if self.latency:
+            sleep(self.latency)
+        if self.error_rate and self._draw() < self.error_rate:
+            return self._send(request, 503, b"", "text/plain")
+        if is_api and self.throttle_rate and self._draw() < self.throttle_rate:
+            return self._send(request, 200, b"", "application/json")
+
+        if route == "comment":
+            cursor, count = int(query["cursor"]), int(query["count"])
+            every, replies = self.reply_every, self.replies
+            page = fixtures.comment_page(cursor, count, self.comments, query["aweme_id"], lambda i: replies if i % every == 0 else 0)
+            return self._send(request, 200, json.dumps(page).encode(), "application/json")
+
+        if route == "reply":
+            cursor, count = int(query["cursor"]), int(query["count"])
+            page = fixtures.comment_page(cursor, count, self.replies, query["item_id"], parent=query["comment_id"])
+            return self._send(request, 200, json.dumps(page).encode(), "application/json")
+
+        if route == "post":
+            page = fixtures.user_post_page(int(query["cursor"]), int(query["count"]), self.videos, pinned=self.pinned)
+            return self._send(request, 200, json.dumps(page).encode(), "application/json")
+
+        if route == "media":
+            match = re.match(r"bytes=(\d+)-(\d*)", request.headers.get("range", ""))
+            if match:
+                start = int(match.group(1))
+                end = min(int(match.group(2)) if match.group(2) else self.file_size - 1, self.file_size - 1)
+                headers = {"Content-Range": f"bytes {start}-{end}/{self.file_size}", "Accept-Ranges": "bytes"}
+                return self._send(request, 206, self.file_bytes(start, end), "video/mp4", headers)
+            return self._send(request, 200, self.file_bytes(0, self.file_size - 1), "video/mp4", {"Accept-Ranges": "bytes"})
+
+        if route == "video":
+            return self._send(request, 200, self._page("video", path.rsplit("/", 1)[-1]), "text/html")
+
+        return self._send(request, 200, self._page("user", path.strip("/")), "text/html")
@@ -0,0 +1,187 @@
+"""
+Offline benchmark suite, run against `mock_server.MockTikTokServer`.
+
+    python -m <package>.benchmarks.run [--output report.json] [--latency 0.002] [--comments 5000]
+
+Measures:
+
+- `comments`: pages per second of `get_comments` (comment and reply pages),
+- `video_details`: end-to-end latency of `get_video_details`,
+- `parse`: time of `get_all_data_from_url` on a video page,
+- `download`: throughput of `download_file`, single stream and segmented,
+- `memory`: peak memory of `get_comments`, scaled to 100k comments (the mock server runs in
+  the same process, its transient page buffers are included).
+- `aggregates`: peak memory of the top 10 by `digg_count` and the counts per language,
+  from the materialized comments and from the streaming aggregates.
+
+The results are written as JSON, to compare runs and catch regressions. With `--metrics`,
+the instrumentation of the package is enabled and its metrics are added to the report.
+"""
+import argparse
+import json
+import os
+import platform
+import sys
+import tempfile
+import tracemalloc
+from collections import Counter
+from statistics import median, quantiles
+from time import perf_counter, time
+from timeit import repeat
+from ..__version__ import __version__
+from ..client import TikTokClient
+from ..aggregates import TopK, GroupCounter, aggregate
+from ..comment import get_comments, iter_comments
+from ..metrics import enable_metrics, disable_metrics
+from ..video import get_all_data_from_url, get_video_details, download_file
+from . import fixtures
+from .mock_server import MockTikTokServer
+
+VIDEO_ID = "7393238409348713736"
+
+
+def bench_comments(args) -> dict:
+    with MockTikTokServer(comments=args.comments, latency=args.latency) as server:
+        client = TikTokClient(base_url=server.url, pool_maxsize=args.workers + args.page_workers)
+        started = perf_counter()
+        comments = get_comments(server.video_url(VIDEO_ID), "token", client=client, reply_workers=args.workers, page_workers=args.page_workers)
+        seconds = perf_counter() - started
+        pages = server.requests.get("comment", 0) + server.requests.get("reply", 0)
+    return {
+        "comments": len(comments),
+        "replies": sum(len(comment) for comment in comments),
+        "pages": pages,
+        "seconds": seconds,
+        "pages_per_second": pages / seconds,
+    }
+
+
+def bench_video_details(args) -> dict:
+    with MockTikTokServer(latency=args.latency) as server:
+        client = TikTokClient(base_url=server.url)
+        url = server.video_url(VIDEO_ID)
+        # Warm up the server page cache and the connection
+        get_video_details(url, client=client)
+        latencies = []
+        for _ in range(args.repeat):
+            started = perf_counter()
+            get_video_details(url, client=client)
+            latencies.append(perf_counter() - started)
+    return {
+        "calls": len(latencies),
+        "mean_seconds": sum(latencies) / len(latencies),
+        "p50_seconds": median(latencies),
+        "p95_seconds": quantiles(latencies, n=20)[-1] if len(latencies) > 1 else latencies[0],
+    }
+
+
+def bench_parse(args) -> dict:
+    page = fixtures.video_page(VIDEO_ID)
+    seconds = min(repeat(lambda: get_all_data_from_url(page), number=args.repeat, repeat=3)) / args.repeat
+    return {"page_bytes": len(page), "seconds": seconds}
+
+
+def bench_download(args) -> dict:
+    results = {}
+    with MockTikTokServer(file_size=args.file_size, latency=args.latency) as server, tempfile.TemporaryDirectory() as directory:
+        client = TikTokClient(base_url=server.url, pool_maxsize=8)
+        url = f"{server.url}/media/{VIDEO_ID}.mp4"
+        for name, segments in (("single", 1), ("segmented", 4)):
+            path = os.path.join(directory, f"{name}.mp4")
+            stats = download_file(url, {}, path, client=client, segments=segments, chunk_size=1 << 16)
+            results[name] = {"ok": stats.ok, "bytes": stats.downloaded, "seconds": stats.seconds, "bytes_per_second": stats.bandwidth}
+    return results
+
+
+def bench_memory(args) -> dict:
+    with MockTikTokServer(comments=args.memory_comments) as server:
+        client = TikTokClient(base_url=server.url)
+        tracemalloc.start()
+        comments = get_comments(server.video_url(VIDEO_ID), "token", maxcount=50, client=client)
+        _, peak = tracemalloc.get_traced_memory()
+        tracemalloc.stop()
+    return {
+        "comments": len(comments),
+        "peak_bytes": peak,
+        "peak_bytes_per_100k_comments": peak * 100_000 / max(len(comments), 1),
+    }
+
+
+def bench_aggregates(args) -> dict:
+    report = {}
+    with MockTikTokServer(comments=args.memory_comments) as server:
+        client = TikTokClient(base_url=server.url)
+        url = server.video_url(VIDEO_ID)
+
+        tracemalloc.start()
+        comments = get_comments(url, "token", maxcount=50, client=client)
+        top = sorted(comments, key=lambda comment: comment.digg_count, reverse=True)[:10]
+        languages = Counter(comment.comment_language for comment in comments)
+        _, report["materialized_peak_bytes"] = tracemalloc.get_traced_memory()
+        tracemalloc.stop()
+        del comments
+
+        tracemalloc.start()
+        streamed_top, streamed_languages = TopK(10, "digg_count", scope="comments"), GroupCounter("comment_language", scope="comments")
+        for _ in aggregate(iter_comments(url, "token", maxcount=50, client=client), streamed_top, streamed_languages):
+            pass
+        _, report["streamed_peak_bytes"] = tracemalloc.get_traced_memory()
+        tracemalloc.stop()
+
+    report["same_result"] = ([comment.cid for comment in top] == [comment.cid for comment in streamed_top.result()]
+                             and dict(languages) == streamed_languages.result())
+    return report
+
+
+BENCHMARKS = {
+    "comments": bench_comments,
+    "video_details": bench_video_details,
+    "parse": bench_parse,
+    "download": bench_download,
+    "memory": bench_memory,
+    "aggregates": bench_aggregates,
+}
+
+
+def main(argv: list[str]) -> dict:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--output", help="Path of the JSON report, printed if not given")
+    parser.add_argument("--only", nargs="*", choices=sorted(BENCHMARKS), help="Benchmarks to run, all by default")
+    parser.add_argument("--latency", type=float, default=0.0, help="Latency added by the mock server, in seconds")
+    parser.add_argument("--comments", type=int, default=2000, help="Number of comments of the crawled video")
+    parser.add_argument("--memory-comments", type=int, default=20000, help="Number of comments of the memory benchmark")
+    parser.add_argument("--workers", type=int, default=4, help="Reply workers of the comment crawl")
+    parser.add_argument("--page-workers", type=int, default=1, help="Comment page workers of the comment crawl, above 1 the pages are planned")
+    parser.add_argument("--file-size", type=int, default=32 << 20, help="Size of the downloaded file, in bytes")
+    parser.add_argument("--repeat", type=int, default=50, help="Number of calls of the latency and parse benchmarks")
+    parser.add_argument("--metrics", action="store_true", help="Enable the instrumentation and report its metrics")
+    args = parser.parse_args(argv)
+
+    report = {
+        "package_version": __version__,
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "timestamp": time(),
+        "settings": {key: value for key, value in vars(args).items() if key not in ("output", "only")},
+        "results": {},
+    }
+    registry = enable_metrics() if args.metrics else None
+    try:
+        for name in args.only or BENCHMARKS:
+            report["results"][name] = BENCHMARKS[name](args)
+    finally:
+        disable_metrics()
+    if registry is not None:
+        report["metrics"] = registry.snapshot()
+
+    text = json.dumps(report, indent=2)
+    if args.output:
+        with open(args.output, "w") as file:
+            file.write(text)
+    else:
+        print(text)
+    return report
+
+
+if __name__ == "__main__":
+    main(sys.argv[1:])
@@ -0,0 +1,157 @@
+import json
+import sqlite3
+from time import time
+from threading import Lock
+from urllib.parse import urlsplit
+from .functions import get_video_id
+
+
+class ResponseCache:
+    """
+    On-disk cache of the JSON data extracted from the video and user pages.
+
+    Entries are stored in a SQLite file, keyed by endpoint (`video`, `user`) and by video ID
+    or user name, so a repeat lookup skips both the network and the parse. Each endpoint has
+    its own time to live, and the least recently used entries are evicted once the cache
+    grows over `max_bytes`.
+
+    Usage:
+
+        client = TikTokClient(cache=ResponseCache("tiktok_cache.sqlite", ttl={"video": 600, "user": 300}))
+        details = get_video_details(url, client=client)
+    """
+    DEFAULT_TTL = {"video": 300.0, "user": 300.0}
+
+    def __init__(self, path: str = ":memory:", ttl: dict[str, float] | float | None = None, max_bytes: int = 256 << 20):
+        """
+        :param path: The path of the SQLite file. Defaults to an in-memory database.
+        :param ttl: Time to live of the entries in seconds, per endpoint or for all of them.
+        :param max_bytes: Maximum size of the stored values before the least recently used are evicted.
+        """
+        if isinstance(ttl, (int, float)):
+            self.ttl = {endpoint: float(ttl) for endpoint in self.DEFAULT_TTL}
+            self.default_ttl = float(ttl)
+        else:
+            self.ttl = {**self.DEFAULT_TTL, **(ttl or {})}
+            self.default_ttl = max(self.ttl.values())
+        self.max_bytes = max_bytes
+        self.hits: dict[str, int] = {}
+        self.misses: dict[str, int] = {}
+
+        self._lock = Lock()
+        self._connection = sqlite3.connect(path, check_same_thread=False, isolation_level=None)
+        self._connection.execute("PRAGMA journal_mode=WAL")
+        self._connection.execute(
+            "CREATE TABLE IF NOT EXISTS entries ("
+            "endpoint TEXT NOT NULL, key TEXT NOT NULL, value TEXT NOT NULL, size INTEGER NOT NULL, "
+            "stored_at REAL NOT NULL, accessed_at REAL NOT NULL, PRIMARY KEY (endpoint, key))"
+        )
+        self._connection.execute("CREATE INDEX IF NOT EXISTS entries_accessed_at ON entries (accessed_at)")
+        self._size = self._connection.execute("SELECT COALESCE(SUM(size), 0) FROM entries").fetchone()[0]
+
+    def __repr__(self)-> str:
+        return f"<ResponseCache (entries={len(self)},bytes={self._size},hits={sum(self.hits.values())},misses={sum(self.misses.values())})>"
+
+    def __len__(self):
+        with self._lock:
+            return self._connection.execute("SELECT COUNT(*) FROM entries").fetchone()[0]
+
+    def get(self, endpoint: str, key: str) -> any:
+        """
+        :return: The cached value, or None if it is missing or expired.
+        """
+        now = time()
+        with self._lock:
+            row = self._connection.execute("SELECT value, stored_at FROM entries WHERE endpoint = ? AND key = ?", (endpoint, key)).fetchone()
+            if row is None or now - row[1] > self.ttl.get(endpoint, self.default_ttl):
+                self.misses[endpoint] = self.misses.get(endpoint, 0) + 1
+                return None
+            self._connection.execute("UPDATE entries SET accessed_at = ? WHERE endpoint = ? AND key = ?", (now, endpoint, key))
+            self.hits[endpoint] = self.hits.get(endpoint, 0) + 1
+        return json.loads(row[0])
+
+    def set(self, endpoint: str, key: str, value: any)-> None:
+        """
+        Store a value, evicting the least recently used entries if the cache is full.
+        """
+        text = json.dumps(value, separators=(",", ":"))
+        now = time()
+        with self._lock:
+            connection = self._connection
+            previous = connection.execute("SELECT size FROM entries WHERE endpoint = ? AND key = ?", (endpoint, key)).fetchone()
+            connection.execute("INSERT OR REPLACE INTO entries VALUES (?, ?, ?, ?, ?, ?)", (endpoint, key, text, len(text), now, now))
+            self._size += len(text) - (previous[0] if previous else 0)
+
+            while self._size > self.max_bytes:
+                oldest = connection.execute("SELECT endpoint, key, size FROM entries ORDER BY accessed_at LIMIT 64").fetchall()
+                if not oldest:
+                    break
+                for old_endpoint, old_key, size in oldest:
+                    connection.execute("DELETE FROM entries WHERE endpoint = ? AND key = ?", (old_endpoint, old_key))
+                    self._size -= size
+                    if self._size <= self.max_bytes:
+                        break
+
+    def clear(self)-> None:
+        with self._lock:
+            self._connection.execute("DELETE FROM entries")
+            self._size = 0
+
+    def close(self)-> None:
+        self._connection.close()
+
+    def stats(self)-> dict:
+        """
+        :return: The hit/miss counters per endpoint, the number of entries and their size.
+        """
+        return {"hits": dict(self.hits), "misses": dict(self.misses), "entries": len(self), "bytes": self._size}
+
+
+def _normalize_url(url: str)-> str:
+    parts = urlsplit(url)
+    return f"{parts.netloc.lower()}{parts.path.rstrip('/')}"
+
+
+def video_key(url: str)-> str:
+    """
+    The cache key of a video page: its video ID, or the URL without query string.
+    """
+    try:
+        return get_video_id(url)
+    except IndexError:
+        return _normalize_url(url)
+
+
+def user_key(url: str)-> str:
+    """
+    The cache key of a user page: the lowercased `@name`, or the URL without query string.
+    """
+    for segment in urlsplit(url).path.split("/"):
+        if segment.startswith("@"):
+            return segment.lower()
+    return _normalize_url(url)
+
+
+def fetch_page_data(client, endpoint: str, key: str, url: str, extract) -> any:
+    """
+    Return the data extracted from a page, through the cache of the client if it has one.
+
+    :param client: The `TikTokClient` used on a cache miss.
+    :param endpoint: The cache endpoint, `video` or `user`.
+    :param key: The cache key of the page.
+    :param url: The URL of the page.
+    :param extract: The function extracting the data from the page content.
+    :return: The extracted data.
+    """
+    cache: ResponseCache | None = client.cache
+    if cache is not None:
+        data = cache.get(endpoint, key)
+        if data is not None:
+            return data
+
+    response = client.get(url, endpoint=endpoint)
+    data = extract(response.text)
+
+    if cache is not None:
+        cache.set(endpoint, key, data)
+    return data
@@ -0,0 +1,132 @@
+import requests
+from threading import Lock
+from time import perf_counter
+from requests.adapters import HTTPAdapter
+from . import metrics
+from .templates import HEADERS
+from .scheduler import RequestScheduler
+
+
+class TikTokClient:
+    """
+    Owner of the pooled HTTP session used by every network call of the package.
+
+    Connections are kept alive and reused between the comment pages, reply pages,
+    video pages and downloads, instead of opening a new TCP+TLS connection per request.
+
+    Usage:
+
+        with TikTokClient(pool_maxsize=32) as client:
+            comments = get_comments(url, msToken, client=client)
+    """
+    def __init__(self, pool_connections: int = 10, pool_maxsize: int = 10, timeout: float | tuple[float, float] = 30, headers: dict | None = None, max_retries: int = 0, cache=None, scheduler: RequestScheduler | None = None, base_url: str = "https://www.tiktok.com"):
+        """
+        :param pool_connections: Number of hosts to keep a connection pool for.
+        :param pool_maxsize: Maximum number of connections kept alive per host.
+        :param timeout: Default timeout of the requests, in seconds, or a (connect, read) tuple.
+        :param headers: Default headers of the session. Defaults to `tikheaders.get_headers`.
+        :param max_retries: Number of retries on connection errors, handled by urllib3.
+        :param cache: An optional `ResponseCache` of the data extracted from video and user pages.
+        :param scheduler: An optional `RequestScheduler` rate limiting and retrying the requests per endpoint.
+        :param base_url: The scheme and host of the comment APIs.
+        """
+        self.timeout = timeout
+        self.cache = cache
+        self.scheduler = scheduler
+        self.base_url = base_url
+        self.session = requests.Session()
+
+        adapter = HTTPAdapter(pool_connections=pool_connections, pool_maxsize=pool_maxsize, max_retries=max_retries)
+        self.session.mount("https://", adapter)
+        self.session.mount("http://", adapter)
+        self.session.headers.clear()
+        self.session.headers.update(HEADERS if headers is None else headers)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+    def get(self, url: str, endpoint: str | None = None, empty_is_throttle: bool = False, **kwargs) -> requests.Response:
+        """
+        Send a GET request through the pooled session.
+
+        :param url: The URL of the request.
+        :param endpoint: The endpoint of the request (`comment`, `reply`, `video`, `user`, `post`, `download`),
+            used by the scheduler of the client. Requests without endpoint are sent directly.
+        :param empty_is_throttle: Whether the scheduler should retry a successful but empty response.
+        :param kwargs: Any argument accepted by `requests.Session.get`.
+        :return: The response of the request.
+        """
+        kwargs.setdefault("timeout", self.timeout)
+        if metrics.active is None or endpoint is None:
+            send = lambda: self.session.get(url, **kwargs)
+        else:
+            send = lambda: self._instrumented_get(endpoint, url, kwargs)
+        if self.scheduler is None or endpoint is None:
+            return send()
+        return self.scheduler.send(endpoint, send, empty_is_throttle)
+
+    def _instrumented_get(self, endpoint: str, url: str, kwargs: dict)-> requests.Response:
+        """
+        Send one attempt of a request, recording its latency, status and size in the active registry.
+        """
+        registry = metrics.active
+        started = perf_counter()
+        try:
+            response = self.session.get(url, **kwargs)
+        except requests.exceptions.RequestException:
+            if registry is not None:
+                registry.observe("tiktok_request_seconds", perf_counter() - started, endpoint=endpoint)
+                registry.inc("tiktok_responses_total", endpoint=endpoint, status="error")
+            raise
+        if registry is not None:
+            registry.observe("tiktok_request_seconds", perf_counter() - started, endpoint=endpoint)
+            registry.inc("tiktok_responses_total", endpoint=endpoint, status=str(response.status_code))
+            # Streamed bodies are counted by the download functions as they are read
+            if not kwargs.get("stream"):
+                registry.inc("tiktok_response_bytes_total", len(response.content), endpoint=endpoint)
+        return response
+
+    def close(self)-> None:
+        """
+        Close all the pooled connections.
+        """
+        self.session.close()
+
+
+_default_client: TikTokClient | None = None
+_default_client_lock = Lock()
+
+
+def get_default_client()-> TikTokClient:
+    """
+    Return the client used when a function is called without `client`.
+
+    It is created on first use and shared by the whole process, so even callers
+    that never build a `TikTokClient` benefit from connection reuse. It has no
+    `RequestScheduler`: requests are sent once, without rate limit nor concurrency
+    window. Opt in with `set_default_client`.
+    """
+    global _default_client
+    if _default_client is None:
+        with _default_client_lock:
+            if _default_client is None:
+                _default_client = TikTokClient()
+    return _default_client
+
+
+def set_default_client(client: TikTokClient | None)-> None:
+    """
+    Replace the client used when a function is called without `client`.
+
+    Usage:
+
+        set_default_client(TikTokClient(scheduler=RequestScheduler(initial_concurrency=8)))
+
+    :param client: The new shared client, or None to create a plain one on next use.
+    """
+    global _default_client
+    with _default_client_lock:
+        _default_client = client
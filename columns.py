@@ -0,0 +1,133 @@
+from array import array
+from typing import Iterable
+from .comment import commentData
+
+
+class commentBatch:
+    """
+    Columnar storage of comments and replies.
+
+    Integer fields are kept in typed `array` buffers and string fields in plain lists,
+    filled page by page, so a whole comment section can be converted to NumPy, pandas
+    or pyarrow without looping over `commentData` objects.
+
+    Replies are stored as rows too, `parent_cid` holding the `cid` of the comment they
+    answer (an empty string for top-level comments). Missing integer values are stored
+    as 0 and missing strings as an empty string.
+    """
+    INT_FIELDS = ("create_time", "digg_count", "reply_comment_total", "collect_stat")
+    BOOL_FIELDS = ("author_pin",)
+    STR_FIELDS = ("cid", "parent_cid", "aweme_id", "author_id", "comment_language", "text")
+
+    def __init__(self):
+        self.columns: dict[str, array | list] = {}
+        for name in self.INT_FIELDS:
+            self.columns[name] = array("q")
+        for name in self.BOOL_FIELDS:
+            self.columns[name] = array("b")
+        for name in self.STR_FIELDS:
+            self.columns[name] = []
+
+    def __len__(self):
+        """
+        :return: The number of rows
+        """
+        return len(self.columns["cid"])
+
+    def __repr__(self):
+        return f"<commentBatch ({len(self)} rows)>"
+
+    def __getitem__(self, name: str)-> array | list:
+        return self.columns[name]
+
+    def append(self, comment: commentData, parent_cid: str = "")-> None:
+        """
+        Add one comment as a row. Its replies are not added, see `extend`.
+
+        :param comment: The comment to add.
+        :param parent_cid: The `cid` of the comment it answers, empty for a top-level comment.
+        """
+        columns = self.columns
+        for name in self.INT_FIELDS:
+            columns[name].append(int(comment[name] or 0))
+        for name in self.BOOL_FIELDS:
+            columns[name].append(1 if comment[name] else 0)
+        for name in self.STR_FIELDS:
+            if name == "parent_cid":
+                columns[name].append(parent_cid)
+            else:
+                value = comment[name]
+                columns[name].append("" if value is None else str(value))
+
+    def extend(self, comments: Iterable[commentData], parent_cid: str = "")-> None:
+        """
+        Add comments as rows, each one followed by its replies.
+
+        :param comments: The comments to add.
+        :param parent_cid: The `cid` of the comment they answer, empty for top-level comments.
+        """
+        for comment in comments:
+            self.append(comment, parent_cid)
+            if len(comment):
+                self.extend(comment.replies, comment.cid)
+
+    def to_dict(self)-> dict[str, list]:
+        """
+        :return: The columns as plain lists.
+        """
+        return {name: list(column) for name, column in self.columns.items()}
+
+    def to_numpy(self):
+        """
+        Convert the batch to a NumPy structured array.
+
+        Integer fields are `int64`, `author_pin` is `bool` and string fields are stored as objects.
+        """
+        import numpy as np
+
+        dtype = (
+            [(name, np.int64) for name in self.INT_FIELDS]
+            + [(name, np.bool_) for name in self.BOOL_FIELDS]
+            + [(name, object) for name in self.STR_FIELDS]
+        )
+        result = np.empty(len(self), dtype=dtype)
+        for name in self.INT_FIELDS + self.BOOL_FIELDS:
+            # Typed buffers are copied without going through Python objects
+            result[name] = np.frombuffer(self.columns[name], dtype=np.int64 if name in self.INT_FIELDS else np.int8)
+        for name in self.STR_FIELDS:
+            result[name] = self.columns[name]
+        return result
+
+    def to_pandas(self):
+        """
+        Convert the batch to a `pandas.DataFrame`. Requires pandas.
+        """
+        import numpy as np
+        import pandas as pd
+
+        data = {}
+        for name in self.INT_FIELDS:
+            data[name] = np.frombuffer(self.columns[name], dtype=np.int64)
+        for name in self.BOOL_FIELDS:
+            data[name] = np.frombuffer(self.columns[name], dtype=np.int8).astype(bool)
+        for name in self.STR_FIELDS:
+            data[name] = self.columns[name]
+        return pd.DataFrame(data)
+
+    def to_arrow(self):
+        """
+        Convert the batch to a `pyarrow.Table`. Requires pyarrow.
+        """
+        import pyarrow as pa
+
+        data = {}
+        for name in self.INT_FIELDS:
+            # One copy of the typed buffer: a wrapped `array` could no longer grow while the
+            # table is alive, and editing it would change the table
+            column = self.columns[name]
+            data[name] = pa.Array.from_buffers(pa.int64(), len(column), [None, pa.py_buffer(column.tobytes())])
+        for name in self.BOOL_FIELDS:
+            data[name] = pa.array([bool(value) for value in self.columns[name]], type=pa.bool_())
+        for name in self.STR_FIELDS:
+            data[name] = pa.array(self.columns[name], type=pa.string())
+        return pa.table(data)
@@ -1,15 +1,44 @@
+import logging
 import requests
-import os
-import yaml
-from typing import Self
+from time import perf_counter
+from typing import Iterator, Self
 from random import randint
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+from . import metrics
+from .client import TikTokClient, get_default_client
+from .extractors import compile_path, record_extractor
+from .decoding import decode_records
+from .templates import COMMENT_TEMPLATE, REPLY_TEMPLATE
+
+logger = logging.getLogger(__name__)
 
 class commentData:
     """
     The data structure of comments.
 
     Base on Link-list principle.
+
+    Records are slotted and the reply list is only allocated when the first reply is
+    attached, so millions of comments can be held in memory.
     """
+    __slots__ = (
+        "author_pin",
+        "aweme_id",
+        "cid",
+        "collect_stat",
+        "comment_language",
+        "create_time",
+        "digg_count",
+        "reply_comment_total",
+        "text",
+        "author_id",
+        "_replies",
+    )
+
+    # Low-cardinality fields whose strings are interned by the extractor
+    _interned_fields = ("aweme_id", "comment_language")
+
     def __init__(self):
         self.author_pin:str
         self.aweme_id:str
@@ -21,13 +50,26 @@ class commentData:
         self.reply_comment_total:int
         self.text:str
         self.author_id:str
-        self.replies:list[Self] = []
+        self._replies:list[Self] | None = None
+
+    @property
+    def replies(self)-> list[Self]:
+        """
+        The replies of the comment, allocated on first access.
+        """
+        if self._replies is None:
+            self._replies = []
+        return self._replies
+
+    @replies.setter
+    def replies(self, replies: list[Self])-> None:
+        self._replies = replies
 
     def __len__(self):
         """
         :return: The number of replies
         """
-        return len(self.replies)
+        return len(self._replies) if self._replies else 0
     
     def __repr__(self):
         try:
@@ -44,7 +86,13 @@ class commentData:
             return None
         
     def get_all(self)-> dict[str:any]:
-        return self.__dict__
+        data = {"replies": self._replies if self._replies is not None else []}
+        for name in self.__slots__[:-1]:
+            try:
+                data[name] = getattr(self, name)
+            except AttributeError:
+                pass
+        return data
 
         
     def append_reply(self,comment:Self)-> None:
@@ -59,21 +107,334 @@ class commentData:
     
     @staticmethod
     def extract_data_from_path(data:dict,path:str)-> any:
-        key = "/"
-        def convert(value):
-            try:
-                return f"[{int(value)}]"
-            except:
-                return f'["{value}"]'
-
-        new_path = ''.join(list(map(
-            convert,
-            path.split(key)
-        )))
-    
-        return eval("data"+new_path)
+        """
+        Extract a value from a nested structure with a `a/b/0/c` path.
+
+        :raises KeyError: If the path does not exist in the data.
+        """
+        return compile_path(path)(data)
+
+# The pagination values read by `_next_cursor`
+_PAGE_KEYS = ("cursor", "has_more")
+
+
+def _decode_page(content: bytes, endpoint: str = "comment", fields: tuple[str, ...] | None = None) -> tuple[list[commentData], dict]:
+    """
+    Decode one raw page of the comment/reply API, materializing only the mapped fields.
+
+    With the `simdjson` backend (see `decoding`) the rest of the page, such as the nested
+    `user` objects, is never turned into Python objects.
+
+    :param content: The raw body of the response.
+    :param endpoint: The endpoint of the page, `comment` or `reply`, for the metrics.
+    :param fields: Only fill these attributes of `commentData`. Defaults to all the fields of `comments_path.yaml`.
+    :return: The `commentData` objects of the page, and its pagination values for `_next_cursor`.
+    """
+    extract = record_extractor("comments_path", commentData, None, fields)
+    registry = metrics.active
+    if registry is None:
+        return decode_records(content, "comments", extract, _PAGE_KEYS)
+
+    # Decoding and extraction are interleaved with a lazy backend: the time spent in the
+    # extractor is summed apart, the whole decoding is observed as the parse time
+    extracting = 0.0
+
+    def timed_extract(item) -> commentData:
+        nonlocal extracting
+        started = perf_counter()
+        comment = extract(item)
+        extracting += perf_counter() - started
+        return comment
+
+    started = perf_counter()
+    comments, values = decode_records(content, "comments", timed_extract, _PAGE_KEYS)
+    registry.observe("tiktok_parse_seconds", perf_counter() - started, endpoint=endpoint)
+    registry.inc("tiktok_extract_seconds_total", extracting, endpoint=endpoint)
+    registry.inc("tiktok_extracted_records_total", len(comments), endpoint=endpoint)
+    return comments, values
+
+
+def _comment_fields(fields, with_replies: bool = False) -> tuple[str, ...] | None:
+    """
+    Normalize the `fields` option, adding the fields needed to fetch the replies.
+
+    :raises ValueError: If a field is not in `comments_path.yaml`, before any request is sent.
+    """
+    if fields is None:
+        return None
+    required = ("cid", "reply_comment_total") if with_replies else ()
+    fields = tuple(dict.fromkeys((*fields, *required)))
+    record_extractor("comments_path", commentData, None, fields)
+    return fields
+
 
-def get_replies(video_id: str, comment_id: str, msToken: str, maxcount=20, cursor=0, current_size=0):
+def _next_cursor(data: dict, cursor: int, maxcount: int) -> int | None:
+    """
+    Compute the cursor of the next page from the API response.
+
+    The cursor returned by the server is used when available, otherwise the cursor is
+    advanced by `maxcount`.
+
+    :return: The next cursor, or None if the server reports there is nothing left.
+    """
+    if not data.get("has_more", 1):
+        return None
+    try:
+        next_cursor = int(data["cursor"])
+    except (KeyError, TypeError, ValueError):
+        next_cursor = cursor + maxcount
+    # Never walk backwards or stay in place, it would loop forever
+    if next_cursor <= cursor:
+        next_cursor = cursor + maxcount
+    return next_cursor
+
+
+def _reply_values(video_id: str, comment_id: str, msToken: str, maxcount: int, cursor: int) -> dict:
+    """
+    The dynamic parameters of a reply request, such as comment ID, video ID, and device information.
+
+    The static parameters come from `templates.REPLY_TEMPLATE`.
+    """
+    # Define the required keys and their corresponding values
+    keys = [
+        "comment_id",      # Comment ID
+        "count",           # Number of comments to fetch
+        "cursor",          # Cursor for pagination
+        "device_id",       # Random device ID
+        "item_id",         # Video ID
+        "screen_height",   # Random screen height
+        "screen_width",    # Random screen width
+        "msToken"          # Token for authentication
+    ]
+    values = [
+        comment_id,                         # Use the provided comment_id
+        maxcount,                           # Set the max count of comments
+        cursor,                             # Set the cursor for pagination
+        ''.join(str(randint(1, 9)) for _ in range(19)), # Random device ID with length 19
+        video_id,                           # Use the provided video_id
+        randint(500, 1000),                 # Random screen height between 500 and 1000
+        randint(1000, 1500),                # Random screen width between 1000 and 1500
+        msToken                             # Use the provided msToken
+    ]
+
+    return dict(zip(keys, values))
+
+
+def _comment_values(video_id: str, msToken: str, maxcount: int, cursor: int) -> dict:
+    """
+    The dynamic parameters of a comments API request, such as video ID, cursor, and device information.
+
+    The static parameters come from `templates.COMMENT_TEMPLATE`.
+    """
+    # Define the required keys and their corresponding values
+    keys = [
+        "aweme_id",        # Video ID extracted from the URL
+        "count",           # Number of comments to fetch
+        "cursor",          # Cursor for pagination
+        "device_id",       # Random device ID
+        "screen_height",   # Random screen height
+        "screen_width",    # Random screen width
+        "msToken"          # Token for authentication
+    ]
+    values = [
+        video_id,                           # Video ID extracted from the URL
+        maxcount,                           # Set the max count of comments
+        cursor,                             # Set the cursor for pagination
+        ''.join(str(randint(1, 9)) for _ in range(19)), # Random device ID with length 19
+        randint(500, 1000),                 # Random screen height between 500 and 1000
+        randint(1000, 1500),                # Random screen width between 1000 and 1500
+        msToken                             # Use the provided msToken
+    ]
+
+    return dict(zip(keys, values))
+
+
+def _first_seen(seen, cid: str) -> bool:
+    """
+    Add `cid` to `seen`, a `set` or an index of `dedup`.
+
+    :return: True if it was not in it.
+    """
+    if isinstance(seen, set):
+        if cid in seen:
+            return False
+        seen.add(cid)
+        return True
+    # The indexes check and add under their lock, in one step
+    return seen.add(cid)
+
+
+def _fetch_reply_page(video_id: str, comment_id: str, msToken: str, maxcount: int, cursor: int, client: TikTokClient, fields: tuple[str, ...] | None = None) -> tuple[list[commentData], dict]:
+    """
+    Fetch and decode one page of the replies API. Request errors are raised.
+
+    :return: The replies of the page, and its pagination values for `_next_cursor`.
+    """
+    url = REPLY_TEMPLATE.url(client.base_url, **_reply_values(video_id, comment_id, msToken, maxcount, cursor))
+    response = client.get(url, endpoint="reply", empty_is_throttle=True)
+    response.raise_for_status()  # Raise an exception for HTTP errors
+    return _decode_page(response.content, "reply", fields)
+
+
+def iter_replies(video_id: str, comment_id: str, msToken: str, maxcount: int = 20, cursor: int = 0, client: TikTokClient | None = None, fields: list[str] | None = None) -> Iterator[commentData]:
+    """
+    Iterate over the replies to a specific comment on a TikTok video.
+
+    Pages are requested one by one and the replies are yielded as soon as their page
+    is parsed, so only one page is held in memory at a time.
+
+    Args:
+        video_id (str): The ID of the video.
+        comment_id (str): The ID of the comment to fetch replies for.
+        msToken (str): Authentication token required for the request.
+        maxcount (int, optional): Maximum number of replies to fetch per request. Defaults to 20.
+        cursor (int, optional): Pagination cursor to start from. Defaults to 0.
+        client (TikTokClient, optional): The client used to send the requests. Defaults to the shared client.
+        fields (list, optional): Only fill these attributes of the replies, e.g. `["cid", "text"]`. Defaults to all of them.
+
+    Yields:
+        commentData: The replies, in the order returned by the API.
+
+    Raises:
+        ValueError: If a field is unknown, when called, before any request is sent.
+    """
+    return _iter_replies(video_id, comment_id, msToken, maxcount, cursor, client or get_default_client(), _comment_fields(fields))
+
+
+def _iter_replies(video_id: str, comment_id: str, msToken: str, maxcount: int, cursor: int, client: TikTokClient, fields: tuple[str, ...] | None) -> Iterator[commentData]:
+    try:
+        while cursor is not None:
+            page, data = _fetch_reply_page(video_id, comment_id, msToken, maxcount, cursor, client, fields)
+            if not page:
+                return
+
+            yield from page
+            cursor = _next_cursor(data, cursor, maxcount)
+
+    except requests.exceptions.RequestException as e:
+        # Handle any errors related to the request itself
+        logger.error("Request failed: %s", e, extra={"endpoint": "reply", "video_id": video_id, "comment_id": comment_id, "cursor": cursor})
+
+    except Exception as e:
+        # Handle any other unexpected errors
+        logger.exception("An unexpected error occurred: %s", e, extra={"endpoint": "reply", "video_id": video_id, "comment_id": comment_id, "cursor": cursor})
+
+
+def crawl_reply_trees(video_id: str, comments: list[commentData], msToken: str, maxcount: int = 20, max_in_flight: int = 8, max_depth: int | None = None, client: TikTokClient | None = None, fields: list[str] | None = None, executor: ThreadPoolExecutor | None = None, seen=None, failed: set[str] | None = None) -> int:
+    """
+    Fetch the replies of comments concurrently, attaching them to the comments in place.
+
+    The pages to fetch are planned from `reply_comment_total`: the cursors `0, maxcount,
+    2 * maxcount...` below the total of every comment are requested at once, instead of
+    discovering them one page at a time, and no request is sent past the known total.
+    The pages are reassembled in cursor order and replies repeated by shifted pages are
+    dropped. When the last planned page of a comment reports more replies (the total grew
+    since the comment was fetched), the rest is walked page by page.
+
+    Replies having replies themselves are crawled the same way, level by level. A reply
+    already in the tree is never attached twice, which also stops reply cycles.
+
+    :param video_id: The ID of the video.
+    :param comments: The comments whose replies are fetched.
+    :param msToken: Authentication token required for the request.
+    :param maxcount: Maximum number of replies to fetch per request (default: 20).
+    :param max_in_flight: Maximum number of requests in flight, all comments and levels together (default: 8).
+    :param max_depth: Maximum number of reply levels to crawl (default: all of them).
+    :param client: The client used to send the requests (default: the shared client).
+    :param fields: Only fill these attributes of the replies (default: all of them).
+    :param executor: A pool to send the requests from, instead of a new one of `max_in_flight` threads.
+    :param seen: The IDs already seen, a `set` or an index of `dedup`: replies in it are dropped and new ones added to it
+        (default: a new set).
+    :param failed: The `cid` of the comments (or replies) whose reply pages could not all be fetched are added to it.
+        Request errors are logged, not raised: their replies are missing from the tree.
+    :return: The number of requests sent.
+    :raises ValueError: If a field is unknown, before any request is sent.
+    """
+    client = client or get_default_client()
+    fields = _comment_fields(fields, True)
+    own_executor = executor is None
+    if own_executor:
+        executor = ThreadPoolExecutor(max_workers=max_in_flight)
+
+    def walk(parent: commentData, cursor: int) -> tuple[list[commentData], int]:
+        # Page by page, for the replies beyond the planned pages
+        replies, sent = [], 0
+        while cursor is not None:
+            sent += 1
+            page, data = _fetch_reply_page(video_id, parent.cid, msToken, maxcount, cursor, client, fields)
+            if not page:
+                break
+            replies.extend(page)
+            cursor = _next_cursor(data, cursor, maxcount)
+        return replies, sent
+
+    def attach(parent: commentData, page: list[commentData]) -> None:
+        for reply in page:
+            if _first_seen(seen, reply.cid):
+                parent.replies.append(reply)
+
+    sent = 0
+    depth = 0
+    level = [comment for comment in comments if comment.reply_comment_total and comment.reply_comment_total >= 1]
+    # Every cid of the tree, a reply is attached once even if the API returns it under several comments
+    seen = set() if seen is None else seen
+    seen.update(comment.cid for comment in comments)
+    seen.update(reply.cid for comment in level for reply in comment.replies)
+    try:
+        while level and (max_depth is None or depth < max_depth):
+            depth += 1
+            plan = [(parent, cursor) for parent in level for cursor in range(0, parent.reply_comment_total, maxcount)]
+            futures = [executor.submit(_fetch_reply_page, video_id, parent.cid, msToken, maxcount, cursor, client, fields) for parent, cursor in plan]
+            sent += len(plan)
+
+            beyond = []
+            for (parent, cursor), future in zip(plan, futures):
+                try:
+                    page, data = future.result()
+                except Exception as e:
+                    logger.error("Request failed: %s", e, extra={"endpoint": "reply", "video_id": video_id, "comment_id": parent.cid, "cursor": cursor})
+                    if failed is not None:
+                        failed.add(parent.cid)
+                    continue
+                attach(parent, page)
+
+                next_cursor = _next_cursor(data, cursor, maxcount) if page else None
+                if cursor + maxcount >= parent.reply_comment_total and next_cursor is not None and next_cursor >= parent.reply_comment_total:
+                    beyond.append((parent, next_cursor))
+
+            for (parent, _), future in zip(beyond, [executor.submit(walk, parent, cursor) for parent, cursor in beyond]):
+                try:
+                    page, walked = future.result()
+                except Exception as e:
+                    logger.error("Request failed: %s", e, extra={"endpoint": "reply", "video_id": video_id, "comment_id": parent.cid})
+                    if failed is not None:
+                        failed.add(parent.cid)
+                    continue
+                sent += walked
+                attach(parent, page)
+
+            level = [reply for parent in level for reply in parent.replies if reply.reply_comment_total and reply.reply_comment_total >= 1 and not len(reply)]
+
+    finally:
+        if own_executor:
+            executor.shutdown(wait=False, cancel_futures=True)
+
+    return sent
+
+
+def _stream_to_sink(comments: Iterator[commentData], sink, parent_cid: str = "") -> int:
+    """
+    Write comments to a sink as they arrive, then flush it.
+
+    :return: The number of rows written, replies included.
+    """
+    written = sink.rows_written
+    sink.write_many(comments, parent_cid)
+    sink.flush()
+    return sink.rows_written - written
+
+
+def get_replies(video_id: str, comment_id: str, msToken: str, maxcount=20, cursor=0, current_size=0, client: TikTokClient | None = None, columnar: bool = False, sink=None, fields: list[str] | None = None):
     """
     Fetch replies to a specific comment on a TikTok video.
 
@@ -83,188 +444,253 @@ def get_replies(video_id: str, comment_id: str, msToken: str, maxcount=20, curso
         msToken (str): Authentication token required for the request.
         maxcount (int, optional): Maximum number of replies to fetch per request. Defaults to 20.
         cursor (int, optional): Pagination cursor to fetch the next set of replies. Defaults to 0.
-        current_size (int, optional): The current count of fetched replies, used for recursion. Defaults to 0.
+        current_size (int, optional): Unused, kept for backward compatibility.
+        client (TikTokClient, optional): The client used to send the requests. Defaults to the shared client.
+        columnar (bool, optional): Return a `commentBatch` of columns instead of a list. Defaults to False.
+        sink (CommentSink, optional): Stream the replies into this sink (see `sinks`) instead of keeping them. Defaults to None.
+        fields (list, optional): Only fill these attributes of the replies, e.g. `["cid", "text"]`. Defaults to all of them.
 
     Returns:
-        list: A list of commentData objects containing the replies.
+        list: A list of commentData objects containing the replies, a `commentBatch` if `columnar` is set,
+        or the number of rows written if `sink` is given.
+
+    Raises:
+        ValueError: If a field is unknown, before any request is sent.
     """
+    replies = iter_replies(video_id, comment_id, msToken, maxcount=maxcount, cursor=cursor, client=client, fields=fields)
+    if sink is not None:
+        return _stream_to_sink(replies, sink, comment_id)
+    if columnar:
+        from .columns import commentBatch
 
-    from .tikparams import reply_params as params
-    from .tikheaders import get_headers as headers
+        batch = commentBatch()
+        batch.extend(replies, comment_id)
+        return batch
+    return list(replies)
 
-    def fill_params():
-        """
-        Fill the request parameters with required data such as comment ID, video ID, and device information.
-        """
-        # Define the required keys and their corresponding values
-        keys = [
-            "comment_id",      # Comment ID
-            "count",           # Number of comments to fetch
-            "cursor",          # Cursor for pagination
-            "device_id",       # Random device ID
-            "item_id",         # Video ID
-            "screen_height",   # Random screen height
-            "screen_width",    # Random screen width
-            "msToken"          # Token for authentication
-        ]
-        values = [
-            comment_id,                         # Use the provided comment_id
-            maxcount,                           # Set the max count of comments
-            cursor,                             # Set the cursor for pagination
-            ''.join(str(randint(1, 9)) for _ in range(19)), # Random device ID with length 19
-            video_id,                           # Use the provided video_id
-            randint(500, 1000),                 # Random screen height between 500 and 1000
-            randint(1000, 1500),                # Random screen width between 1000 and 1500
-            msToken                             # Use the provided msToken
-        ]
-        
-        # Populate the params dictionary with the keys and values
-        for key, value in zip(keys, values):
-            params[key] = value
-    
-    fill_params()
-    data_return = []
-    
-    try:
-        base_url = "https://www.tiktok.com/api/comment/list/reply/"
-        response = requests.get(base_url, params=params, headers=headers)
-        response.raise_for_status()  # Raise an exception for HTTP errors
-        
-        data: dict = response.json()
 
-        # Load the paths configuration file to extract data from the JSON response
-        with open(f"{os.path.dirname(__file__)}/yaml/comments_path.yaml", 'r') as file:
-            paths: dict = yaml.safe_load(file)
+def _fetch_comment_page(video_id: str, msToken: str, maxcount: int, cursor: int, client: TikTokClient, fields: tuple[str, ...] | None = None) -> tuple[list[commentData], dict]:
+    """
+    Fetch and decode one page of the comments API. Request errors are raised.
 
-        root = "comments"
+    :return: The comments of the page, and its pagination values for `_next_cursor`.
+    """
+    # Make the request to TikTok's API to get the comments
+    url = COMMENT_TEMPLATE.url(client.base_url, **_comment_values(video_id, msToken, maxcount, cursor))
+    response = client.get(url, endpoint="comment", empty_is_throttle=True)
+    response.raise_for_status()  # Raise an error for bad responses
+    return _decode_page(response.content, "comment", fields)
 
-        # If no comments are found in the response, return an empty list
-        if not data.get(root, False):
-            return []
 
-        # Loop through the comments and extract the necessary data
-        for i in range(len(data[root])):
-            obj = commentData()
-            for key, value in paths.items():
-                try:
-                    obj.__setattr__(key, obj.extract_data_from_path(data, f'{root}/{i}/{value}'))
-                except:
-                    obj.__setattr__(key, None)
-            data_return.append(obj)
+def _iter_comment_pages(video_id: str, msToken: str, maxcount: int, cursor: int, client: TikTokClient, fields: tuple[str, ...] | None = None) -> Iterator[tuple[int, list[commentData], int | None]]:
+    """
+    Walk the pages of the comments API, without their replies.
 
-        # Recursively fetch more comments if they exist
-        return data_return + get_replies(video_id, comment_id, msToken, maxcount=maxcount, cursor=cursor + 1, current_size=current_size + len(data_return))
+    Request errors are raised, the callers decide how to report them.
 
-    except requests.exceptions.RequestException as e:
-        # Handle any errors related to the request itself
-        print(f"Request failed: {e}")
-        return []
-    
+    :return: An iterator of `(cursor, comments, next_cursor)`, one per page, stopping at the
+        first empty page. `next_cursor` is None on the last page.
+    """
+    while cursor is not None:
+        page, data = _fetch_comment_page(video_id, msToken, maxcount, cursor, client, fields)
+        if not page:
+            return
+
+        next_cursor = _next_cursor(data, cursor, maxcount)
+        yield cursor, page, next_cursor
+        cursor = next_cursor
+
+
+def _iter_planned_comment_pages(video_id: str, msToken: str, maxcount: int, cursor: int, total: int, client: TikTokClient, executor: ThreadPoolExecutor, window: int, fields: tuple[str, ...] | None = None, seen=None) -> Iterator[tuple[int, list[commentData], int | None]]:
+    """
+    Walk the pages of the comments API like `_iter_comment_pages`, fetching the pages planned
+    from the expected number of comments concurrently.
+
+    The cursors `cursor, cursor + maxcount...` below `total` are requested ahead, at most
+    `window` at a time, and the pages are yielded in cursor order. Comments repeated by
+    overlapping pages are dropped. As soon as a page does not match the plan (the server
+    moves its cursor by another step, or reports the end earlier), the requests ahead are
+    cancelled and the rest is walked page by page from the cursor given by the server; the
+    same happens past `total` when the last planned page reports more comments.
+
+    :param seen: The IDs already seen, comments in it are dropped (default: a new set).
+    """
+    plan = iter(range(cursor, total, maxcount))
+    ahead: deque = deque()
+    seen = set() if seen is None else seen
+
+    def fill() -> None:
+        while len(ahead) < window:
+            planned = next(plan, None)
+            if planned is None:
+                return
+            ahead.append((planned, executor.submit(_fetch_comment_page, video_id, msToken, maxcount, planned, client, fields)))
+
+    def fresh(page: list[commentData]) -> list[commentData]:
+        return [comment for comment in page if _first_seen(seen, comment.cid)]
+
+    next_cursor = cursor
+    try:
+        fill()
+        while ahead:
+            planned, future = ahead.popleft()
+            page, data = future.result()
+            if not page:
+                return
+
+            next_cursor = _next_cursor(data, planned, maxcount)
+            page = fresh(page)
+            if page:
+                yield planned, page, next_cursor
+            if next_cursor is None:
+                return
+            if next_cursor != planned + maxcount:
+                # The server paginates differently than planned, the pages ahead cannot be trusted
+                logger.debug("Comment cursor %d after %d does not match the plan, walking page by page", next_cursor, planned, extra={"endpoint": "comment", "video_id": video_id})
+                break
+            fill()
+    finally:
+        for _, future in ahead:
+            future.cancel()
+
+    # The comments beyond the plan, or after a page that did not match it
+    for planned, page, next_cursor in _iter_comment_pages(video_id, msToken, maxcount, next_cursor, client, fields):
+        page = fresh(page)
+        if page:
+            yield planned, page, next_cursor
+
+
+def _expected_comment_count(url: str, client: TikTokClient) -> int | None:
+    """
+    :return: The `commentCount` of the video page, None if it cannot be read.
+    """
+    from .video import get_video_details
+
+    try:
+        return int(get_video_details(url, client=client).commentCount)
     except Exception as e:
-        # Handle any other unexpected errors
-        print(f"An unexpected error occurred: {e}")
-        return []
-    
-    
+        logger.warning("No comment count for %s: %s", url, e, extra={"endpoint": "video", "url": url})
+        return None
+
 
-def get_comments(url: str, msToken: str, maxcount: int = 20, cursor: int = 0, current_size: int = 0) -> list[commentData]:
+def iter_comments(url: str, msToken: str, maxcount: int = 20, cursor: int = 0, with_replies: bool = True, reply_workers: int = 1, page_workers: int = 1, comment_count: int | None = None, client: TikTokClient | None = None, fields: list[str] | None = None, seen=None) -> Iterator[commentData]:
     """
-    Fetches comments from a TikTok video using the provided URL and msToken.
+    Iterate over the comments of a TikTok video using the provided URL and msToken.
+
+    Pages are requested one by one and the comments are yielded as soon as their page
+    (and the replies of its comments) is fetched, so memory stays constant whatever
+    the number of comments of the video.
 
     :param url: The URL of the TikTok video.
     :param msToken: A token required for authenticating the request.
     :param maxcount: Maximum number of comments to fetch in one request (default: 20).
     :param cursor: The starting point for fetching comments (used for pagination).
-    :param current_size: The current number of comments fetched (used for recursion).
-    :return: A list of `commentData` objects containing the comments data.
+    :param with_replies: Whether to fetch the replies of each comment (default: True).
+    :param reply_workers: Number of reply requests in flight at once (default: 1, sequential). Above 1, the reply
+        pages are planned from `reply_comment_total` and fetched concurrently, see `crawl_reply_trees`.
+    :param page_workers: Number of comment pages fetched at once (default: 1, sequential). Above 1, the pages are
+        planned from the number of comments of the video and fetched concurrently, still yielded in order;
+        the walk goes on page by page when the server does not follow the plan.
+    :param comment_count: The expected number of comments, for `page_workers` (default: the `commentCount` of the
+        video page, fetched once).
+    :param client: The client used to send the requests (default: the shared client).
+    :param fields: Only fill these attributes of the comments and replies, e.g. `["cid", "text"]` (default: all of them).
+        `cid` and `reply_comment_total` are always filled when fetching the replies.
+    :param seen: The IDs of the comments and replies already fetched, a `CidSet` or `CidBloomFilter` of `dedup`
+        (or a `set`), e.g. loaded from an earlier crawl. Comments in it are skipped with their replies, and the
+        IDs of the new ones are added to it (default: None, only the comments repeated by shifted pages are dropped).
+    :return: An iterator of `commentData` objects.
+    :raises ValueError: If a field is unknown, when called, before any request is sent.
     """
-    
-    data_return:list[commentData] = []
-    
-    from .tikparams import comment_params as params
-    from .tikheaders import get_headers
-    from .functions import get_video_id
+    # Checked here, the errors raised while iterating are logged and end the stream
+    _comment_fields(fields, with_replies)
+    return _iter_comments(url, msToken, maxcount, cursor, with_replies, reply_workers, page_workers, comment_count, client or get_default_client(), fields, seen)
 
-    def fill_params():
-        """
-        Fills the parameters required for making the comments API request.
-        """
-        # Define the required keys and their corresponding values
-        keys = [
-            "aweme_id",        # Video ID extracted from the URL
-            "count",           # Number of comments to fetch
-            "cursor",          # Cursor for pagination
-            "device_id",       # Random device ID
-            "screen_height",   # Random screen height
-            "screen_width",    # Random screen width
-            "msToken"          # Token for authentication
-        ]
-        values = [
-            get_video_id(url),                  # Extract video ID from the URL
-            maxcount,                           # Set the max count of comments
-            cursor,                             # Set the cursor for pagination
-            ''.join(str(randint(1, 9)) for _ in range(19)), # Random device ID with length 19
-            randint(500, 1000),                 # Random screen height between 500 and 1000
-            randint(1000, 1500),                # Random screen width between 1000 and 1500
-            msToken                             # Use the provided msToken
-        ]
-        
-        # Populate the params dictionary with the keys and values
-        for key, value in zip(keys, values):
-            params[key] = value
 
-    # Fill the request parameters
-    fill_params()
+def _iter_comments(url: str, msToken: str, maxcount: int, cursor: int, with_replies: bool, reply_workers: int, page_workers: int, comment_count: int | None, client: TikTokClient, fields: list[str] | None, seen) -> Iterator[commentData]:
+    from .functions import get_video_id
+
     #get id video
     video_id = get_video_id(url)
 
-    base_url = "https://www.tiktok.com/api/comment/list/"
+    # The pool is shared by all the pages of the video
+    executor = ThreadPoolExecutor(max_workers=reply_workers) if with_replies and reply_workers > 1 else None
 
-    try:
-        # Make the request to TikTok's API to get the comments
-        response = requests.get(base_url, params=params, headers=get_headers)
-        response.raise_for_status()  # Raise an error for bad responses
-        data: dict = response.json()
+    page_executor = None
 
-        # Load the paths configuration file to extract data from the JSON response
-        with open(f"{os.path.dirname(__file__)}/yaml/comments_path.yaml", 'r') as file:
-            paths: dict = yaml.safe_load(file)
+    def fetch_replies(comment: commentData) -> list[commentData]:
+        return get_replies(video_id, comment.cid, msToken, client=client, fields=fields)
 
-        root = "comments"
-
-        # If no comments are found in the response, return an empty list
-        if not data.get(root, False):
-            return []
-
-        # Loop through the comments and extract the necessary data
-        for i in range(len(data[root])):
-            obj = commentData()
-            for key, value in paths.items():
-                obj.__setattr__(key, obj.extract_data_from_path(data, f'{root}/{i}/{value}'))
-            data_return.append(obj)
-
-        for i in range(len(data_return)):
-            if data_return[i].reply_comment_total < 1:continue
-            data_return[i].replies.extend(get_replies(video_id,data_return[i].cid,msToken))
-
-
-        # Recursively fetch more comments if they exist
-        return data_return + get_comments(url, msToken, maxcount, cursor=cursor + 20, current_size=current_size + len(data_return))
+    try:
+        page_fields = _comment_fields(fields, with_replies)
+        if page_workers > 1 and comment_count is None:
+            comment_count = _expected_comment_count(url, client)
+        if page_workers > 1 and comment_count:
+            page_executor = ThreadPoolExecutor(max_workers=page_workers)
+            # Twice the workers ahead, the pool stays busy while a page is consumed
+            pages = _iter_planned_comment_pages(video_id, msToken, maxcount, cursor, comment_count, client, page_executor, 2 * page_workers, page_fields, seen)
+        else:
+            pages = _iter_comment_pages(video_id, msToken, maxcount, cursor, client, page_fields)
+            if seen is not None:
+                pages = ((cursor, [comment for comment in page if _first_seen(seen, comment.cid)], next_cursor) for cursor, page, next_cursor in pages)
+
+        for cursor, page, _ in pages:
+            if with_replies and executor is not None:
+                # The reply pages of the whole page of comments are planned and fetched at once
+                crawl_reply_trees(video_id, page, msToken, client=client, fields=fields, executor=executor, seen=seen)
+            elif with_replies:
+                for comment in page:
+                    if comment.reply_comment_total and comment.reply_comment_total >= 1:
+                        replies = fetch_replies(comment)
+                        if seen is not None:
+                            replies = [reply for reply in replies if _first_seen(seen, reply.cid)]
+                        comment.replies.extend(replies)
+
+            yield from page
 
     except requests.exceptions.RequestException as e:
         # Handle any errors related to the request itself
-        print(f"Request failed: {e}")
-        return []
-    
+        logger.error("Request failed: %s", e, extra={"endpoint": "comment", "video_id": video_id, "cursor": cursor})
+
     except Exception as e:
         # Handle any other unexpected errors
-        print(f"An unexpected error occurred: {e}")
-        return []
-
+        logger.exception("An unexpected error occurred: %s", e, extra={"endpoint": "comment", "video_id": video_id, "cursor": cursor})
 
+    finally:
+        for pool in (executor, page_executor):
+            if pool is not None:
+                pool.shutdown(wait=False, cancel_futures=True)
 
 
+def get_comments(url: str, msToken: str, maxcount: int = 20, cursor: int = 0, current_size: int = 0, reply_workers: int = 1, page_workers: int = 1, comment_count: int | None = None, client: TikTokClient | None = None, columnar: bool = False, sink=None, fields: list[str] | None = None, seen=None) -> list[commentData]:
+    """
+    Fetches comments from a TikTok video using the provided URL and msToken.
 
-        
-
-    
\ No newline at end of file
+    :param url: The URL of the TikTok video.
+    :param msToken: A token required for authenticating the request.
+    :param maxcount: Maximum number of comments to fetch in one request (default: 20).
+    :param cursor: The starting point for fetching comments (used for pagination).
+    :param current_size: Unused, kept for backward compatibility.
+    :param reply_workers: Number of reply requests in flight at once (default: 1, sequential), see `iter_comments`.
+    :param page_workers: Number of comment pages fetched at once (default: 1, sequential), see `iter_comments`.
+    :param comment_count: The expected number of comments, for `page_workers` (default: read from the video page).
+    :param client: The client used to send the requests (default: the shared client).
+    :param columnar: Return a `commentBatch` of columns, replies included as rows, instead of a list (default: False).
+    :param sink: Stream the comments and their replies into this `CommentSink` (see `sinks`) instead of keeping them (default: None).
+    :param fields: Only fill these attributes of the comments and replies, e.g. `["cid", "text"]` (default: all of them).
+    :param seen: The IDs already fetched, comments in it are skipped and new ones added, see `iter_comments`.
+    :return: A list of `commentData` objects containing the comments data, a `commentBatch` if `columnar` is set,
+        or the number of rows (comments and replies) written if `sink` is given.
+    :raises ValueError: If a field is unknown, before any request is sent.
+    """
+    comments = iter_comments(url, msToken, maxcount=maxcount, cursor=cursor, reply_workers=reply_workers, page_workers=page_workers, comment_count=comment_count, client=client, fields=fields, seen=seen)
+    if sink is not None:
+        return _stream_to_sink(comments, sink)
+    if columnar:
+        from .columns import commentBatch
+
+        # The records are turned into rows as they arrive, only the columns are kept
+        batch = commentBatch()
+        batch.extend(comments)
+        return batch
+    return list(comments)
@@ -0,0 +1,119 @@
+"""
+JSON decoding of the API responses, with the fastest backend installed:
+
+- `simdjson` (pysimdjson): the document is parsed lazily, only the values read by the
+  extractors of the YAML mappings become Python objects; the nested `user` objects,
+  avatar URL lists and share info of the comments are never materialized,
+- `orjson`: the whole document is decoded, in C, several times faster than `json`,
+- `json`: the standard library.
+
+The backend can be forced with `set_backend`.
+"""
+import json
+import threading
+from typing import Any, Callable, Iterable
+
+try:
+    import simdjson
+except ImportError:  # pragma: no cover - optional dependency
+    simdjson = None
+
+try:
+    import orjson
+except ImportError:  # pragma: no cover - optional dependency
+    orjson = None
+
+BACKENDS = tuple(name for name, module in (("simdjson", simdjson), ("orjson", orjson), ("json", json)) if module is not None)
+
+# The lazy proxies of `simdjson`, turned into plain Python values before they leave a decoding call
+LAZY_TYPES = (simdjson.Object, simdjson.Array) if simdjson is not None else ()
+
+_backend = BACKENDS[0]
+_local = threading.local()
+
+
+def get_backend()-> str:
+    """
+    :return: The name of the backend in use, `simdjson`, `orjson` or `json`.
+    """
+    return _backend
+
+
+def set_backend(name: str)-> None:
+    """
+    Select the JSON backend.
+
+    :param name: `simdjson`, `orjson` or `json`.
+    :raises ValueError: If the backend is not installed.
+    """
+    global _backend
+    if name not in BACKENDS:
+        raise ValueError(f"JSON backend {name!r} is not available, installed backends: {BACKENDS}")
+    _backend = name
+
+
+def loads(content: bytes | str)-> Any:
+    """
+    Decode a whole JSON document into Python objects.
+    """
+    if _backend == "orjson":
+        return orjson.loads(content)
+    if _backend == "simdjson":
+        return _parse_lazy(content).as_dict()
+    return json.loads(content)
+
+
+def materialize(value: Any)-> Any:
+    """
+    :return: The plain `dict` or `list` of a lazy `simdjson` object or array, other values unchanged.
+    """
+    if simdjson is not None:
+        if isinstance(value, simdjson.Object):
+            return value.as_dict()
+        if isinstance(value, simdjson.Array):
+            return value.as_list()
+    return value
+
+
+def _parse_lazy(content: bytes | str):
+    if isinstance(content, str):
+        content = content.encode()
+    parser = getattr(_local, "parser", None)
+    if parser is None:
+        parser = _local.parser = simdjson.Parser()
+    try:
+        return parser.parse(content)
+    except RuntimeError:
+        # A document of this parser is still referenced (e.g. by a traceback), use a new one
+        parser = _local.parser = simdjson.Parser()
+        return parser.parse(content)
+
+
+def decode_records(content: bytes | str, root: str, extract: Callable[[Any], Any], keys: Iterable[str] = ())-> tuple[list, dict]:
+    """
+    Decode a JSON object holding a list of records, and extract the records.
+
+    With the `simdjson` backend only the values read by `extract` are materialized, and the
+    lazy document does not outlive this call: the extractors of `record_extractor` return
+    plain lists and dicts for the nested values they read.
+
+    :param content: The raw JSON, e.g. `response.content`.
+    :param root: The key of the list of records, e.g. `comments`. A missing or null list gives no record.
+    :param extract: The function turning one item of the list into a record, e.g. a `record_extractor`.
+    :param keys: Other top-level keys to return, e.g. the pagination values.
+    :return: The records, and the values of `keys` found in the document.
+    """
+    if _backend != "simdjson":
+        data = orjson.loads(content) if _backend == "orjson" else json.loads(content)
+        items = data.get(root)
+        return [extract(item) for item in items] if items else [], {key: data[key] for key in keys if key in data}
+
+    document = _parse_lazy(content)
+    items = document.get(root)
+    records = [extract(item) for item in items] if items else []
+    values = {}
+    for key in keys:
+        if key in document:
+            # Return plain Python values only, the lazy proxies must not outlive the document
+            values[key] = materialize(document[key])
+    return records, values
@@ -0,0 +1,318 @@
+"""
+Compact indexes of the comment IDs (`cid`) already seen, to drop the comments repeated by
+shifted pages and the comments already fetched by earlier crawls.
+
+A `set` of `cid` strings costs about 100 bytes per ID. The IDs are 64-bit integers written
+in decimal, so they are stored as such:
+
+- `CidSet`: exact, an open-addressing hash set of the IDs packed in an `array`, 11 to
+  23 bytes per ID depending on the fill of the table,
+- `CidBloomFilter`: approximate, a Bloom filter of a fixed size chosen from the expected
+  number of IDs and the false-positive rate, about 1.8 bytes per ID at 0.1%. A new comment
+  is wrongly reported as seen with that probability, a seen comment never is as new.
+
+Both are saved to and loaded from a file, see `load_cid_index`.
+"""
+import os
+import sys
+import struct
+from array import array
+from hashlib import blake2b
+from math import ceil, log
+from threading import Lock
+from typing import Iterable
+
+_MASK = (1 << 64) - 1
+# Odd 64-bit constant spreading the consecutive IDs over the whole table
+_MULTIPLIER = 0x9E3779B97F4A7C15
+
+_SET_HEADER = struct.Struct("<4sBBQ")             # magic, version, bits, count
+_BLOOM_HEADER = struct.Struct("<4sBQBQQd")        # magic, version, size, hashes, count, capacity, error_rate
+_SET_MAGIC = b"CIDS"
+_BLOOM_MAGIC = b"CIDB"
+_VERSION = 1
+# Version 1 filters hashed the IDs by a multiplication only, their bits cannot be read with the mixer
+_BLOOM_VERSION = 2
+
+
+def _cid_key(cid: str | int)-> int:
+    """
+    :return: The non-zero 64-bit integer of a `cid`, its hash when it is not such a number.
+    """
+    try:
+        key = int(cid)
+    except (TypeError, ValueError):
+        key = 0
+    if 0 < key <= _MASK:
+        return key
+    return int.from_bytes(blake2b(str(cid).encode(), digest_size=8).digest(), "little") or 1
+
+
+def _mix(key: int)-> int:
+    """
+    splitmix64 finalizer: every bit of the result depends on every bit of `key`, so close
+    IDs give unrelated values.
+    """
+    key = (key + _MULTIPLIER) & _MASK
+    key = ((key ^ (key >> 30)) * 0xBF58476D1CE4E5B9) & _MASK
+    key = ((key ^ (key >> 27)) * 0x94D049BB133111EB) & _MASK
+    return key ^ (key >> 31)
+
+
+def _to_little_endian(values: array)-> bytes:
+    if sys.byteorder == "big":
+        values = array(values.typecode, values)
+        values.byteswap()
+    return values.tobytes()
+
+
+def _write_atomically(path: str, header: bytes, body: bytes)-> None:
+    # An interrupted save leaves the previous file untouched
+    temporary = path + ".tmp"
+    with open(temporary, "wb") as file:
+        file.write(header)
+        file.write(body)
+        file.flush()
+        os.fsync(file.fileno())
+    os.replace(temporary, path)
+
+
+class CidSet:
+    """
+    Exact set of comment IDs, packed as 64-bit integers. Safe to share between threads: use
+    the result of `add` to know whether an ID is new, it checks and adds in one step.
+
+    Usage:
+
+        seen = CidSet.load("seen.cids") if os.path.exists("seen.cids") else CidSet()
+        comments = get_comments(url, msToken, seen=seen)   # only the comments not seen before
+        seen.save("seen.cids")
+    """
+    MAX_LOAD = 0.7
+
+    def __init__(self, capacity: int = 1 << 16):
+        """
+        :param capacity: The number of IDs held before the table is first grown.
+        """
+        self._bits = max(4, ceil(capacity / self.MAX_LOAD).bit_length())
+        self._slots = array("Q", bytes(8 << self._bits))
+        self._count = 0
+        self._lock = Lock()
+
+    def __repr__(self)-> str:
+        return f"<CidSet (ids={self._count},bytes={self.nbytes})>"
+
+    def __len__(self):
+        return self._count
+
+    def __contains__(self, cid: str | int)-> bool:
+        key = _cid_key(cid)
+        # `_grow` swaps the table and its size, they are read together under the lock
+        with self._lock:
+            slots, shift, mask = self._slots, 64 - self._bits, len(self._slots) - 1
+            index = ((key * _MULTIPLIER) & _MASK) >> shift
+            while True:
+                value = slots[index]
+                if value == key:
+                    return True
+                if value == 0:
+                    return False
+                index = (index + 1) & mask
+
+    @property
+    def nbytes(self)-> int:
+        """
+        :return: The size of the table, in bytes.
+        """
+        return len(self._slots) * self._slots.itemsize
+
+    def _insert(self, key: int)-> bool:
+        slots, shift, mask = self._slots, 64 - self._bits, len(self._slots) - 1
+        index = ((key * _MULTIPLIER) & _MASK) >> shift
+        while True:
+            value = slots[index]
+            if value == key:
+                return False
+            if value == 0:
+                slots[index] = key
+                return True
+            index = (index + 1) & mask
+
+    def _grow(self)-> None:
+        old = self._slots
+        self._bits += 1
+        self._slots = array("Q", bytes(8 << self._bits))
+        for key in old:
+            if key:
+                self._insert(key)
+
+    def add(self, cid: str | int)-> bool:
+        """
+        Add an ID.
+
+        :return: True if the ID was not in the set.
+        """
+        key = _cid_key(cid)
+        with self._lock:
+            if not self._insert(key):
+                return False
+            self._count += 1
+            if self._count > self.MAX_LOAD * len(self._slots):
+                self._grow()
+            return True
+
+    def update(self, cids: Iterable[str | int])-> int:
+        """
+        :return: The number of IDs that were not in the set.
+        """
+        return sum(self.add(cid) for cid in cids)
+
+    def save(self, path: str)-> None:
+        """
+        Write the set to a file, replacing it atomically.
+        """
+        with self._lock:
+            header = _SET_HEADER.pack(_SET_MAGIC, _VERSION, self._bits, self._count)
+            body = _to_little_endian(self._slots)
+        _write_atomically(path, header, body)
+
+    @classmethod
+    def load(cls, path: str)-> "CidSet":
+        """
+        Read a set written by `save`.
+        """
+        index = load_cid_index(path)
+        if not isinstance(index, cls):
+            raise ValueError(f"{path} does not hold a CidSet")
+        return index
+
+
+class CidBloomFilter:
+    """
+    Approximate set of comment IDs, in a Bloom filter.
+
+    The size is fixed: past `capacity` IDs, the false-positive rate grows above `error_rate`.
+
+    Safe to share between threads, as `CidSet`: `add` checks and adds in one step.
+
+    Usage:
+
+        seen = CidBloomFilter(capacity=50_000_000, error_rate=0.001)
+        comments = get_comments(url, msToken, seen=seen)
+        seen.save("seen.bloom")
+    """
+    def __init__(self, capacity: int = 1_000_000, error_rate: float = 0.001):
+        """
+        :param capacity: The expected number of IDs.
+        :param error_rate: The probability that a new ID is reported as seen, once `capacity` IDs were added.
+        """
+        if not 0 < error_rate < 1:
+            raise ValueError(f"error_rate must be between 0 and 1, not {error_rate}")
+        self.capacity = capacity
+        self.error_rate = error_rate
+        self.size = max(8, ceil(-capacity * log(error_rate) / log(2) ** 2))
+        self.hashes = max(1, round(self.size / capacity * log(2)))
+        self._bits = bytearray((self.size + 7) // 8)
+        self._count = 0
+        self._lock = Lock()
+
+    def __repr__(self)-> str:
+        return f"<CidBloomFilter (ids={self._count},capacity={self.capacity},bytes={self.nbytes})>"
+
+    def __len__(self):
+        """
+        :return: The number of IDs added, minus those wrongly reported as seen.
+        """
+        return self._count
+
+    def _positions(self, cid: str | int)-> list[int]:
+        # Double hashing: the k positions come from two independent hashes of the ID. A bare
+        # multiplication keeps sequential IDs correlated and misses the false-positive rate
+        first = _mix(_cid_key(cid))
+        second = _mix(first) | 1
+        size = self.size
+        return [(first + i * second) % size for i in range(self.hashes)]
+
+    def __contains__(self, cid: str | int)-> bool:
+        bits = self._bits
+        return all(bits[position >> 3] & (1 << (position & 7)) for position in self._positions(cid))
+
+    @property
+    def nbytes(self)-> int:
+        return len(self._bits)
+
+    def add(self, cid: str | int)-> bool:
+        """
+        Add an ID.
+
+        :return: True if the ID was not in the filter, False if it was or is a false positive.
+        """
+        positions = self._positions(cid)
+        with self._lock:
+            bits = self._bits
+            new = False
+            for position in positions:
+                byte, bit = position >> 3, 1 << (position & 7)
+                if not bits[byte] & bit:
+                    bits[byte] |= bit
+                    new = True
+            if new:
+                self._count += 1
+            return new
+
+    def update(self, cids: Iterable[str | int])-> int:
+        """
+        :return: The number of IDs that were not in the filter.
+        """
+        return sum(self.add(cid) for cid in cids)
+
+    def save(self, path: str)-> None:
+        """
+        Write the filter to a file, replacing it atomically.
+        """
+        with self._lock:
+            header = _BLOOM_HEADER.pack(_BLOOM_MAGIC, _BLOOM_VERSION, self.size, self.hashes, self._count, self.capacity, self.error_rate)
+            body = bytes(self._bits)
+        _write_atomically(path, header, body)
+
+    @classmethod
+    def load(cls, path: str)-> "CidBloomFilter":
+        """
+        Read a filter written by `save`.
+        """
+        index = load_cid_index(path)
+        if not isinstance(index, cls):
+            raise ValueError(f"{path} does not hold a CidBloomFilter")
+        return index
+
+
+def load_cid_index(path: str)-> CidSet | CidBloomFilter:
+    """
+    Read a `CidSet` or a `CidBloomFilter` written by its `save`.
+
+    :raises ValueError: If the file holds neither.
+    """
+    with open(path, "rb") as file:
+        data = file.read()
+
+    magic = data[:4]
+    if magic == _SET_MAGIC and len(data) >= _SET_HEADER.size:
+        _, version, bits, count = _SET_HEADER.unpack_from(data)
+        if version == _VERSION and len(data) == _SET_HEADER.size + (8 << bits):
+            index = CidSet.__new__(CidSet)
+            index._bits, index._count, index._lock = bits, count, Lock()
+            index._slots = array("Q")
+            index._slots.frombytes(data[_SET_HEADER.size:])
+            if sys.byteorder == "big":
+                index._slots.byteswap()
+            return index
+
+    if magic == _BLOOM_MAGIC and len(data) >= _BLOOM_HEADER.size:
+        _, version, size, hashes, count, capacity, error_rate = _BLOOM_HEADER.unpack_from(data)
+        if version == _BLOOM_VERSION and len(data) == _BLOOM_HEADER.size + (size + 7) // 8:
+            index = CidBloomFilter.__new__(CidBloomFilter)
+            index.capacity, index.error_rate, index.size, index.hashes = capacity, error_rate, size, hashes
+            index._bits, index._count, index._lock = bytearray(data[_BLOOM_HEADER.size:]), count, Lock()
+            return index
+
+    raise ValueError(f"{path} is not a cid index file")
@@ -0,0 +1,164 @@
+import os
+import json
+import logging
+import requests
+from time import perf_counter
+from threading import Lock
+from concurrent.futures import ThreadPoolExecutor
+from . import metrics
+from .client import TikTokClient
+
+logger = logging.getLogger(__name__)
+
+
+class download_stats:
+    """
+    The outcome of a `download_file` call.
+
+    It is truthy when the download succeeded, so it can be used as the boolean
+    returned by previous versions.
+    """
+    def __init__(self, ok: bool = False, size: int = 0, downloaded: int = 0, seconds: float = 0.0, segments: int = 1, resumed: bool = False):
+        self.ok = ok                    # Whether the whole file is on disk
+        self.size = size                # Size of the file, 0 if unknown
+        self.downloaded = downloaded    # Bytes received during this call
+        self.seconds = seconds          # Duration of the transfer
+        self.segments = segments        # Number of byte ranges fetched concurrently
+        self.resumed = resumed          # Whether a previous partial download was continued
+
+    def __bool__(self):
+        return self.ok
+
+    def __repr__(self):
+        return f"<download_stats (ok={self.ok},downloaded={self.downloaded},bandwidth={self.bandwidth / 1e6:.2f}MB/s,segments={self.segments})>"
+
+    @property
+    def bandwidth(self)-> float:
+        """
+        :return: The achieved bandwidth, in bytes per second.
+        """
+        return self.downloaded / self.seconds if self.seconds > 0 else 0.0
+
+
+def probe_ranges(client: TikTokClient, url: str, header: dict) -> tuple[int | None, requests.Response | None]:
+    """
+    Ask for the first byte of the file to know whether the server serves byte ranges.
+
+    :return: The total size of the file if ranges are supported, None otherwise, and the
+        response if it is a full `200` holding the whole file (the server ignored the range),
+        None otherwise: the 1-byte answer of a range request is never returned.
+    """
+    response = client.get(url, endpoint="download", stream=True, headers={**header, "range": "bytes=0-0"})
+    if response.status_code == 200:
+        return None, response
+
+    content_range = response.headers.get("content-range", "")
+    response.close()
+    if response.status_code == 206 and "/" in content_range:
+        total = content_range.rsplit("/", 1)[1]
+        if total.isdigit():
+            return int(total), None
+    return None, None
+
+
+def _split(size: int, segments: int) -> list[list[int]]:
+    """
+    Split `size` bytes into `segments` ranges of `[start, end, done]`, `end` being inclusive.
+    """
+    step = -(-size // segments)
+    return [[start, min(start + step, size) - 1, 0] for start in range(0, size, step)]
+
+
+def _load_state(state_path: str, part_path: str, size: int) -> list[list[int]] | None:
+    """
+    Load the ranges of a previous partial download, if it is for a file of the same size.
+    """
+    try:
+        with open(state_path, "r") as file:
+            state = json.load(file)
+        if state["size"] == size and os.path.getsize(part_path) == size:
+            return state["ranges"]
+    except (OSError, ValueError, KeyError):
+        pass
+    return None
+
+
+def _save_state(state_path: str, size: int, ranges: list[list[int]])-> None:
+    with open(state_path, "w") as file:
+        json.dump({"size": size, "ranges": ranges}, file)
+
+
+def download_ranges(client: TikTokClient, url: str, header: dict, file_path: str, size: int, segments: int, chunk_size: int, resume: bool = True) -> download_stats:
+    """
+    Download a file as `segments` byte ranges fetched concurrently into a preallocated file.
+
+    The data is written to `<file_path>.part` and the progress of each range to the
+    `<file_path>.part.json` sidecar, so an interrupted download continues where it stopped.
+    The part file is renamed to `file_path` once complete.
+
+    :param size: The size of the file, as given by `probe_ranges`.
+    :param resume: Whether to continue a previous partial download of the same file.
+    :return: A `download_stats` object.
+    """
+    part_path = f"{file_path}.part"
+    state_path = f"{part_path}.json"
+
+    ranges = _load_state(state_path, part_path, size) if resume else None
+    stats = download_stats(size=size, segments=segments, resumed=ranges is not None)
+    if ranges is None:
+        ranges = _split(size, segments)
+        # Preallocate the file, every segment writes at its own offset
+        with open(part_path, "wb") as file:
+            file.truncate(size)
+    stats.segments = sum(1 for start, end, done in ranges if start + done <= end)
+
+    lock = Lock()
+    unsaved = [0]
+
+    def fetch(segment: list[int])-> None:
+        start, end, _ = segment
+        if start + segment[2] > end:
+            return
+        response = client.get(url, endpoint="download", stream=True, headers={**header, "range": f"bytes={start + segment[2]}-{end}"})
+        with response:
+            if response.status_code != 206:
+                raise requests.exceptions.HTTPError(f"Range request answered with HTTP status code {response.status_code}")
+            # Unbuffered, the progress saved in the sidecar is always on disk
+            with open(part_path, "r+b", buffering=0) as file:
+                file.seek(start + segment[2])
+                for chunk in response.iter_content(chunk_size=chunk_size):
+                    file.write(chunk)
+                    with lock:
+                        segment[2] += len(chunk)
+                        stats.downloaded += len(chunk)
+                        unsaved[0] += len(chunk)
+                        # Persist the progress about every 4 MB
+                        if unsaved[0] >= 4 << 20:
+                            unsaved[0] = 0
+                            _save_state(state_path, size, ranges)
+        if start + segment[2] <= end:
+            raise requests.exceptions.ChunkedEncodingError(f"Range {start}-{end} ended early")
+
+    started = perf_counter()
+    try:
+        with ThreadPoolExecutor(max_workers=max(stats.segments, 1)) as executor:
+            # `list` re-raises the first error of the segments
+            list(executor.map(fetch, ranges))
+
+    except requests.exceptions.RequestException as e:
+        # Keep the progress, the next call with `resume` continues from there
+        logger.error("Request failed, %d/%d bytes kept for resuming: %s", sum(done for _, _, done in ranges), size, e, extra={"endpoint": "download", "url": url})
+        return stats
+
+    finally:
+        stats.seconds = perf_counter() - started
+        registry = metrics.active
+        if registry is not None:
+            registry.inc("tiktok_response_bytes_total", stats.downloaded, endpoint="download")
+        with lock:
+            _save_state(state_path, size, ranges)
+
+    os.replace(part_path, file_path)
+    os.remove(state_path)
+    stats.ok = True
+    return stats
@@ -0,0 +1,303 @@
+import os
+import json
+import queue
+import logging
+import threading
+from time import perf_counter, time
+from typing import Callable, Iterable, Iterator
+from concurrent.futures import ThreadPoolExecutor
+from .client import TikTokClient, get_default_client
+from .download import download_stats, probe_ranges
+from .functions import get_video_id
+from .video import download_file, get_all_data_from_url, get_original_video_header, _get_download_url, _get_video_file_path
+
+logger = logging.getLogger(__name__)
+
+
+class download_result:
+    """
+    The outcome of one URL of a `DownloadManager` run.
+
+    `status` is `downloaded`, `skipped` (the file was already complete) or `failed`,
+    in which case `error` holds the exception.
+    """
+    def __init__(self, url: str, video_id: str | None = None, path: str | None = None):
+        self.url = url
+        self.video_id = video_id
+        self.path = path
+        self.status = "failed"
+        self.size = 0
+        self.stats: download_stats | None = None
+        self.error: Exception | None = None
+
+    def __repr__(self)-> str:
+        return f"<download_result ({self.video_id},{self.status})>"
+
+    @property
+    def ok(self)-> bool:
+        return self.status != "failed"
+
+
+class download_progress:
+    """
+    The aggregate progress of a `DownloadManager` run.
+    """
+    def __init__(self):
+        self.submitted = 0
+        self.downloaded = 0
+        self.skipped = 0
+        self.failed = 0
+        self.bytes = 0
+        self.started = perf_counter()
+
+    def __repr__(self)-> str:
+        return (f"<download_progress ({self.completed}/{self.submitted},downloaded={self.downloaded},"
+                f"skipped={self.skipped},failed={self.failed},{self.bandwidth / 1e6:.1f} MB/s)>")
+
+    @property
+    def completed(self)-> int:
+        return self.downloaded + self.skipped + self.failed
+
+    @property
+    def elapsed(self)-> float:
+        return perf_counter() - self.started
+
+    @property
+    def bandwidth(self)-> float:
+        """
+        :return: The bytes downloaded per second since the start of the run.
+        """
+        elapsed = self.elapsed
+        return self.bytes / elapsed if elapsed > 0 else 0.0
+
+
+class DownloadManager:
+    """
+    Downloads the original videos of many TikTok URLs into one directory.
+
+    Pages are fetched and parsed in one bounded pool and the files are downloaded in
+    another, so slow downloads never starve the page fetches and the reverse. Only a
+    bounded number of URLs are in the pipeline at once, the download addresses of the
+    pages do not expire while waiting.
+
+    Files are written to a temporary file and renamed once complete. Completed videos
+    are appended to a JSON Lines manifest in the directory: an interrupted run started
+    again skips them without any request. Files found on disk but not in the manifest
+    are kept if their size matches the size served.
+
+    Usage:
+
+        manager = DownloadManager("videos", page_workers=4, download_workers=8)
+        for result in manager.iter_run(urls):
+            print(result, manager.progress)
+    """
+    def __init__(self, directory: str, client: TikTokClient | None = None, page_workers: int = 4, download_workers: int = 4, segments: int = 1, chunk_size: int = 1 << 16, manifest: str = "manifest.jsonl", verify: bool = True, progress: Callable[[download_progress], None] | None = None):
+        """
+        :param directory: The directory of the videos, created if needed.
+        :param client: The client used to send the requests. Defaults to the shared client.
+        :param page_workers: Number of pages fetched at the same time.
+        :param download_workers: Number of files downloaded at the same time.
+        :param segments: Number of byte ranges fetched concurrently per file, see `download_file`.
+        :param chunk_size: Size of the chunks read from the network and written to disk.
+        :param manifest: The name of the manifest file, in `directory`.
+        :param verify: Compare the size of the files found on disk with the size served before keeping them.
+            When False, any existing file is kept.
+        :param progress: A function called with the `download_progress` after each URL.
+        """
+        self.directory = directory
+        self.client = client or get_default_client()
+        self.page_workers = page_workers
+        self.download_workers = download_workers
+        self.segments = segments
+        self.chunk_size = chunk_size
+        self.manifest_path = os.path.join(directory, manifest)
+        self.verify = verify
+        self.on_progress = progress
+        self.progress = download_progress()
+
+        os.makedirs(directory, exist_ok=True)
+        self._lock = threading.Lock()
+        self._completed = self._load_manifest()
+
+    def __repr__(self)-> str:
+        return f"<DownloadManager ({self.directory},completed={len(self._completed)})>"
+
+    def _load_manifest(self)-> dict[str, dict]:
+        completed = {}
+        try:
+            with open(self.manifest_path, encoding="utf-8") as file:
+                for line in file:
+                    try:
+                        entry = json.loads(line)
+                        completed[entry["video_id"]] = entry
+                    except (ValueError, KeyError):
+                        # A line cut by an interruption, the video is simply downloaded again
+                        continue
+        except FileNotFoundError:
+            pass
+        return completed
+
+    def _record(self, result: download_result)-> None:
+        entry = {"video_id": result.video_id, "path": os.path.basename(result.path), "size": result.size, "completed_at": time()}
+        line = json.dumps(entry) + "\n"
+        with self._lock:
+            self._completed[result.video_id] = entry
+            with open(self.manifest_path, "a", encoding="utf-8") as file:
+                file.write(line)
+                file.flush()
+                os.fsync(file.fileno())
+
+    def is_completed(self, video_id: str)-> bool:
+        """
+        :return: Whether the video is in the manifest and its file is still complete on disk.
+        """
+        entry = self._completed.get(video_id)
+        if entry is None:
+            return False
+        try:
+            return os.path.getsize(os.path.join(self.directory, entry["path"])) == entry["size"]
+        except OSError:
+            return False
+
+    def _fetch_page(self, result: download_result)-> tuple[str, dict] | None:
+        """
+        Fetch the page of a video, return the download URL and headers, or None when there is nothing to download.
+        """
+        if self.is_completed(result.video_id):
+            result.status = "skipped"
+            result.size = self._completed[result.video_id]["size"]
+            return None
+
+        response = self.client.get(result.url, endpoint="video")
+        response.raise_for_status()
+        data = get_all_data_from_url(response.text)
+        download_url = _get_download_url(data)
+        user_cookie = self.client.session.headers.get("cookie")
+        return download_url, get_original_video_header(download_url, response.cookies, user_cookie)
+
+    def _download(self, result: download_result, download_url: str, header: dict)-> None:
+        path = result.path
+        if os.path.exists(path):
+            local_size = os.path.getsize(path)
+            if not self.verify:
+                result.status, result.size = "skipped", local_size
+                self._record(result)
+                return
+            size, response = probe_ranges(self.client, download_url, header)
+            if response is not None:
+                response.close()
+            if size == local_size:
+                result.status, result.size = "skipped", local_size
+                self._record(result)
+                return
+
+        stats = download_file(download_url, header, path, client=self.client, segments=self.segments, chunk_size=self.chunk_size, resume=self.segments > 1)
+        result.stats = stats
+        if not stats:
+            raise IOError(f"Download of {download_url} failed")
+        result.status, result.size = "downloaded", os.path.getsize(path)
+        self._record(result)
+
+    def _finish(self, result: download_result, results: queue.Queue, slots: threading.Semaphore)-> None:
+        with self._lock:
+            progress = self.progress
+            if result.status == "downloaded":
+                progress.downloaded += 1
+                progress.bytes += result.stats.downloaded
+            elif result.status == "skipped":
+                progress.skipped += 1
+            else:
+                progress.failed += 1
+        results.put(result)
+        slots.release()
+
+    def iter_run(self, urls: Iterable[str]) -> Iterator[download_result]:
+        """
+        Download the videos of the URLs, yielding the results in completion order.
+
+        URLs are consumed lazily, `urls` can be a generator fed from a queue. URLs of the
+        same video are downloaded once.
+
+        :param urls: The URLs of the TikTok videos.
+        :return: An iterator of `download_result`, one per distinct video.
+        """
+        results: queue.Queue[download_result] = queue.Queue()
+        # URLs in the pipeline, enough to keep both pools busy
+        slots = threading.Semaphore(self.page_workers + 2 * self.download_workers)
+        seen: set[str] = set()
+        pending = 0
+
+        # The page pool is shut down first, its tasks hand their downloads over to the other pool
+        with ThreadPoolExecutor(max_workers=self.download_workers) as downloads, ThreadPoolExecutor(max_workers=self.page_workers) as pages:
+            def download_stage(result: download_result, download_url: str, header: dict)-> None:
+                try:
+                    self._download(result, download_url, header)
+                except Exception as e:
+                    result.error = e
+                    logger.error("Failed to download video %s: %s", result.video_id, e, extra={"endpoint": "download", "url": result.url})
+                self._finish(result, results, slots)
+
+            def page_stage(result: download_result)-> None:
+                try:
+                    target = self._fetch_page(result)
+                except Exception as e:
+                    result.error = e
+                    logger.error("Failed to fetch the page of video %s: %s", result.video_id, e, extra={"endpoint": "video", "url": result.url})
+                    target = None
+                if target is None:
+                    self._finish(result, results, slots)
+                else:
+                    downloads.submit(download_stage, result, *target)
+
+            for url in urls:
+                try:
+                    video_id = get_video_id(url)
+                except Exception as e:
+                    result = download_result(url)
+                    result.error = ValueError(f"No video ID found in {url}")
+                    result.error.__cause__ = e
+                    with self._lock:
+                        self.progress.submitted += 1
+                        self.progress.failed += 1
+                    self._report()
+                    yield result
+                    continue
+                if video_id in seen:
+                    continue
+                seen.add(video_id)
+
+                slots.acquire()
+                with self._lock:
+                    self.progress.submitted += 1
+                pending += 1
+                pages.submit(page_stage, download_result(url, video_id, _get_video_file_path(video_id, self.directory)))
+
+                while pending:
+                    try:
+                        result = results.get_nowait()
+                    except queue.Empty:
+                        break
+                    pending -= 1
+                    self._report()
+                    yield result
+
+            while pending:
+                result = results.get()
+                pending -= 1
+                self._report()
+                yield result
+
+        logger.info("Download run finished: %r", self.progress)
+
+    def run(self, urls: Iterable[str]) -> list[download_result]:
+        """
+        Download the videos of the URLs.
+
+        :param urls: The URLs of the TikTok videos.
+        :return: A list of `download_result`, one per distinct video, in completion order.
+        """
+        return list(self.iter_run(urls))
+
+    def _report(self)-> None:
+        if self.on_progress is not None:
+            self.on_progress(self.progress)
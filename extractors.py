@@ -0,0 +1,207 @@
+import os
+import zlib
+from functools import lru_cache
+from sys import intern
+from operator import itemgetter
+from typing import Any, Callable
+from .decoding import LAZY_TYPES, materialize
+
+MISSING = object()
+
+_LOOKUP_ERRORS = (KeyError, IndexError, TypeError)
+
+
+def _parse_path(path: str) -> tuple:
+    """
+    Split a `a/b/0/c` path into its keys, numeric parts becoming list indexes.
+    """
+    keys = []
+    for value in path.split("/"):
+        try:
+            keys.append(int(value))
+        except ValueError:
+            keys.append(value)
+    return tuple(keys)
+
+
+@lru_cache(maxsize=None)
+def compile_path(path: str, default: Any = MISSING) -> Callable[[Any], Any]:
+    """
+    Compile a `a/b/c` path into a getter returning `data["a"]["b"]["c"]`.
+
+    Numeric parts of the path are used as list indexes.
+
+    :param path: The path to the value, parts separated by `/`.
+    :param default: The value returned when the path does not exist. If not given, `KeyError` is raised.
+    :return: A callable taking the data and returning the value at `path`.
+    """
+    keys = _parse_path(path)
+
+    # Specialize the common short paths, they are the vast majority of the mappings
+    if len(keys) == 1:
+        lookup = itemgetter(keys[0])
+    elif len(keys) == 2:
+        first, second = keys
+        lookup = lambda data: data[first][second]
+    elif len(keys) == 3:
+        first, second, third = keys
+        lookup = lambda data: data[first][second][third]
+    else:
+        def lookup(data):
+            for key in keys:
+                data = data[key]
+            return data
+
+    if default is MISSING:
+        def getter(data):
+            try:
+                return lookup(data)
+            except _LOOKUP_ERRORS as e:
+                raise KeyError(path) from e
+    else:
+        def getter(data):
+            try:
+                return lookup(data)
+            except _LOOKUP_ERRORS:
+                return default
+
+    return getter
+
+
+def _interning(getter: Callable[[Any], Any]) -> Callable[[Any], Any]:
+    """
+    Wrap a getter so that the strings it returns are interned.
+    """
+    def interned_getter(data):
+        value = getter(data)
+        return intern(value) if type(value) is str else value
+    return interned_getter
+
+
+def _materializing(getter: Callable[[Any], Any]) -> Callable[[Any], Any]:
+    """
+    Wrap a getter so that the lazy `simdjson` objects and arrays it returns become plain
+    dicts and lists, which stay valid once the parsed document is gone.
+    """
+    def plain_getter(data):
+        value = getter(data)
+        return materialize(value) if isinstance(value, LAZY_TYPES) else value
+    return plain_getter
+
+
+def _mapping_file(name: str) -> str:
+    return os.path.join(os.path.dirname(__file__), "yaml", f"{name}.yaml")
+
+
+@lru_cache(maxsize=None)
+def load_mapping(name: str) -> dict[str, str]:
+    """
+    Load a path configuration file of the `yaml` directory, once per process.
+
+    The mappings precompiled into `_mappings.py` are used when they match the checksum of
+    their YAML file, so `yaml` is only imported for new or edited files.
+
+    :param name: The name of the file, without extension, e.g. `comments_path`.
+    :return: The mapping of attribute names to paths.
+    """
+    from ._mappings import MAPPINGS
+
+    compiled = MAPPINGS.get(name)
+    try:
+        with open(_mapping_file(name), "rb") as file:
+            content = file.read()
+    except FileNotFoundError:
+        # Deployments without the `yaml` directory rely on the precompiled mappings only
+        if compiled is None:
+            raise
+        return dict(compiled[1])
+
+    if compiled is not None and compiled[0] == zlib.crc32(content):
+        return dict(compiled[1])
+
+    import yaml
+
+    return yaml.safe_load(content)
+
+
+def write_compiled_mappings() -> str:
+    """
+    Regenerate `_mappings.py` from the files of the `yaml` directory.
+
+    Run `python -m <package>.extractors` after editing a mapping; until then the edited
+    file is read with `yaml` at runtime.
+
+    :return: The path of the written module.
+    """
+    import yaml
+
+    directory = os.path.join(os.path.dirname(__file__), "yaml")
+    lines = [
+        "# Generated from the `yaml` directory by `python -m <package>.extractors`, do not edit.",
+        "# name: (crc32 of the YAML file, mapping)",
+        "MAPPINGS = {",
+    ]
+    for filename in sorted(os.listdir(directory)):
+        name, extension = os.path.splitext(filename)
+        if extension != ".yaml":
+            continue
+        with open(os.path.join(directory, filename), "rb") as file:
+            content = file.read()
+        lines.append(f"    {name!r}: ({zlib.crc32(content)}, {{")
+        lines.extend(f"        {key!r}: {value!r}," for key, value in yaml.safe_load(content).items())
+        lines.append("    }),")
+    lines.append("}")
+
+    path = os.path.join(os.path.dirname(__file__), "_mappings.py")
+    with open(path, "w", encoding="utf-8") as file:
+        file.write("\n".join(lines) + "\n")
+    return path
+
+
+@lru_cache(maxsize=None)
+def record_extractor(name: str, cls: type, default: Any = MISSING, fields: tuple[str, ...] | None = None, prefix: str = "") -> Callable[[Any], Any]:
+    """
+    Build a function turning a JSON object into an instance of `cls`, following the mapping `name`.
+
+    The mapping is loaded and its paths compiled once; extracting a record is then a single
+    loop over the precompiled getters.
+
+    :param name: The name of the path configuration file, e.g. `video_details_path`.
+    :param cls: The data class to fill. The string values of the fields listed in its
+        `_interned_fields` are interned, repeated values then share a single string.
+    :param default: The value of the attributes whose path is missing. If not given, `KeyError` is raised.
+    :param fields: Only fill these attributes of the mapping, the others are left unset. Defaults to all of them.
+    :param prefix: A path prefix removed from the paths of the mapping, to extract the same records from objects
+        found at another level, e.g. `itemInfo/itemStruct/` for the items of a list. Paths not starting with it are kept.
+    :return: A callable taking the JSON object and returning the filled `cls` instance.
+    :raises ValueError: If a field is not in the mapping.
+    """
+    mapping = load_mapping(name)
+    if fields is not None:
+        unknown = [field for field in fields if field not in mapping]
+        if unknown:
+            raise ValueError(f"Unknown fields {unknown} for the mapping {name}, expected some of {tuple(mapping)}")
+        mapping = {key: value for key, value in mapping.items() if key in fields}
+    if prefix:
+        mapping = {key: value[len(prefix):] if value.startswith(prefix) else value for key, value in mapping.items()}
+
+    interned = getattr(cls, "_interned_fields", ())
+    getters = tuple(
+        (key, _interning(compile_path(value, default)) if key in interned else compile_path(value, default))
+        for key, value in mapping.items()
+    )
+    if LAZY_TYPES:
+        # Nested values read from a lazy document, e.g. the `textExtra` list, must not be proxies
+        getters = tuple((key, _materializing(getter)) for key, getter in getters)
+
+    def extract(data) -> Any:
+        obj = cls()
+        for key, getter in getters:
+            setattr(obj, key, getter(data))
+        return obj
+
+    return extract
+
+
+if __name__ == "__main__":
+    print(f"Written {write_compiled_mappings()}")
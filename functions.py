@@ -1,5 +1,30 @@
-from re import findall
+import json
+from re import findall, compile
+
+_decoder = json.JSONDecoder()
+_whitespace = compile(r'\s*')
 
 def get_video_id(url:str)-> str:
     url_end = url.split("/")[-1]
     return findall(r'[0-9]{4,}',url_end)[0]
+
+def extract_embedded_json(page_content: str, key: str) -> any:
+    """
+    Decodes the JSON value stored under `key` in the hydration data of a TikTok page.
+
+    The value is decoded in a single pass with `JSONDecoder.raw_decode`, starting right
+    after `"key":`, and decoding stops at the end of that value whatever follows it.
+
+    :param page_content: The HTML content of the TikTok page.
+    :param key: The key of the value, e.g. `webapp.video-detail`.
+    :return: The decoded value.
+    :raises ValueError: If the key is not found or its value is not valid JSON.
+    """
+    marker = f'"{key}":'
+    start = page_content.find(marker)
+    if start == -1:
+        raise ValueError(f"{marker} was not found in the page content")
+
+    start = _whitespace.match(page_content, start + len(marker)).end()
+    value, _ = _decoder.raw_decode(page_content, start)
+    return value
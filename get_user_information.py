@@ -1,18 +1,53 @@
+import logging
 import requests
-import os
-import json
-import yaml
-from .tikheaders import get_headers
-from typing import Optional
-from copy import deepcopy
+from datetime import datetime
+from random import randint
+from time import perf_counter
+from concurrent.futures import ThreadPoolExecutor
+from . import metrics
+from .client import TikTokClient, get_default_client
+from .decoding import decode_records
+from .functions import extract_embedded_json
+from .extractors import compile_path, record_extractor
+from .cache import fetch_page_data, user_key
+from .templates import USER_POST_TEMPLATE
+from .video import video_details
+from typing import Iterator, Optional
+
+logger = logging.getLogger(__name__)
 
 class user_information:
     """
     Basic information about the author
     """
+    __slots__ = (
+        "id",
+        "uniqueId",
+        "secUid",
+        "nickname",
+        "description",
+        "createTime",
+        "nickNameModifyTime",
+        "verified",
+        "secret",
+        "privateAccount",
+        "followerCount",
+        "followingCount",
+        "heartCount",
+        "videoCount",
+        "diggCount",
+        "friendCount",
+        "language",
+        "region",
+    )
+
+    # Low-cardinality fields whose strings are interned by the extractor
+    _interned_fields = ("language", "region")
+
     def __init__(self, *args):
         self.id: str
         self.uniqueId: str
+        self.secUid: str
         self.nickname: str
         self.description: str
         self.createTime: int
@@ -43,7 +78,13 @@ class user_information:
             return None
     
     def get_all(self):
-        return self.__dict__
+        data = {}
+        for name in self.__slots__:
+            try:
+                data[name] = getattr(self, name)
+            except AttributeError:
+                pass
+        return data
     
 
 
@@ -56,76 +97,283 @@ class user_information:
         :param path: The path to the data in the dictionary.
         :return: The extracted data.
         :raises KeyError: If the specified path is not found in the data.
-        :raises Exception: If an unexpected error occurs during data extraction.
         """
-        try:
-            key = "/"
-            temp = list(map(
-                lambda value: f'["{value}"]',
-                path.split(key)
-            ))
-            new_path = ""
-            for val in temp:
-                new_path += val
-
-        except KeyError as e:
-            raise KeyError("Cannot find the path in the data structure") from e
-        
-        except Exception as e:
-            print(f"An unexpected error occurred while extracting data: {e}")
-            raise Exception("Failed to extract data from path") from e
-        
-        return eval(f"data{new_path}")
-
-
-def get_user_info(url: str) -> user_information:
+        return compile_path(path)(data)
+
+
+def _extract_user_data(page_content: str) -> dict:
+    """
+    Extracts and parses the user JSON data embedded in the page content.
+
+    :param page_content: The HTML content of the TikTok user page.
+    :return: A dictionary containing the extracted data.
+    """
+
+    registry = metrics.active
+    started = perf_counter() if registry is not None else 0.0
+
+    # Decode the JSON data embedded in the page content
+    data = extract_embedded_json(page_content, "webapp.user-detail")
+
+    if registry is not None:
+        registry.observe("tiktok_parse_seconds", perf_counter() - started, endpoint="user")
+    return data
+
+
+def _build_user_info(data: dict) -> user_information:
+    """
+    Fills a `user_information` object from the data of a TikTok user page.
+
+    :param data: The data extracted from the page by `_extract_user_data`.
+    :return: An instance of the `user_information` class.
+    """
+
+    # The mapping of `user_info_path.yaml` is compiled once, on first use
+    extract = record_extractor("user_info_path", user_information)
+    registry = metrics.active
+    if registry is None:
+        return extract(data)
+
+    started = perf_counter()
+    user_info = extract(data)
+    registry.inc("tiktok_extract_seconds_total", perf_counter() - started, endpoint="user")
+    registry.inc("tiktok_extracted_records_total", endpoint="user")
+    return user_info
+
+
+def get_user_info(url: str, client: TikTokClient | None = None) -> user_information:
     """
     Retrieves detailed information about a TikTok user.
 
     :param url: The URL of the TikTok user profile.
+    :param client: The client used to send the request. Defaults to the shared client.
     :return: An instance of the `user_information` class containing the user's details.
     :raises FileNotFoundError: If the path to the JSON configuration file is not found.
     :raises KeyError: If required keys are missing in the JSON data.
     :raises Exception: If an unexpected error occurs during the process.
     """
-    try:
-        _headers = deepcopy(get_headers)
-
-        # Make a request to the TikTok user page to get its content
-        response = requests.get(url, headers=_headers)
-        page_content = response.text
-
-        # Extract JSON data embedded in the page content
-        data = page_content[page_content.find('"webapp.user-detail":'):]
-        data = data[data.find('"webapp.user-detail":'):data.find("</script>")].replace('"webapp.user-detail":', '')
-        
-        # Attempt to parse the extracted JSON data
-        while len(data) > 0:
-            try:
-                data = json.loads(data)
-                break
-            except:
-                data = data[:-1]
+    client = client or get_default_client()
 
-        # Load the paths configuration file
-        with open(f"{os.path.dirname(__file__)}/yaml/user_info_path.yaml", 'r') as file:
-            paths: dict = yaml.safe_load(file)
-
-        user_info = user_information()
-        for key, value in paths.items():
-            user_info.__setattr__(key, user_information.extract_data_from_path(data, value))
+    try:
+        # Get the data of the TikTok user page, from the cache of the client if it has one
+        data = fetch_page_data(client, "user", user_key(url), url, _extract_user_data)
+        user_info = _build_user_info(data)
 
     except FileNotFoundError as fnf_err:
-        print(f"File not found: {fnf_err}")
+        logger.error("File not found: %s", fnf_err, extra={"endpoint": "user", "url": url})
         raise Exception("Required file for extracting user details was not found") from fnf_err
     
     except KeyError as key_err:
-        print(f"Error extracting user details: {key_err}")
+        logger.error("Error extracting user details: %s", key_err, extra={"endpoint": "user", "url": url})
         raise Exception("Failed to find necessary keys in data structure") from key_err
 
     except Exception as e:
-        print(f"An unexpected error occurred while retrieving user details: {e}")
+        logger.error("An unexpected error occurred while retrieving user details: %s", e, extra={"endpoint": "user", "url": url})
         raise Exception("Failed to retrieve user details") from e
 
     return user_info
 
+
+# The items of `/api/post/item_list/` are the `itemInfo/itemStruct` objects of the video pages
+_ITEM_PREFIX = "itemInfo/itemStruct/"
+_POST_KEYS = ("cursor", "hasMore")
+
+
+def _post_values(sec_uid: str, msToken: str, maxcount: int, cursor: int) -> dict:
+    """
+    The dynamic parameters of a request of the videos of a user.
+
+    The static parameters come from `templates.USER_POST_TEMPLATE`.
+    """
+    return {
+        "count": maxcount,                                           # Number of videos to fetch
+        "cursor": cursor,                                            # createTime of the last video fetched, in milliseconds
+        "device_id": ''.join(str(randint(1, 9)) for _ in range(19)), # Random device ID with length 19
+        "screen_height": randint(500, 1000),                         # Random screen height between 500 and 1000
+        "screen_width": randint(1000, 1500),                         # Random screen width between 1000 and 1500
+        "secUid": sec_uid,                                           # secUid of the user
+        "msToken": msToken,                                          # Token for authentication
+    }
+
+
+def _fetch_post_page(sec_uid: str, msToken: str, maxcount: int, cursor: int, client: TikTokClient) -> tuple[list[tuple[video_details, bool]], int | None]:
+    """
+    Fetch and decode one page of the videos of a user. Request errors are raised.
+
+    :return: The `(video_details, pinned)` pairs of the page, newest first, and the cursor
+        of the next page (None on the last page).
+    """
+    url = USER_POST_TEMPLATE.url(client.base_url, **_post_values(sec_uid, msToken, maxcount, cursor))
+    response = client.get(url, endpoint="post", empty_is_throttle=True)
+    response.raise_for_status()
+
+    # The mapping of `video_details_path.yaml`, relative to the items
+    extract = record_extractor("video_details_path", video_details, None, prefix=_ITEM_PREFIX)
+    registry = metrics.active
+    started = perf_counter() if registry is not None else 0.0
+    items, values = decode_records(response.content, "itemList", lambda item: (extract(item), bool(item.get("isPinnedItem", False))), _POST_KEYS)
+    if registry is not None:
+        registry.observe("tiktok_parse_seconds", perf_counter() - started, endpoint="post")
+        registry.inc("tiktok_extracted_records_total", len(items), endpoint="post")
+
+    try:
+        next_cursor = int(values["cursor"])
+    except (KeyError, TypeError, ValueError):
+        next_cursor = None
+    if not items or not values.get("hasMore") or not next_cursor or next_cursor == cursor:
+        # The end of the list, or a cursor that would loop
+        next_cursor = None
+    return items, next_cursor
+
+
+class _UnplannedCursor(Exception):
+    """
+    The server did not page a time window from the requested cursor.
+    """
+
+
+def _select_posts(items: list[tuple[video_details, bool]], start: float | None, end: float | None, planned: bool) -> tuple[list[video_details], bool]:
+    """
+    Select the videos of a page created in `[start, end)`.
+
+    Pinned videos come first whatever their age, they are skipped when out of the window
+    and do not end the walk.
+
+    :param planned: Whether the page is the first one of a walk from the cursor `end`.
+    :return: The videos, and whether the walk reached `start`.
+    :raises _UnplannedCursor: If `planned` and the page starts with a newer video.
+    """
+    videos = []
+    for details, pinned in items:
+        created = details.createTime
+        if end is not None and created is not None and created >= end:
+            if planned and not pinned:
+                raise _UnplannedCursor(f"cursor {int(end * 1000)} returned a video created at {created}")
+            continue
+        planned = False
+        if start is not None and created is not None and created < start:
+            if pinned:
+                continue
+            return videos, True
+        videos.append(details)
+    return videos, False
+
+
+def _walk_posts(sec_uid: str, msToken: str, maxcount: int, client: TikTokClient, start: float | None, end: float | None) -> Iterator[video_details]:
+    """
+    Walk the videos of a user created in `[start, end)`, newest first, from the cursor `end`.
+
+    :raises _UnplannedCursor: If the first page holds newer videos.
+    """
+    cursor = int(end * 1000) if end is not None else 0
+    planned = end is not None
+    while cursor is not None:
+        items, next_cursor = _fetch_post_page(sec_uid, msToken, maxcount, cursor, client)
+        videos, done = _select_posts(items, start, end, planned)
+        yield from videos
+        if done:
+            return
+        planned = False
+        cursor = next_cursor
+
+
+def iter_user_videos(url: str, msToken: str, since: datetime | float | None = None, maxcount: int = 35, concurrency: int = 1, client: TikTokClient | None = None) -> Iterator[video_details]:
+    """
+    Iterate over the videos of a TikTok user, newest first.
+
+    The `secUid` of the user is read from the profile page (see `get_user_info`), then the
+    item list API is paged. The `video_details` are built from the items of the list with the
+    mapping of `video_details_path.yaml`, no video page is fetched.
+
+    The API pages by `createTime`: with `concurrency` above 1, the time from `since` (or the
+    creation of the account) to the end of the first page is split into `concurrency` windows
+    walked in parallel, each from its own cursor, and yielded in order as soon as the newer
+    windows are done. If the server does not page a window from its cursor, the remaining
+    videos are walked page by page instead.
+
+    :param url: The URL of the TikTok user profile.
+    :param msToken: A token required for authenticating the request.
+    :param since: Stop at the videos created before this time, a `datetime` or a Unix timestamp (default: all the videos).
+    :param maxcount: Maximum number of videos to fetch in one request (default: 35).
+    :param concurrency: Number of time windows walked at once (default: 1, sequential).
+    :param client: The client used to send the requests (default: the shared client).
+    :return: An iterator of `video_details` objects.
+    """
+    client = client or get_default_client()
+    if isinstance(since, datetime):
+        since = since.timestamp()
+
+    # Pinned videos are listed twice, at the top and in their place
+    seen: set[str] = set()
+
+    def fresh(videos) -> Iterator[video_details]:
+        for details in videos:
+            if details.video_id not in seen:
+                seen.add(details.video_id)
+                yield details
+
+    executor = None
+    try:
+        user = get_user_info(url, client=client)
+        sec_uid = user.secUid
+
+        if concurrency <= 1:
+            yield from fresh(_walk_posts(sec_uid, msToken, maxcount, client, since, None))
+            return
+
+        # The first page, with the pinned videos, gives the newest cursor
+        items, next_cursor = _fetch_post_page(sec_uid, msToken, maxcount, 0, client)
+        videos, done = _select_posts(items, since, None, False)
+        yield from fresh(videos)
+        if done or next_cursor is None:
+            return
+
+        last_created = items[-1][0].createTime
+        if last_created is None or abs(next_cursor / 1000 - last_created) > 1:
+            # Not a time cursor, the windows cannot be planned
+            logger.debug("The videos of %s are not paged by time, walking them page by page", url, extra={"endpoint": "post", "url": url})
+            yield from fresh(_walk_posts(sec_uid, msToken, maxcount, client, since, None))
+            return
+
+        # Equal windows from the oldest possible video to the end of the first page, newest first.
+        # Without `since` the oldest window is left open, in case of videos older than the account
+        upper = next_cursor / 1000
+        lower = min(since if since is not None else (user.createTime or 0), upper)
+        width = (upper - lower) / concurrency
+        bounds = [lower + width * i for i in range(concurrency)] + [upper]
+        windows = [(bounds[i] if i else since, bounds[i + 1]) for i in reversed(range(concurrency))]
+
+        executor = ThreadPoolExecutor(max_workers=concurrency)
+        futures = [executor.submit(lambda window: list(_walk_posts(sec_uid, msToken, maxcount, client, *window)), window) for window in windows]
+        try:
+            for future in futures:
+                yield from fresh(future.result())
+            return
+        except _UnplannedCursor as e:
+            logger.debug("The videos of %s cannot be paged by time, walking them page by page: %s", url, e, extra={"endpoint": "post", "url": url})
+
+        # The videos already yielded are skipped
+        yield from fresh(_walk_posts(sec_uid, msToken, maxcount, client, since, None))
+
+    except requests.exceptions.RequestException as e:
+        # Handle any errors related to the request itself
+        logger.error("Request failed: %s", e, extra={"endpoint": "post", "url": url})
+
+    except Exception as e:
+        # Handle any other unexpected errors
+        logger.exception("An unexpected error occurred: %s", e, extra={"endpoint": "post", "url": url})
+
+    finally:
+        if executor is not None:
+            executor.shutdown(wait=False, cancel_futures=True)
+
+
+def get_user_videos(url: str, msToken: str, since: datetime | float | None = None, maxcount: int = 35, concurrency: int = 1, client: TikTokClient | None = None) -> list[video_details]:
+    """
+    Fetch the videos of a TikTok user, newest first.
+
+    See `iter_user_videos`.
+
+    :return: A list of `video_details` objects.
+    """
+    return list(iter_user_videos(url, msToken, since=since, maxcount=maxcount, concurrency=concurrency, client=client))
@@ -0,0 +1,228 @@
+"""
+Instrumentation of the network and parsing hot paths.
+
+Disabled by default: every instrumented call site only checks `metrics.active`, which is
+None until `enable_metrics` is called, so the cost of the instrumentation is one attribute
+lookup per request or page.
+
+    registry = enable_metrics()
+    get_comments(url, msToken)
+    print(registry.to_prometheus())
+
+Recorded metrics, all labelled by `endpoint` (`comment`, `reply`, `video`, `user`, `download`):
+
+- `tiktok_request_seconds` (histogram): latency of each HTTP attempt,
+- `tiktok_responses_total` (counter): responses, also labelled by `status` (`error` for connection errors),
+- `tiktok_response_bytes_total` (counter): bytes received,
+- `tiktok_retries_total` (counter): retries of the `RequestScheduler`,
+- `tiktok_parse_seconds` (histogram): extraction of the JSON embedded in video and user pages,
+  and decoding of the comment and reply pages with their records,
+- `tiktok_extract_seconds_total` (counter): time spent filling the data classes from the YAML
+  mappings, also within the decoding of the comment and reply pages,
+- `tiktok_extracted_records_total` (counter): records filled from the YAML mappings.
+"""
+import threading
+from bisect import bisect_left
+from http.server import ThreadingHTTPServer, BaseHTTPRequestHandler
+from typing import Callable
+
+DEFAULT_BUCKETS = (0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0)
+
+_HELP = {
+    "tiktok_request_seconds": "Latency of the HTTP requests, per attempt.",
+    "tiktok_responses_total": "HTTP responses received, by status.",
+    "tiktok_response_bytes_total": "Bytes received.",
+    "tiktok_retries_total": "Requests retried by the scheduler.",
+    "tiktok_parse_seconds": "Time spent extracting the JSON embedded in a page.",
+    "tiktok_extract_seconds_total": "Time spent filling data classes from the path mappings.",
+    "tiktok_extracted_records_total": "Records filled from the path mappings.",
+}
+
+# A hook receives the kind of metric (`counter` or `histogram`), its name, the value and the labels
+Hook = Callable[[str, str, float, dict], None]
+
+
+class _histogram:
+    __slots__ = ("buckets", "counts", "sum", "count")
+
+    def __init__(self, buckets: tuple[float, ...]):
+        self.buckets = buckets
+        self.counts = [0] * (len(buckets) + 1)
+        self.sum = 0.0
+        self.count = 0
+
+
+class MetricsRegistry:
+    """
+    Thread-safe store of counters and histograms, keyed by name and labels.
+
+    Hooks added with `add_hook` are called on every recorded value, e.g. to forward the
+    events to another monitoring system.
+    """
+    def __init__(self, buckets: tuple[float, ...] = DEFAULT_BUCKETS):
+        """
+        :param buckets: Upper bounds of the histogram buckets, in increasing order.
+        """
+        self.buckets = tuple(buckets)
+        self._counters: dict[tuple[str, tuple], float] = {}
+        self._histograms: dict[tuple[str, tuple], _histogram] = {}
+        self._hooks: list[Hook] = []
+        self._lock = threading.Lock()
+
+    def add_hook(self, hook: Hook)-> None:
+        """
+        Call `hook(kind, name, value, labels)` on every recorded value.
+        """
+        self._hooks.append(hook)
+
+    def remove_hook(self, hook: Hook)-> None:
+        self._hooks.remove(hook)
+
+    def inc(self, name: str, value: float = 1, **labels)-> None:
+        """
+        Increase a counter.
+
+        :param name: The name of the counter, e.g. `tiktok_retries_total`.
+        :param value: The increment.
+        :param labels: The labels of the value, e.g. `endpoint="comment"`.
+        """
+        key = (name, tuple(sorted(labels.items())))
+        with self._lock:
+            self._counters[key] = self._counters.get(key, 0) + value
+        for hook in self._hooks:
+            hook("counter", name, value, labels)
+
+    def observe(self, name: str, value: float, **labels)-> None:
+        """
+        Record a value in a histogram.
+
+        :param name: The name of the histogram, e.g. `tiktok_request_seconds`.
+        :param value: The observed value.
+        :param labels: The labels of the value, e.g. `endpoint="comment"`.
+        """
+        key = (name, tuple(sorted(labels.items())))
+        with self._lock:
+            histogram = self._histograms.get(key)
+            if histogram is None:
+                histogram = self._histograms[key] = _histogram(self.buckets)
+            histogram.counts[bisect_left(self.buckets, value)] += 1
+            histogram.sum += value
+            histogram.count += 1
+        for hook in self._hooks:
+            hook("histogram", name, value, labels)
+
+    def counter(self, name: str, **labels)-> float:
+        """
+        :return: The value of a counter, 0 if it was never increased.
+        """
+        return self._counters.get((name, tuple(sorted(labels.items()))), 0)
+
+    def snapshot(self)-> dict[str, list[dict]]:
+        """
+        :return: Every metric, as `{name: [{"labels": ..., "value": ...}, ...]}`; the value of a
+            histogram is a dict with its `count`, `sum` and cumulative `buckets`.
+        """
+        result: dict[str, list[dict]] = {}
+        with self._lock:
+            for (name, labels), value in self._counters.items():
+                result.setdefault(name, []).append({"labels": dict(labels), "value": value})
+            for (name, labels), histogram in self._histograms.items():
+                cumulative, buckets = 0, {}
+                for bound, count in zip(self.buckets, histogram.counts):
+                    cumulative += count
+                    buckets[bound] = cumulative
+                value = {"count": histogram.count, "sum": histogram.sum, "buckets": buckets}
+                result.setdefault(name, []).append({"labels": dict(labels), "value": value})
+        return result
+
+    def reset(self)-> None:
+        with self._lock:
+            self._counters.clear()
+            self._histograms.clear()
+
+    def to_prometheus(self)-> str:
+        """
+        :return: The metrics in the Prometheus text exposition format.
+        """
+        lines = []
+        for name, samples in sorted(self.snapshot().items()):
+            kind = "histogram" if isinstance(samples[0]["value"], dict) else "counter"
+            if name in _HELP:
+                lines.append(f"# HELP {name} {_HELP[name]}")
+            lines.append(f"# TYPE {name} {kind}")
+            for sample in samples:
+                labels, value = sample["labels"], sample["value"]
+                if kind == "counter":
+                    lines.append(f"{name}{_format_labels(labels)} {value}")
+                    continue
+                for bound, count in value["buckets"].items():
+                    lines.append(f"{name}_bucket{_format_labels({**labels, 'le': bound})} {count}")
+                lines.append(f"{name}_bucket{_format_labels({**labels, 'le': '+Inf'})} {value['count']}")
+                lines.append(f"{name}_sum{_format_labels(labels)} {value['sum']}")
+                lines.append(f"{name}_count{_format_labels(labels)} {value['count']}")
+        return "\n".join(lines) + "\n"
+
+
+def _escape(value)-> str:
+    return str(value).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+
+def _format_labels(labels: dict)-> str:
+    if not labels:
+        return ""
+    return "{" + ",".join(f'{key}="{_escape(value)}"' for key, value in labels.items()) + "}"
+
+
+# The registry receiving the metrics of the package, None when the instrumentation is disabled
+active: MetricsRegistry | None = None
+
+
+def enable_metrics(registry: MetricsRegistry | None = None)-> MetricsRegistry:
+    """
+    Start recording the metrics of the package.
+
+    :param registry: The registry receiving the metrics. A new one is created if not given.
+    :return: The active registry.
+    """
+    global active
+    active = registry if registry is not None else MetricsRegistry()
+    return active
+
+
+def disable_metrics()-> None:
+    """
+    Stop recording the metrics of the package.
+    """
+    global active
+    active = None
+
+
+def serve_prometheus(port: int = 9464, host: str = "127.0.0.1", registry: MetricsRegistry | None = None)-> ThreadingHTTPServer:
+    """
+    Serve the metrics in the Prometheus text format on `http://<host>:<port>/metrics`, from a daemon thread.
+
+    :param port: The port to listen on. 0 picks a free port.
+    :param host: The address to listen on.
+    :param registry: The registry to serve. Defaults to the active registry at the time of each scrape.
+    :return: The server, stop it with `shutdown()`.
+    """
+    class handler(BaseHTTPRequestHandler):
+        def log_message(self, *args):
+            pass
+
+        def do_GET(self):
+            current = registry if registry is not None else active
+            if self.path.split("?")[0] != "/metrics" or current is None:
+                self.send_error(404)
+                return
+            body = current.to_prometheus().encode()
+            self.send_response(200)
+            self.send_header("Content-Type", "text/plain; version=0.0.4; charset=utf-8")
+            self.send_header("Content-Length", str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+
+    server = ThreadingHTTPServer((host, port), handler)
+    server.daemon_threads = True
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server
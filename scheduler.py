@@ -0,0 +1,204 @@
+import requests
+from time import monotonic, sleep
+from random import uniform
+from threading import Condition, Lock
+from typing import Callable
+from . import metrics
+
+
+class TokenBucket:
+    """
+    Token bucket rate limiter, shared by the threads sending requests to one endpoint.
+    """
+    def __init__(self, rate: float, burst: float | None = None):
+        """
+        :param rate: Number of requests allowed per second.
+        :param burst: Number of requests that can be sent at once after an idle period. Defaults to `rate`.
+        """
+        self.rate = rate
+        self.burst = max(burst if burst is not None else rate, 1.0)
+        self._tokens = self.burst
+        self._updated = monotonic()
+        self._lock = Lock()
+
+    def acquire(self)-> None:
+        """
+        Take one token, waiting until one is available.
+        """
+        while True:
+            with self._lock:
+                now = monotonic()
+                self._tokens = min(self.burst, self._tokens + (now - self._updated) * self.rate)
+                self._updated = now
+                if self._tokens >= 1:
+                    self._tokens -= 1
+                    return
+                wait = (1 - self._tokens) / self.rate
+            sleep(wait)
+
+
+class _endpoint_state:
+    """
+    Concurrency window and counters of one endpoint.
+    """
+    def __init__(self, limit: float, bucket: TokenBucket | None):
+        self.limit = limit
+        self.in_flight = 0
+        self.bucket = bucket
+        self.condition = Condition()
+        self.requests = 0
+        self.retries = 0
+        self.throttled = 0
+        self.failures = 0
+
+
+class RequestScheduler:
+    """
+    Rate limiting, retries and adaptive concurrency for the requests of a `TikTokClient`.
+
+    Each endpoint (`comment`, `reply`, `video`, `user`, `post`, `download`) gets:
+
+    - an optional token bucket limiting its requests per second,
+    - a concurrency window adapted AIMD-style: it grows by one request per window of
+      successes and is halved when the server throttles us,
+    - retries with jittered exponential backoff on 429/5xx, connection errors and
+      throttled empty responses, honouring `Retry-After`.
+
+    With the defaults a failing request is retried 5 times, waiting from 0.5 s up to 30 s
+    between the attempts, and at most 4 requests per endpoint are in flight at first: a pool
+    of more workers (`reply_workers`, `page_workers`...) waits on the window, which grows by
+    about one request per window of successes. Set `initial_concurrency` to the number of
+    workers to use them all from the start.
+
+    Only the clients given a scheduler use one, the default client does not.
+
+    Usage:
+
+        client = TikTokClient(scheduler=RequestScheduler(rates={"comment": 5, "reply": 10}))
+    """
+    RETRY_STATUSES = frozenset((429, 500, 502, 503, 504))
+
+    def __init__(self, rates: dict[str, float] | None = None, max_retries: int = 5, backoff_base: float = 0.5, backoff_max: float = 30.0, initial_concurrency: int = 4, min_concurrency: int = 1, max_concurrency: int = 32):
+        """
+        :param rates: Requests per second allowed per endpoint. Endpoints not listed are not rate limited.
+        :param max_retries: Number of retries of a request before giving up.
+        :param backoff_base: Backoff of the first retry, in seconds, doubled on each retry.
+        :param backoff_max: Maximum backoff, in seconds.
+        :param initial_concurrency: Initial number of requests in flight per endpoint.
+        :param min_concurrency: The concurrency window never goes below this value.
+        :param max_concurrency: The concurrency window never goes above this value.
+        """
+        self.rates = dict(rates or {})
+        self.max_retries = max_retries
+        self.backoff_base = backoff_base
+        self.backoff_max = backoff_max
+        self.initial_concurrency = initial_concurrency
+        self.min_concurrency = min_concurrency
+        self.max_concurrency = max_concurrency
+        self._endpoints: dict[str, _endpoint_state] = {}
+        self._lock = Lock()
+
+    def _state(self, endpoint: str)-> _endpoint_state:
+        state = self._endpoints.get(endpoint)
+        if state is None:
+            with self._lock:
+                state = self._endpoints.get(endpoint)
+                if state is None:
+                    rate = self.rates.get(endpoint)
+                    state = _endpoint_state(self.initial_concurrency, TokenBucket(rate) if rate else None)
+                    self._endpoints[endpoint] = state
+        return state
+
+    def concurrency(self, endpoint: str)-> int:
+        """
+        :return: The current concurrency window of the endpoint.
+        """
+        return int(self._state(endpoint).limit)
+
+    def stats(self)-> dict[str, dict]:
+        """
+        :return: The counters and concurrency window of every endpoint used so far.
+        """
+        return {
+            endpoint: {
+                "requests": state.requests,
+                "retries": state.retries,
+                "throttled": state.throttled,
+                "failures": state.failures,
+                "concurrency": int(state.limit),
+            }
+            for endpoint, state in self._endpoints.items()
+        }
+
+    def _backoff(self, attempt: int, response: requests.Response | None)-> float:
+        if response is not None:
+            retry_after = response.headers.get("retry-after", "")
+            if retry_after.isdigit():
+                return min(float(retry_after), self.backoff_max)
+        # Full jitter, spreads the retries of the threads throttled at the same time
+        return uniform(0, min(self.backoff_max, self.backoff_base * 2 ** attempt))
+
+    def _on_success(self, state: _endpoint_state)-> None:
+        with state.condition:
+            state.limit = min(self.max_concurrency, state.limit + 1 / state.limit)
+            state.condition.notify()
+
+    def _on_throttle(self, state: _endpoint_state)-> None:
+        with state.condition:
+            state.throttled += 1
+            state.limit = max(self.min_concurrency, state.limit / 2)
+
+    def send(self, endpoint: str, request: Callable[[], requests.Response], empty_is_throttle: bool = False) -> requests.Response:
+        """
+        Send a request within the limits of its endpoint, retrying it when needed.
+
+        :param endpoint: The name of the endpoint, e.g. `comment`.
+        :param request: A function sending the request and returning its response.
+        :param empty_is_throttle: Whether a successful response with an empty body means
+            the server is throttling us, as `/api/comment/list/` does.
+        :return: The last response. Connection errors of the last attempt are raised.
+        """
+        state = self._state(endpoint)
+        attempt = 0
+        while True:
+            if state.bucket is not None:
+                state.bucket.acquire()
+
+            with state.condition:
+                while state.in_flight >= int(state.limit):
+                    state.condition.wait()
+                state.in_flight += 1
+                state.requests += 1
+
+            response = None
+            try:
+                response = request()
+            except (requests.exceptions.ConnectionError, requests.exceptions.Timeout):
+                if attempt >= self.max_retries:
+                    with state.condition:
+                        state.failures += 1
+                    raise
+            finally:
+                with state.condition:
+                    state.in_flight -= 1
+                    state.condition.notify()
+
+            if response is not None:
+                throttled = response.status_code in self.RETRY_STATUSES or (empty_is_throttle and response.ok and not response.content)
+                if not throttled:
+                    self._on_success(state)
+                    return response
+                self._on_throttle(state)
+                if attempt >= self.max_retries:
+                    with state.condition:
+                        state.failures += 1
+                    return response
+                response.close()
+
+            with state.condition:
+                state.retries += 1
+            registry = metrics.active
+            if registry is not None:
+                registry.inc("tiktok_retries_total", endpoint=endpoint)
+            sleep(self._backoff(attempt, response))
+            attempt += 1
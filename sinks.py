@@ -0,0 +1,193 @@
+import json
+import sqlite3
+from typing import Iterable
+from .comment import commentData
+from .columns import commentBatch
+
+
+class CommentSink:
+    """
+    Base of the streaming writers of comments.
+
+    Comments (each one followed by its replies) are buffered as rows of a `commentBatch`
+    and written every `flush_size` rows, so a whole comment section goes to disk with a
+    constant memory footprint. Subclasses implement `_write_batch` and `_close`.
+
+    Usage:
+
+        with SQLiteSink("comments.sqlite") as sink:
+            get_comments(url, msToken, sink=sink)
+    """
+    def __init__(self, flush_size: int = 1000):
+        """
+        :param flush_size: Number of buffered rows triggering a write.
+        """
+        self.flush_size = flush_size
+        self.rows_written = 0
+        self._batch = commentBatch()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+    def __repr__(self)-> str:
+        return f"<{type(self).__name__} (written={self.rows_written},buffered={len(self._batch)})>"
+
+    def write(self, comment: commentData, parent_cid: str = "")-> None:
+        """
+        Buffer a comment and its replies, writing the buffer once it is full.
+
+        :param comment: The comment to write.
+        :param parent_cid: The `cid` of the comment it answers, empty for a top-level comment.
+        """
+        self._batch.extend((comment,), parent_cid)
+        if len(self._batch) >= self.flush_size:
+            self.flush()
+
+    def write_many(self, comments: Iterable[commentData], parent_cid: str = "")-> None:
+        """
+        Buffer comments and their replies, writing the buffer each time it is full.
+        """
+        for comment in comments:
+            self.write(comment, parent_cid)
+
+    def flush(self)-> None:
+        """
+        Write the buffered rows.
+        """
+        batch = self._batch
+        if len(batch):
+            self._write_batch(batch)
+            self.rows_written += len(batch)
+            self._batch = commentBatch()
+
+    def close(self)-> None:
+        """
+        Write the buffered rows and release the underlying file.
+        """
+        try:
+            self.flush()
+        finally:
+            self._close()
+
+    def _write_batch(self, batch: commentBatch)-> None:
+        raise NotImplementedError
+
+    def _close(self)-> None:
+        pass
+
+
+class SQLiteSink(CommentSink):
+    """
+    Writes comments to the `comments` table and replies to the `replies` table of a SQLite file.
+
+    Both tables are keyed by `cid`, writing a comment again replaces it. Each flush is one
+    transaction of `executemany` inserts.
+    """
+    COLUMNS = ("cid", "aweme_id", "author_id", "comment_language", "text", "create_time", "digg_count", "reply_comment_total", "collect_stat", "author_pin")
+
+    def __init__(self, path: str, flush_size: int = 1000):
+        """
+        :param path: The path of the SQLite file, created if needed.
+        :param flush_size: Number of buffered rows triggering a write.
+        """
+        super().__init__(flush_size)
+        self._connection = sqlite3.connect(path, isolation_level=None)
+        self._connection.execute("PRAGMA journal_mode=WAL")
+        self._connection.execute("PRAGMA synchronous=NORMAL")
+        columns = (
+            "cid TEXT PRIMARY KEY, aweme_id TEXT, author_id TEXT, comment_language TEXT, text TEXT, "
+            "create_time INTEGER, digg_count INTEGER, reply_comment_total INTEGER, collect_stat INTEGER, author_pin INTEGER"
+        )
+        self._connection.execute(f"CREATE TABLE IF NOT EXISTS comments ({columns})")
+        self._connection.execute(f"CREATE TABLE IF NOT EXISTS replies ({columns}, parent_cid TEXT NOT NULL)")
+        self._connection.execute("CREATE INDEX IF NOT EXISTS replies_parent_cid ON replies (parent_cid)")
+
+    def _write_batch(self, batch: commentBatch)-> None:
+        rows = zip(*(batch[name] for name in self.COLUMNS), batch["parent_cid"])
+        comments, replies = [], []
+        for row in rows:
+            if row[-1]:
+                replies.append(row)
+            else:
+                comments.append(row[:-1])
+
+        marks = ", ".join("?" * len(self.COLUMNS))
+        connection = self._connection
+        connection.execute("BEGIN")
+        try:
+            connection.executemany(f"INSERT OR REPLACE INTO comments VALUES ({marks})", comments)
+            connection.executemany(f"INSERT OR REPLACE INTO replies VALUES ({marks}, ?)", replies)
+            connection.execute("COMMIT")
+        except BaseException:
+            connection.execute("ROLLBACK")
+            raise
+
+    def _close(self)-> None:
+        self._connection.close()
+
+
+class JSONLSink(CommentSink):
+    """
+    Appends comments and replies to a JSON Lines file, one row per line.
+
+    Rows have the fields of `commentBatch`, replies have a non-empty `parent_cid`.
+    """
+    def __init__(self, path: str, flush_size: int = 1000):
+        """
+        :param path: The path of the file, appended to if it exists.
+        :param flush_size: Number of buffered rows triggering a write.
+        """
+        super().__init__(flush_size)
+        self._file = open(path, "a", encoding="utf-8")
+
+    def _write_batch(self, batch: commentBatch)-> None:
+        columns = batch.to_dict()
+        names = tuple(columns)
+        dumps = json.JSONEncoder(ensure_ascii=False, separators=(",", ":")).encode
+        for name in commentBatch.BOOL_FIELDS:
+            columns[name] = [bool(value) for value in columns[name]]
+        lines = [dumps(dict(zip(names, row))) for row in zip(*columns.values())]
+        self._file.write("\n".join(lines) + "\n")
+        self._file.flush()
+
+    def _close(self)-> None:
+        self._file.close()
+
+
+class ParquetSink(CommentSink):
+    """
+    Writes comments and replies to a Parquet file, one row group per flush. Requires pyarrow.
+
+    Rows have the fields of `commentBatch`, replies have a non-empty `parent_cid`.
+    """
+    def __init__(self, path: str, flush_size: int = 50_000, compression: str = "snappy"):
+        """
+        :param path: The path of the file, overwritten if it exists.
+        :param flush_size: Number of buffered rows triggering a write, i.e. the size of the row groups.
+        :param compression: The compression codec of the file.
+        """
+        try:
+            import pyarrow.parquet
+        except ImportError as e:
+            raise ImportError("ParquetSink requires the 'pyarrow' package, install it with `pip install pyarrow`") from e
+
+        super().__init__(flush_size)
+        self.path = path
+        self.compression = compression
+        self._parquet = pyarrow.parquet
+        self._writer = None
+
+    def _write_batch(self, batch: commentBatch)-> None:
+        table = batch.to_arrow()
+        if self._writer is None:
+            self._writer = self._parquet.ParquetWriter(self.path, table.schema, compression=self.compression)
+        self._writer.write_table(table)
+
+    def _close(self)-> None:
+        if self._writer is None:
+            # Nothing was written, still leave a valid empty file
+            self._writer = self._parquet.ParquetWriter(self.path, commentBatch().to_arrow().schema, compression=self.compression)
+        self._writer.close()
@@ -0,0 +1,254 @@
+import logging
+import sqlite3
+import requests
+from time import time
+from threading import Lock
+from typing import Iterable, Iterator
+from concurrent.futures import ThreadPoolExecutor
+from .client import TikTokClient, get_default_client
+from .comment import commentData, crawl_reply_trees, _expected_comment_count, _iter_comment_pages
+from .functions import get_video_id
+
+logger = logging.getLogger(__name__)
+
+
+class CommentSyncState:
+    """
+    Persisted state of the incremental comment syncs, in a SQLite file.
+
+    For every video: the cursor reached by the last full walk, whether that walk reached the
+    end of the comments, its `commentCount` at the last complete sync, and the newest
+    `create_time`/`cid` seen. For every comment: its `reply_comment_total`, to refetch the
+    replies only when it changes.
+
+    Usage:
+
+        state = CommentSyncState("comments_sync.sqlite")
+        new_comments = sync_comments(url, msToken, state)
+    """
+    def __init__(self, path: str = ":memory:"):
+        """
+        :param path: The path of the SQLite file. Defaults to an in-memory database.
+        """
+        self._lock = Lock()
+        self._connection = sqlite3.connect(path, check_same_thread=False, isolation_level=None)
+        self._connection.execute("PRAGMA journal_mode=WAL")
+        self._connection.execute(
+            "CREATE TABLE IF NOT EXISTS videos ("
+            "video_id TEXT PRIMARY KEY, cursor INTEGER NOT NULL, complete INTEGER NOT NULL, "
+            "newest_time INTEGER, newest_cid TEXT, synced_at REAL NOT NULL, comment_count INTEGER)"
+        )
+        columns = {row[1] for row in self._connection.execute("PRAGMA table_info(videos)")}
+        if "comment_count" not in columns:
+            # State files written before the comment count was kept
+            self._connection.execute("ALTER TABLE videos ADD COLUMN comment_count INTEGER")
+        self._connection.execute(
+            "CREATE TABLE IF NOT EXISTS comments ("
+            "video_id TEXT NOT NULL, cid TEXT NOT NULL, reply_total INTEGER NOT NULL, create_time INTEGER, "
+            "PRIMARY KEY (video_id, cid)) WITHOUT ROWID"
+        )
+
+    def __repr__(self)-> str:
+        with self._lock:
+            videos = self._connection.execute("SELECT COUNT(*) FROM videos").fetchone()[0]
+            comments = self._connection.execute("SELECT COUNT(*) FROM comments").fetchone()[0]
+        return f"<CommentSyncState (videos={videos},comments={comments})>"
+
+    def video(self, video_id: str)-> dict | None:
+        """
+        :return: The state of a video (`cursor`, `complete`, `comment_count`, `newest_time`, `newest_cid`, `synced_at`),
+            None if it was never synced.
+        """
+        with self._lock:
+            row = self._connection.execute(
+                "SELECT cursor, complete, comment_count, newest_time, newest_cid, synced_at FROM videos WHERE video_id = ?", (video_id,)
+            ).fetchone()
+        if row is None:
+            return None
+        return {"cursor": row[0], "complete": bool(row[1]), "comment_count": row[2], "newest_time": row[3], "newest_cid": row[4], "synced_at": row[5]}
+
+    def known(self, video_id: str, cids: Iterable[str])-> dict[str, int]:
+        """
+        :return: The stored `reply_comment_total` of the given comments, for those already seen.
+        """
+        cids = list(cids)
+        known: dict[str, int] = {}
+        with self._lock:
+            # Stay far below the number of parameters allowed by SQLite
+            for start in range(0, len(cids), 500):
+                chunk = cids[start:start + 500]
+                rows = self._connection.execute(
+                    f"SELECT cid, reply_total FROM comments WHERE video_id = ? AND cid IN ({','.join('?' * len(chunk))})",
+                    (video_id, *chunk),
+                )
+                known.update(rows)
+        return known
+
+    def record(self, video_id: str, comments: list[commentData], cursor: int | None = None, complete: bool | None = None, comment_count: int | None = None)-> None:
+        """
+        Store the comments of a page, and optionally the progress of the walk, in one transaction.
+
+        :param video_id: The ID of the video.
+        :param comments: The new or changed comments of the page.
+        :param cursor: The cursor of the next page of the walk, if it should be saved.
+        :param complete: Whether the walk reached the end of the comments, if it should be saved.
+        :param comment_count: The `commentCount` of the video once all its comments are recorded, if it should be saved.
+        """
+        rows = [(video_id, comment.cid, comment.reply_comment_total or 0, comment.create_time) for comment in comments]
+        newest = max((comment for comment in comments if comment.create_time is not None), key=lambda comment: comment.create_time, default=None)
+
+        with self._lock:
+            connection = self._connection
+            connection.execute("BEGIN")
+            try:
+                connection.executemany("INSERT OR REPLACE INTO comments VALUES (?, ?, ?, ?)", rows)
+                connection.execute(
+                    "INSERT INTO videos VALUES (?, 0, 0, NULL, NULL, ?, NULL) ON CONFLICT (video_id) DO UPDATE SET synced_at = excluded.synced_at",
+                    (video_id, time()),
+                )
+                if newest is not None:
+                    connection.execute(
+                        "UPDATE videos SET newest_time = ?, newest_cid = ? WHERE video_id = ? AND (newest_time IS NULL OR newest_time < ?)",
+                        (newest.create_time, newest.cid, video_id, newest.create_time),
+                    )
+                if cursor is not None:
+                    connection.execute("UPDATE videos SET cursor = ? WHERE video_id = ?", (cursor, video_id))
+                if complete is not None:
+                    connection.execute("UPDATE videos SET complete = ? WHERE video_id = ?", (int(complete), video_id))
+                if comment_count is not None:
+                    connection.execute("UPDATE videos SET comment_count = ? WHERE video_id = ?", (comment_count, video_id))
+                connection.execute("COMMIT")
+            except BaseException:
+                connection.execute("ROLLBACK")
+                raise
+
+    def forget(self, video_id: str)-> None:
+        """
+        Drop the state of a video, its next sync walks all of its comments again.
+        """
+        with self._lock:
+            self._connection.execute("DELETE FROM comments WHERE video_id = ?", (video_id,))
+            self._connection.execute("DELETE FROM videos WHERE video_id = ?", (video_id,))
+
+    def close(self)-> None:
+        self._connection.close()
+
+
+def iter_sync_comments(url: str, msToken: str, state: CommentSyncState, maxcount: int = 20, known_pages: int = 1, reply_workers: int = 1, client: TikTokClient | None = None) -> Iterator[commentData]:
+    """
+    Iterate over the comments of a TikTok video that are new or changed since the last sync.
+
+    The first sync walks every page, saving its cursor as it goes, and records every comment.
+    The comments are not sorted by date, new ones can be on any page: when the `commentCount`
+    of the video grew since the last complete sync (or cannot be read), every page is walked
+    again. Otherwise only the first pages are walked, until `known_pages` pages in a row bring
+    nothing new, to catch the replies added to the most visible comments. A walk interrupted
+    before the end is resumed from its saved cursor. Replies are fetched for new comments, and
+    for known comments whose `reply_comment_total` changed.
+
+    The state of a page is saved once all its comments are consumed. A comment whose replies
+    could not all be fetched is yielded but not recorded, and the walk is saved as incomplete
+    from its page, so the next sync fetches it again.
+
+    :param url: The URL of the TikTok video.
+    :param msToken: A token required for authenticating the request.
+    :param state: The `CommentSyncState` kept between the syncs.
+    :param maxcount: Maximum number of comments to fetch in one request (default: 20).
+    :param known_pages: Number of pages in a row without new or changed comments ending the walk of the first pages (default: 1).
+    :param reply_workers: Number of reply requests in flight at once (default: 1, sequential), see `iter_comments`.
+    :param client: The client used to send the requests (default: the shared client).
+    :return: An iterator of the new or changed `commentData`, with all their replies.
+    """
+    client = client or get_default_client()
+    video_id = get_video_id(url)
+    previous = state.video(video_id)
+    # Read before the walk: comments added during the walk make the next sync walk everything again
+    comment_count = _expected_comment_count(url, client)
+    grown = previous is None or comment_count is None or previous["comment_count"] is None or comment_count > previous["comment_count"]
+
+    executor = ThreadPoolExecutor(max_workers=reply_workers) if reply_workers > 1 else None
+    pages = new = changed = 0
+    # The cursor of the first page holding comments with missing replies, the next sync resumes from it
+    resume = None
+
+    def updated(cursor: int, page: list[commentData]) -> tuple[list[commentData], list[commentData]]:
+        """
+        :return: The new or changed comments of the page with their replies, and those of them complete enough to be recorded.
+        """
+        nonlocal new, changed, resume
+        known = state.known(video_id, (comment.cid for comment in page))
+        result = [comment for comment in page if known.get(comment.cid) != (comment.reply_comment_total or 0)]
+        new += sum(1 for comment in result if comment.cid not in known)
+        changed += sum(1 for comment in result if comment.cid in known)
+
+        failed: set[str] = set()
+        crawl_reply_trees(video_id, result, msToken, max_in_flight=1, client=client, executor=executor, failed=failed)
+        if not failed:
+            return result, result
+
+        def complete(comment: commentData) -> bool:
+            return comment.cid not in failed and all(complete(reply) for reply in (comment.replies if len(comment) else ()))
+
+        recorded = [comment for comment in result if complete(comment)]
+        if resume is None:
+            resume = cursor
+        logger.warning("Replies of %d comments could not be fetched, they will be synced again", len(result) - len(recorded), extra={"endpoint": "reply", "video_id": video_id, "cursor": cursor})
+        return result, recorded
+
+    try:
+        reached_end = False
+        if previous is not None:
+            # Every page when comments were added, as they can be anywhere; otherwise the first
+            # pages only, until they hold known comments only
+            streak = 0
+            reached_end = True
+            for cursor, page, _ in _iter_comment_pages(video_id, msToken, maxcount, 0, client):
+                pages += 1
+                result, recorded = updated(cursor, page)
+                yield from result
+                state.record(video_id, recorded)
+
+                streak = 0 if result else streak + 1
+                if not grown and streak >= known_pages:
+                    reached_end = False
+                    break
+
+        if previous is None or (not previous["complete"] and not reached_end):
+            # First sync, or the previous walk did not reach the end of the comments
+            for cursor, page, next_cursor in _iter_comment_pages(video_id, msToken, maxcount, previous["cursor"] if previous else 0, client):
+                pages += 1
+                result, recorded = updated(cursor, page)
+                yield from result
+                # The saved cursor stops at the first page with missing replies
+                state.record(video_id, recorded, cursor=(next_cursor or 0) if resume is None else None, complete=False)
+            # The list ends on the last page or on an empty page
+            reached_end = True
+
+        if resume is not None:
+            state.record(video_id, [], cursor=resume, complete=False)
+        elif reached_end:
+            state.record(video_id, [], cursor=0, complete=True, comment_count=comment_count)
+
+    except requests.exceptions.RequestException as e:
+        # Handle any errors related to the request itself, the state keeps the last saved page
+        logger.error("Request failed: %s", e, extra={"endpoint": "comment", "video_id": video_id})
+
+    except Exception as e:
+        # Handle any other unexpected errors
+        logger.exception("An unexpected error occurred: %s", e, extra={"endpoint": "comment", "video_id": video_id})
+
+    finally:
+        if executor is not None:
+            executor.shutdown(wait=False, cancel_futures=True)
+        logger.info("Synced video %s: %d pages, %d new and %d changed comments", video_id, pages, new, changed, extra={"video_id": video_id})
+
+
+def sync_comments(url: str, msToken: str, state: CommentSyncState, maxcount: int = 20, known_pages: int = 1, reply_workers: int = 1, client: TikTokClient | None = None) -> list[commentData]:
+    """
+    Fetch the comments of a TikTok video that are new or changed since the last sync.
+
+    See `iter_sync_comments`.
+
+    :return: A list of the new or changed `commentData` objects, with all their replies.
+    """
+    return list(iter_sync_comments(url, msToken, state, maxcount=maxcount, known_pages=known_pages, reply_workers=reply_workers, client=client))
@@ -0,0 +1,82 @@
+from types import MappingProxyType
+from typing import Iterable, Mapping
+from urllib.parse import urlencode
+from .tikparams import comment_params, reply_params, user_post_params
+from .tikheaders import get_headers, download_orginal_video_header
+
+
+class RequestTemplate:
+    """
+    Immutable request template over one of the `tikparams` dictionaries.
+
+    The static parameters are frozen and their query string is encoded once; each request
+    only encodes its own dynamic values (cursor, IDs, token...). Nothing is shared or mutated
+    between calls, so any number of threads can build requests from the same template.
+    """
+    __slots__ = ("path", "static", "dynamic", "_query")
+
+    def __init__(self, path: str, params: Mapping[str, any], dynamic: Iterable[str]):
+        """
+        :param path: The path of the endpoint, e.g. `/api/comment/list/`.
+        :param params: The parameters of the endpoint, as in `tikparams`.
+        :param dynamic: The names of the parameters given on each request.
+        """
+        dynamic = tuple(dynamic)
+        static = {key: value for key, value in params.items() if key not in dynamic}
+        object.__setattr__(self, "path", path)
+        object.__setattr__(self, "static", MappingProxyType(static))
+        object.__setattr__(self, "dynamic", dynamic)
+        object.__setattr__(self, "_query", urlencode(static))
+
+    def __setattr__(self, name, value):
+        raise AttributeError("RequestTemplate is immutable")
+
+    def __repr__(self)-> str:
+        return f"<RequestTemplate ({self.path},dynamic={self.dynamic})>"
+
+    def _check(self, values: dict)-> None:
+        if len(values) != len(self.dynamic) or any(key not in values for key in self.dynamic):
+            raise KeyError(f"{self.path} expects the parameters {self.dynamic}, got {tuple(values)}")
+
+    def url(self, base_url: str, **values) -> str:
+        """
+        Build the full URL of a request.
+
+        :param base_url: The scheme and host, e.g. `https://www.tiktok.com`.
+        :param values: The dynamic parameters of the request.
+        :return: The URL, with the pre-encoded static query string followed by the dynamic values.
+        """
+        self._check(values)
+        return f"{base_url}{self.path}?{self._query}&{urlencode(values)}"
+
+    def params(self, **values) -> dict:
+        """
+        Build the parameters of a request as a new dictionary, for HTTP libraries taking a mapping.
+
+        :param values: The dynamic parameters of the request.
+        """
+        self._check(values)
+        return {**self.static, **values}
+
+
+COMMENT_TEMPLATE = RequestTemplate(
+    "/api/comment/list/",
+    comment_params,
+    ("aweme_id", "count", "cursor", "device_id", "screen_height", "screen_width", "msToken"),
+)
+
+REPLY_TEMPLATE = RequestTemplate(
+    "/api/comment/list/reply/",
+    reply_params,
+    ("comment_id", "count", "cursor", "device_id", "item_id", "screen_height", "screen_width", "msToken"),
+)
+
+USER_POST_TEMPLATE = RequestTemplate(
+    "/api/post/item_list/",
+    user_post_params,
+    ("count", "cursor", "device_id", "screen_height", "screen_width", "secUid", "msToken"),
+)
+
+# Read-only views of the `tikheaders` dictionaries
+HEADERS = MappingProxyType(dict(get_headers))
+DOWNLOAD_HEADERS = MappingProxyType(dict(download_orginal_video_header))
@@ -0,0 +1,49 @@
+"""
+Tests of the `cid` deduplication indexes.
+
+    python -m pytest tests
+"""
+import pytest
+from concurrent.futures import ThreadPoolExecutor
+from ..comment import _first_seen
+from ..dedup import CidSet, CidBloomFilter, load_cid_index
+
+# Comment IDs are 19-digit numbers, close to each other
+FIRST = 7400000000000000000
+
+
+@pytest.mark.parametrize("step", [1, 13])
+def test_bloom_filter_false_positive_rate_on_sequential_ids(step):
+    capacity, error_rate, lookups = 20_000, 0.001, 200_000
+    bloom = CidBloomFilter(capacity=capacity, error_rate=error_rate)
+    bloom.update(str(FIRST + i * step) for i in range(capacity))
+
+    assert all(str(FIRST + i * step) in bloom for i in range(capacity))
+    # The next IDs of the same sequence, never added
+    false_positives = sum(str(FIRST + (capacity + i) * step) in bloom for i in range(lookups))
+    # About 200 expected, the bound leaves room for the randomness of the hashes
+    assert false_positives / lookups < 1.5 * error_rate
+
+
+def test_indexes_round_trip(tmp_path):
+    ids = [str(FIRST + i * 13) for i in range(1000)]
+    for index in (CidSet(capacity=10), CidBloomFilter(capacity=1000)):
+        assert index.update(ids) == len(ids)
+        path = str(tmp_path / type(index).__name__)
+        index.save(path)
+        loaded = load_cid_index(path)
+        assert type(loaded) is type(index) and len(loaded) == len(ids)
+        assert all(cid in loaded for cid in ids)
+        assert not loaded.add(ids[0])
+
+
+@pytest.mark.parametrize("factory", [lambda: CidSet(capacity=16), lambda: CidBloomFilter(capacity=100_000)])
+def test_first_seen_from_threads(factory):
+    # Every thread sees the same IDs while the set grows: each is reported new at most once
+    seen, ids = factory(), [str(FIRST + i) for i in range(20_000)]
+    with ThreadPoolExecutor(max_workers=8) as executor:
+        new = sum(executor.map(lambda _: sum(_first_seen(seen, cid) for cid in ids), range(8)))
+    assert new == len(seen)
+    assert all(cid in seen for cid in ids)
+    if isinstance(seen, CidSet):
+        assert new == len(ids)
@@ -0,0 +1,105 @@
+"""
+Concurrency tests of the comment crawl, against the local `MockTikTokServer`.
+
+Many videos are crawled at the same time from a thread pool sharing one `TikTokClient`:
+no crawl may receive the cursor, IDs or comments of another one, and a `RequestScheduler`
+must keep the requests within its limits.
+
+    python -m pytest tests
+"""
+import pytest
+from time import perf_counter
+from concurrent.futures import ThreadPoolExecutor
+from ..benchmarks.mock_server import MockTikTokServer
+from ..client import TikTokClient
+from ..comment import get_comments
+from ..scheduler import RequestScheduler
+
+COMMENTS_PER_VIDEO = 57
+REPLIES_PER_COMMENT = 3
+REPLY_EVERY = 5
+FIRST_CID = 7400000000000000000     # The `cid` of the comment at index 0 in `fixtures.comment`
+
+
+@pytest.fixture
+def server():
+    with MockTikTokServer(comments=COMMENTS_PER_VIDEO, replies=REPLIES_PER_COMMENT, reply_every=REPLY_EVERY, page_size=2000) as server:
+        yield server
+
+
+def check(video_id: str, comments: list) -> list[str]:
+    """
+    :return: The errors found in the comments of one video.
+    """
+    errors = []
+    if [comment.cid for comment in comments] != [str(FIRST_CID + i) for i in range(COMMENTS_PER_VIDEO)]:
+        errors.append(f"{video_id}: wrong or out of order comments")
+    for index, comment in enumerate(comments):
+        if comment.aweme_id != video_id:
+            errors.append(f"{video_id}: comment {comment.cid} belongs to {comment.aweme_id}")
+        expected = [f"{comment.cid}{i:04d}" for i in range(REPLIES_PER_COMMENT if index % REPLY_EVERY == 0 else 0)]
+        if [reply.cid for reply in comment.replies] != expected:
+            errors.append(f"{video_id}: wrong replies under {comment.cid}")
+        errors.extend(f"{video_id}: reply {reply.cid} belongs to {reply.aweme_id}" for reply in comment.replies if reply.aweme_id != video_id)
+    return errors
+
+
+def crawl_all(server: MockTikTokServer, client: TikTokClient, threads: int, videos: int) -> list[str]:
+    """
+    Crawl `videos` videos from `threads` threads sharing `client`.
+
+    :return: The errors found in all the crawls.
+    """
+    video_ids = [str(7000000000000000000 + i) for i in range(videos)]
+
+    def crawl(video_id: str) -> list[str]:
+        # Small pages, so that the threads interleave a lot of requests
+        comments = get_comments(server.video_url(video_id), "token", maxcount=7, client=client, reply_workers=2)
+        return check(video_id, comments)
+
+    with ThreadPoolExecutor(max_workers=threads) as executor:
+        return [error for result in executor.map(crawl, video_ids) for error in result]
+
+
+def test_shared_client_threads(server):
+    with TikTokClient(pool_maxsize=32, base_url=server.url) as client:
+        errors = crawl_all(server, client, threads=32, videos=64)
+    assert errors == []
+
+
+def test_scheduler_concurrency_limit(server):
+    server.latency = 0.005
+    scheduler = RequestScheduler(initial_concurrency=3, max_concurrency=3)
+    with TikTokClient(pool_maxsize=16, base_url=server.url, scheduler=scheduler) as client:
+        errors = crawl_all(server, client, threads=16, videos=32)
+    assert errors == []
+    assert server.max_in_flight["comment"] <= 3
+    assert server.max_in_flight["reply"] <= 3
+    assert scheduler.concurrency("comment") == 3
+
+
+def test_scheduler_rate_limit(server):
+    scheduler = RequestScheduler(rates={"comment": 40})
+    with TikTokClient(pool_maxsize=16, base_url=server.url, scheduler=scheduler) as client:
+        started = perf_counter()
+        errors = crawl_all(server, client, threads=16, videos=8)
+        elapsed = perf_counter() - started
+    assert errors == []
+    # The bucket starts full with one second of requests, the rest are spaced by the rate
+    requests = server.requests["comment"]
+    assert requests > 40
+    assert elapsed >= (requests - 40) / 40 * 0.9
+
+
+def test_scheduler_retries_errors_and_throttling(server):
+    server.error_rate, server.throttle_rate = 0.1, 0.1
+    scheduler = RequestScheduler(max_retries=20, backoff_base=0.001, backoff_max=0.01, initial_concurrency=8, min_concurrency=2, max_concurrency=8)
+    with TikTokClient(pool_maxsize=16, base_url=server.url, scheduler=scheduler) as client:
+        errors = crawl_all(server, client, threads=16, videos=32)
+    assert errors == []
+
+    stats = scheduler.stats()
+    assert stats["comment"]["retries"] > 0 and stats["comment"]["throttled"] > 0
+    assert all(endpoint["failures"] == 0 for endpoint in stats.values())
+    assert all(2 <= endpoint["concurrency"] <= 8 for endpoint in stats.values())
+    assert server.max_in_flight["comment"] <= 8
@@ -78,4 +78,41 @@ reply_params = {
     "msToken": str,
     'X-Bogus': 'DFSzswVORFUANComt1lFJj4Us/VN',
     '_signature': '_02B4Z6wo00001-JiTvQAAIDAkmV.vBAv8AfiYkpAAJ5la3',
-}
\ No newline at end of file
+}
+user_post_params = {
+    "WebIdLastTime": "1696040888",
+    "aid": "1988",
+    "app_language": "ja-JP",
+    "app_name": "tiktok_web",
+    "browser_language": "vi-VN",
+    "browser_name": "Mozilla",
+    "browser_online": "true",
+    "browser_platform": "Win32",
+    "browser_version": "5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/127.0.0.0 Safari/537.36",
+    "channel": "tiktok_web",
+    "cookie_enabled": "true",
+    "count": int,
+    "coverFormat": "2",
+    "current_region": "JP",
+    "cursor": int, # createTime of the last video of the previous page, in milliseconds
+    "data_collection_enabled": "true",
+    "device_id": str,
+    "device_platform": "web_pc",
+    "focus_state": "true",
+    "from_page": "user",
+    "is_fullscreen": "false",
+    "is_page_visible": "true",
+    "os": "windows",
+    "priority_region": "VN",
+    "referer": "",
+    "region": "VN",
+    "screen_height": int,
+    "screen_width": int,
+    "secUid": str, # secUid of the user
+    "tz_name": "Etc/GMT-7",
+    "user_is_login": "true",
+    "webcast_language": "vi-VN",
+    "msToken": str,
+    'X-Bogus': 'DFSzswVORFUANComt1lFJj4Us/VN',
+    '_signature': '_02B4Z6wo00001-JiTvQAAIDAkmV.vBAv8AfiYkpAAJ5la3',
+}
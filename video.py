@@ -2,26 +2,42 @@
 import requests.cookies
 import os
 import sys
+import logging
 import requests
-import json
-import yaml
-from .tikheaders import get_headers, download_orginal_video_header
-from .comment import commentData,get_comments
-from copy import deepcopy
-from random import randint
-
-def get_original_video_header(url: str, cookies: requests.cookies.RequestsCookieJar, user_cookie: str) -> dict:
+from . import metrics
+from .templates import DOWNLOAD_HEADERS
+from .client import TikTokClient, get_default_client
+from .functions import extract_embedded_json, get_video_id
+from .extractors import compile_path, record_extractor
+from .download import download_stats, probe_ranges, download_ranges
+from .cache import fetch_page_data, video_key
+from time import perf_counter
+from typing import Iterable, Iterator
+from concurrent.futures import ThreadPoolExecutor, as_completed
+
+logger = logging.getLogger(__name__)
+
+def get_original_video_header(url: str, cookies: requests.cookies.RequestsCookieJar, user_cookie: str | None) -> dict:
     """
     Generates the headers required for downloading the original video.
 
     :param url: The URL of the TikTok video.
     :param cookies: The cookies from the initial request to the TikTok page.
-    :param user_cookie: The user's cookie string.
+    :param user_cookie: The user's cookie string. Empty or None if there is no user cookie,
+        the cookies of the page are then sent alone.
     :return: A dictionary containing the headers for downloading the video.
     """
 
-    _header = deepcopy(download_orginal_video_header)
-    
+    _header = dict(DOWNLOAD_HEADERS)
+
+    if not user_cookie:
+        page_cookies = ";".join(f"{name}={value}" for name, value in cookies.get_dict().items())
+        if page_cookies:
+            _header["cookie"] = page_cookies
+        else:
+            _header.pop("cookie", None)
+        return _header
+
     try:
         # Generate a new cookie string from the provided cookies and user_cookie
         new_cookies = []
@@ -29,6 +45,9 @@ def get_original_video_header(url: str, cookies: requests.cookies.RequestsCookie
         user_cookie = user_cookie.replace(" ", "").split(";")
 
         for raw_cookie in user_cookie:
+            if "=" not in raw_cookie:
+                # Empty parts, e.g. from a trailing `;`
+                continue
             first, _ = raw_cookie.split("=", maxsplit=1)
             if not cookies.get(first, False):
                 new_cookies.append(raw_cookie)
@@ -42,45 +61,83 @@ def get_original_video_header(url: str, cookies: requests.cookies.RequestsCookie
 
     except Exception as e:
         # Handle unexpected errors during header generation
-        print(f"An error occurred while generating headers: {e}")
+        logger.error("An error occurred while generating headers: %s", e, extra={"url": url})
         raise Exception("Failed to generate headers for the video download") from e
 
     return _header
 
 
-def download_file(url: str, header: dict, file_path: str) -> bool:
+def download_file(url: str, header: dict, file_path: str, client: TikTokClient | None = None, segments: int = 1, chunk_size: int = 8192, resume: bool = False) -> download_stats:
     """
     Downloads a file from a given URL and saves it locally.
 
+    When `segments` is greater than 1 or `resume` is set, and the server serves byte
+    ranges, the file is fetched as concurrent `Range` requests into a preallocated
+    `<file_path>.part` file whose progress is kept in a `.part.json` sidecar, so that
+    a later call resumes an interrupted download. Otherwise, or when the server does
+    not support ranges, the file is fetched as a single stream into `<file_path>.part`.
+    Either way the file is renamed to `file_path` once complete.
+
     :param url: The direct URL to the file that needs to be downloaded.
     :param header: The headers required for making the request.
     :param file_path: The local file path where the downloaded file will be saved.
-    :return: True if the download is successful, False otherwise.
+    :param client: The client used to send the request. Defaults to the shared client.
+    :param segments: Number of byte ranges fetched concurrently. Defaults to 1.
+    :param chunk_size: Size of the chunks read from the network and written to disk. Defaults to 8192.
+    :param resume: Whether to resume a previous partial download of `file_path`. Defaults to False.
+    :return: A `download_stats` object with the achieved bandwidth, truthy if the download is successful.
     """
 
+    client = client or get_default_client()
+    stats = download_stats()
+
     try:
-        # Attempt to download the file with the provided headers
-        response = requests.get(url, stream=True, headers=header)
+        response = None
+        if segments > 1 or resume:
+            size, response = probe_ranges(client, url, header)
+            # An empty file has no range to fetch, it is downloaded as a single stream
+            if size is not None and size > 0:
+                return download_ranges(client, url, header, file_path, size, segments, chunk_size, resume)
+        if response is None:
+            # Attempt to download the file with the provided headers, without any range
+            response = client.get(url, endpoint="download", stream=True, headers=header)
+
         if response.ok:
-            # Open file to write the video data
-            with open(file_path, "wb") as file:
-                for chunk in response.iter_content(chunk_size=8192):
-                    file.write(chunk)
-            return True
+            started = perf_counter()
+            part_path = f"{file_path}.part"
+            try:
+                # Write to a temporary file, `file_path` only ever holds complete downloads
+                with open(part_path, "wb") as file:
+                    for chunk in response.iter_content(chunk_size=chunk_size):
+                        file.write(chunk)
+                        stats.downloaded += len(chunk)
+                os.replace(part_path, file_path)
+            except BaseException:
+                if os.path.exists(part_path):
+                    os.remove(part_path)
+                raise
+            finally:
+                registry = metrics.active
+                if registry is not None:
+                    registry.inc("tiktok_response_bytes_total", stats.downloaded, endpoint="download")
+            stats.seconds = perf_counter() - started
+            stats.size = stats.downloaded
+            stats.ok = True
+            return stats
         
         else:
-            print(f"Failed to download file: HTTP status code {response.status_code}")
-            return False
+            logger.error("Failed to download file: HTTP status code %d", response.status_code, extra={"endpoint": "download", "url": url})
+            return stats
 
     except requests.exceptions.RequestException as e:
         # Handle request-specific errors
-        print(f"Request failed: {e}")
-        return False
+        logger.error("Request failed: %s", e, extra={"endpoint": "download", "url": url})
+        return stats
     
     except Exception as e:
         # Handle any unexpected errors during download
-        print(f"An unexpected error occurred while downloading: {e}")
-        return False
+        logger.exception("An unexpected error occurred while downloading: %s", e, extra={"endpoint": "download", "url": url})
+        return stats
 
 
 def get_all_data_from_url(page_content: str) -> dict:
@@ -91,76 +148,98 @@ def get_all_data_from_url(page_content: str) -> dict:
     :return: A dictionary containing the extracted data.
     """
 
+    registry = metrics.active
+    started = perf_counter() if registry is not None else 0.0
+
     try:
-        # Extract JSON data embedded in the page content
-        data = page_content[page_content.find('"webapp.video-detail":'):]
-        data = data[data.find('"webapp.video-detail":'):data.find("</script>")].replace('"webapp.video-detail":', '')
-        
-        # Attempt to parse the extracted JSON data
-        while len(data) > 0:
-            try:
-                data = json.loads(data)
-                break
-            except:
-                data = data[:-1]
-                
+        # Decode the JSON data embedded in the page content
+        data = extract_embedded_json(page_content, "webapp.video-detail")
+
     except Exception as e:
         # Handle unexpected errors during data extraction
-        print(f"An error occurred while extracting data: {e}")
+        logger.error("An error occurred while extracting data: %s", e, extra={"endpoint": "video"})
         raise Exception("Failed to extract data from page content") from e
 
+    if registry is not None:
+        registry.observe("tiktok_parse_seconds", perf_counter() - started, endpoint="video")
     return data
 
 
-def download_original_video(url: str, local_path=None) -> bool:
+def _get_download_url(data: dict) -> str:
+    """
+    Reads the address of the original video file from the page data.
+
+    :param data: The data extracted from the TikTok video page by `get_all_data_from_url`.
+    :return: The direct URL of the video file.
+    """
+
+    try:
+        # Get the download URL from the video data
+        download_url: str = data["itemInfo"]["itemStruct"]["video"]["playAddr"]
+        if not download_url:
+            raise ValueError("Download URL not found for the specified video ID")
+
+    except KeyError as key_err:
+        # Handle missing keys in the JSON data
+        logger.error("Error retrieving video download information: %s", key_err)
+        raise Exception("Failed to find necessary keys in data structure") from key_err
+
+    except ValueError as val_err:
+        # Handle cases where expected values are missing
+        logger.error("Value error: %s", val_err)
+        raise Exception("An expected value was not found in the data") from val_err
+
+    return download_url
+
+
+def _get_video_file_path(vid_id: str, local_path=None) -> str:
+    """
+    Builds the local path of a downloaded video.
+
+    :param vid_id: The ID of the video.
+    :param local_path: The local directory of the video. If None, the script's directory is used.
+    :return: The full path of the video file.
+    """
+
+    # Handle the local path where the video will be saved
+    if local_path is None:
+        local_path = os.path.dirname(os.path.abspath(sys.argv[0]))
+
+    FILE_NAME = f"tiktok_vid_{vid_id}.mp4"
+    return os.path.join(local_path, FILE_NAME)
+
+
+def download_original_video(url: str, local_path=None, client: TikTokClient | None = None) -> bool:
     """
     Downloads the original video from TikTok.
 
     :param url: The URL of the TikTok video.
     :param local_path: The local path where the video will be saved. If None, saves to the script's directory.
+    :param client: The client used to send the requests. Defaults to the shared client.
     :return: True if the download is successful, False otherwise.
     """
 
-    _headers = deepcopy(get_headers)
+    client = client or get_default_client()
     
     try:
         
         # Make a request to the TikTok video page to get its content
-        response = requests.get(url, headers=_headers)
+        response = client.get(url, endpoint="video")
         data = get_all_data_from_url(response.text)
 
         # Get the video ID
         vid_id = data["itemInfo"]["itemStruct"]["id"]
-        
-        # Handle the local path where the video will be saved
-        if local_path is None:
-            local_path = os.path.dirname(os.path.abspath(sys.argv[0]))
-
-        FILE_NAME = f"tiktok_vid_{vid_id}.mp4"
-        file_path = os.path.join(local_path, FILE_NAME)
-        
-        try:
-            # Get the download URL from the video data
-            download_url: str = data["itemInfo"]["itemStruct"]["video"]["playAddr"]
-            if not download_url:
-                raise ValueError("Download URL not found for the specified video ID")
-        
-        except KeyError as key_err:
-            # Handle missing keys in the JSON data
-            print(f"Error retrieving video download information: {key_err}")
-            raise Exception("Failed to find necessary keys in data structure") from key_err
-        
-        except ValueError as val_err:
-            # Handle cases where expected values are missing
-            print(f"Value error: {val_err}")
-            raise Exception("An expected value was not found in the data") from val_err
+        file_path = _get_video_file_path(vid_id, local_path)
+        download_url = _get_download_url(data)
         
         # Attempt to download the video file
-        download_file(download_url, get_original_video_header(download_url, response.cookies, get_headers["cookie"]), file_path)
+        user_cookie = client.session.headers.get("cookie")
+        if not download_file(download_url, get_original_video_header(download_url, response.cookies, user_cookie), file_path, client=client):
+            return False
     
     except Exception as e:
         # Handle unexpected errors during the download process
-        print(f"An error occurred while downloading the video: {e}")
+        logger.error("An error occurred while downloading the video: %s", e, extra={"url": url})
         return False
     
     return True
@@ -170,6 +249,28 @@ class video_details:
     """
     Some information about the given video.
     """
+    __slots__ = (
+        "video_id",
+        "description",
+        "hastag",
+        "duration",
+        "width",
+        "height",
+        "diggCount",
+        "shareCount",
+        "commentCount",
+        "playCount",
+        "createTime",
+        "collectCount",
+        "region",
+        "author_id",
+        "author_uniqueId",
+        "author_nickname",
+    )
+
+    # Low-cardinality fields whose strings are interned by the extractor
+    _interned_fields = ("region",)
+
     def __init__(self,*args):
         self.video_id: str
         self.description: str
@@ -181,6 +282,7 @@ class video_details:
         self.shareCount: int
         self.commentCount: int
         self.playCount: int
+        self.createTime: int
         self.collectCount: int
         self.region: str
 
@@ -190,7 +292,13 @@ class video_details:
         self.author_nickname: str
     
     def get_all(self)-> dict:
-        return self.__dict__
+        data = {}
+        for name in self.__slots__:
+            try:
+                data[name] = getattr(self, name)
+            except AttributeError:
+                pass
+        return data
      
     @staticmethod
     def extract_data_from_path(data: dict, path: str) -> any:
@@ -200,69 +308,181 @@ class video_details:
         :param data: The dictionary containing the data.
         :param path: The path to the data in the dictionary.
         :return: The extracted data.
+        :raises KeyError: If the specified path is not found in the data.
         """
-        try:
-            key = "/"
-            temp = list(map(
-                lambda value: f'["{ value}"]',
-                path.split(key)
-            ))
-            new_path = ""
-            for val in temp:
-                new_path += val
-
-        except KeyError as e:
-            raise KeyError("Cannot find the path in the data structure") from e
-        
-        except Exception as e:
-            print(f"An unexpected error occurred while extracting data: {e}")
-            raise Exception("Failed to extract data from path") from e
-        
-        return eval(f"data{new_path}")
+        return compile_path(path)(data)
     
 
-def get_video_details(url: str) -> video_details:
+def _build_video_details(data: dict) -> video_details:
+    """
+    Fills a `video_details` object from the data of a TikTok video page.
+
+    :param data: The data extracted from the page by `get_all_data_from_url`.
+    :return: An instance of the `video_details` class.
+    """
+
+    # The mapping of `video_details_path.yaml` is compiled once, on first use
+    extract = record_extractor("video_details_path", video_details)
+    registry = metrics.active
+    if registry is None:
+        return extract(data)
+
+    started = perf_counter()
+    details = extract(data)
+    registry.inc("tiktok_extract_seconds_total", perf_counter() - started, endpoint="video")
+    registry.inc("tiktok_extracted_records_total", endpoint="video")
+    return details
+
+
+def get_video_details(url: str, client: TikTokClient | None = None) -> video_details:
     """
     Retrieves details about a TikTok video and its author.
 
     :param url: The URL of the TikTok video.
+    :param client: The client used to send the request. Defaults to the shared client.
     :return: An instance of the `video_details` class containing the details of the video.
     """
+
+    client = client or get_default_client()
     
     try:
-        # Get data
-        _headers = deepcopy(get_headers)
-        
-        
-        # Make a request to the TikTok video page to get its content
-        response = requests.get(url, headers=_headers)
-        data = get_all_data_from_url(response.text)
-
-        with open(f"{os.path.dirname(__file__)}/yaml/video_details_path.yaml", 'r') as file:
-            paths: dict = yaml.safe_load(file)
-
-        video_details_ = video_details()
-        for key, value in paths.items():
-            video_details_.__setattr__(key, video_details.extract_data_from_path(data, value))
+        # Get the data of the TikTok video page, from the cache of the client if it has one
+        data = fetch_page_data(client, "video", video_key(url), url, get_all_data_from_url)
+        video_details_ = _build_video_details(data)
 
     except KeyError as key_err:
-        print(f"Error extracting video details: {key_err}")
+        logger.error("Error extracting video details: %s", key_err, extra={"endpoint": "video", "url": url})
         raise Exception("Failed to find necessary keys in data structure") from key_err
     
     except FileNotFoundError as fnf_err:
-        print(f"File not found: {fnf_err}")
+        logger.error("File not found: %s", fnf_err, extra={"endpoint": "video", "url": url})
         raise Exception("Required file for extracting video details was not found") from fnf_err
 
     except Exception as e:
-        print(f"An unexpected error occurred while retrieving video details: {e}")
+        logger.error("An unexpected error occurred while retrieving video details: %s", e, extra={"endpoint": "video", "url": url})
         raise Exception("Failed to retrieve video details") from e
 
     return video_details_
 
 
+class video_result:
+    """
+    The result of one video of `get_video_details_many`.
 
+    Failures are reported through `error` instead of being raised, so one bad URL
+    does not abort the batch.
+    """
+    def __init__(self, url: str, video_id: str | None = None):
+        self.url = url
+        self.video_id = video_id
+        self.details: video_details | None = None
+        self.play_addr: str | None = None                                  # Set when `with_media` is asked
+        self.cookies: requests.cookies.RequestsCookieJar | None = None     # Set when `with_media` is asked
+        self.error: Exception | None = None
+
+    def __repr__(self)-> str:
+        state = "ok" if self.ok else f"error={self.error}"
+        return f"<video_result ({self.video_id},{state})>"
+
+    @property
+    def ok(self)-> bool:
+        return self.error is None and self.details is not None
+
+    def download(self, local_path=None, client: TikTokClient | None = None, **kwargs) -> download_stats:
+        """
+        Downloads the original video without fetching its page again.
 
+        Needs a result fetched with `with_media=True`.
 
-    
-    
+        :param local_path: The local path where the video will be saved. If None, saves to the script's directory.
+        :param client: The client used to send the request. Defaults to the shared client.
+        :param kwargs: Any option of `download_file`, e.g. `segments`.
+        :return: The `download_stats` of `download_file`.
+        """
+        if self.play_addr is None:
+            raise ValueError("The result has no media, fetch it with `with_media=True`")
+
+        client = client or get_default_client()
+        user_cookie = client.session.headers.get("cookie")
+        header = get_original_video_header(self.play_addr, self.cookies, user_cookie)
+        return download_file(self.play_addr, header, _get_video_file_path(self.video_id, local_path), client=client, **kwargs)
+
+
+def _fetch_video_result(url: str, video_id: str, with_media: bool, client: TikTokClient) -> video_result:
+    """
+    Fetch and parse one video page for `get_video_details_many`, never raising.
+    """
+    result = video_result(url, video_id)
+    try:
+        if with_media:
+            # The download needs the cookies of a fresh page, the cache cannot be used
+            response = client.get(url, endpoint="video")
+            response.raise_for_status()
+            data = get_all_data_from_url(response.text)
+            result.play_addr = _get_download_url(data)
+            result.cookies = response.cookies
+        else:
+            data = fetch_page_data(client, "video", video_id, url, get_all_data_from_url)
+        result.details = _build_video_details(data)
+
+    except Exception as e:
+        result.error = e
+
+    return result
+
+
+def iter_video_details_many(urls: Iterable[str], workers: int = 8, with_media: bool = False, client: TikTokClient | None = None) -> Iterator[video_result]:
+    """
+    Retrieves the details of many TikTok videos concurrently, yielding them as they complete.
+
+    URLs resolving to the same video ID are fetched once, each page is parsed once.
+
+    :param urls: The URLs of the TikTok videos.
+    :param workers: Number of pages fetched at the same time. Defaults to 8.
+    :param with_media: Also keep the `playAddr` and cookies, so that `video_result.download`
+        needs no other page fetch. The pages are then always fetched, never read from the cache
+        of the client: a cached `playAddr` may have expired and has no cookies. Defaults to False.
+    :param client: The client used to send the requests. Defaults to the shared client.
+    :return: An iterator of `video_result`, one per distinct video, in completion order.
+    """
+    client = client or get_default_client()
+
+    unique: dict[str, str] = {}
+    invalid: list[video_result] = []
+    for url in urls:
+        try:
+            unique.setdefault(get_video_id(url), url)
+        except Exception as e:
+            result = video_result(url)
+            result.error = ValueError(f"No video ID found in {url}")
+            result.error.__cause__ = e
+            invalid.append(result)
+
+    yield from invalid
+
+    with ThreadPoolExecutor(max_workers=workers) as executor:
+        futures = [executor.submit(_fetch_video_result, url, video_id, with_media, client) for video_id, url in unique.items()]
+        for future in as_completed(futures):
+            yield future.result()
+
+
+def get_video_details_many(urls: Iterable[str], workers: int = 8, with_media: bool = False, client: TikTokClient | None = None) -> list[video_result]:
+    """
+    Retrieves the details of many TikTok videos concurrently.
+
+    :param urls: The URLs of the TikTok videos.
+    :param workers: Number of pages fetched at the same time. Defaults to 8.
+    :param with_media: Also keep the `playAddr` and cookies needed by `video_result.download`. Defaults to False.
+    :param client: The client used to send the requests. Defaults to the shared client.
+    :return: A list of `video_result` in the order of `urls`; duplicated videos share the same result.
+    """
+    urls = list(urls)
+    by_id: dict[str | None, video_result] = {}
+    by_url: dict[str, video_result] = {}
+    for result in iter_video_details_many(urls, workers=workers, with_media=with_media, client=client):
+        if result.video_id is None:
+            by_url[result.url] = result
+        else:
+            by_id[result.video_id] = result
 
+    return [by_url[url] if url in by_url else by_id[get_video_id(url)] for url in urls]